@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    """
+    Persists the output of each conversion stage on disk under a content-derived key,
+    so a failed or re-themed job can resume from the last good stage.
+
+    Pieces are results of one part of a document (a page, a section) keyed by the hash of that
+    part's content, so a revision of the document reuses those of its unchanged parts.
+
+    With `max_bytes`, the least recently used documents and pieces are removed once the store
+    grows beyond it, checked at most every `evict_interval` seconds when something is saved.
+    Artifacts used in the last `min_age` seconds are kept, so a running conversion never loses its own.
+
+    Layout: <root>/<document_key>/<stage>-<params_hash>.json
+            <root>/pieces/<kind>/<key[:2]>/<key>-<params_hash>.json
+    """
+
+    def __init__(self, root="artifacts", max_bytes=None, evict_interval=60.0, min_age=600.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.evict_interval = evict_interval
+        self.min_age = min_age
+        self._last_eviction = None
+        self._eviction_lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def hash_bytes(data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 * 1024):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def params_hash(params=None):
+        encoded = json.dumps(params or {}, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+    def document_dir(self, document_key):
+        return os.path.join(self.root, document_key)
+
+    def stage_dir(self, document_key, stage):
+        """Directory for stage files that are not JSON (e.g. extracted images)."""
+        path = os.path.join(self.document_dir(document_key), stage)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _artifact_path(self, document_key, stage, params=None):
+        return os.path.join(self.document_dir(document_key), f"{stage}-{self.params_hash(params)}.json")
+
+    def _piece_path(self, kind, key, params=None):
+        return os.path.join(self.root, "pieces", kind, key[:2], f"{key}-{self.params_hash(params)}.json")
+
+    def has(self, document_key, stage, params=None):
+        return os.path.exists(self._artifact_path(document_key, stage, params))
+
+    def load(self, document_key, stage, params=None):
+        """Returns the stored value for a stage, or None if it is missing or unreadable."""
+        return self._read(self._artifact_path(document_key, stage, params))
+
+    def save(self, document_key, stage, value, params=None):
+        path = self._write(self._artifact_path(document_key, stage, params), stage, value, params)
+        self._evict_when_due()
+        return path
+
+    def load_piece(self, kind, key, params=None):
+        """Returns the stored value of a piece (e.g. kind "page_text", key the page hash), or None."""
+        return self._read(self._piece_path(kind, key, params))
+
+    def save_piece(self, kind, key, value, params=None):
+        path = self._write(self._piece_path(kind, key, params), kind, value, params)
+        self._evict_when_due()
+        return path
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)["value"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Error reading artifact %s: %s", path, e)
+            return None
+        try:
+            # The modification time is the last use that eviction goes by
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    @staticmethod
+    def _write(path, stage, value, params=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file first so an interrupted job never leaves a partial artifact
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"stage": stage, "params": params or {}, "value": value}, f)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    def invalidate(self, document_key, stage=None):
+        """Removes one stage (all params) or every artifact of a document."""
+        doc_dir = self.document_dir(document_key)
+        if not os.path.exists(doc_dir):
+            return
+        if stage is None:
+            shutil.rmtree(doc_dir, ignore_errors=True)
+            return
+        for name in os.listdir(doc_dir):
+            if name.startswith(f"{stage}-") and name.endswith(".json"):
+                os.remove(os.path.join(doc_dir, name))
+
+    @staticmethod
+    def _usage(path):
+        """(last modification, bytes) of a file or of every file below a directory."""
+        if os.path.isdir(path):
+            files = [os.path.join(dirpath, name) for dirpath, _, names in os.walk(path) for name in names]
+        else:
+            files = [path]
+        used, size = 0.0, 0
+        for file_path in files:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                # Removed meanwhile
+                continue
+            used = max(used, stat.st_mtime)
+            size += stat.st_size
+        return used, size
+
+    def _entries(self):
+        """(last use, bytes, path) of every document directory and every piece file."""
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name == "pieces":
+                for dirpath, _, names in os.walk(path):
+                    for piece in names:
+                        piece_path = os.path.join(dirpath, piece)
+                        entries.append(self._usage(piece_path) + (piece_path,))
+            elif os.path.isdir(path):
+                entries.append(self._usage(path) + (path,))
+        return entries
+
+    def evict(self, max_bytes=None):
+        """
+        Removes the least recently used documents and pieces until the store holds at most
+        `max_bytes` (default: the store's limit), keeping those used in the last `min_age` seconds.
+
+        Returns:
+            int: Bytes removed
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries())
+        excess = sum(size for _, size, _ in entries) - max_bytes
+        removed = 0
+        now = time.time()
+        for used, size, path in entries:
+            if removed >= excess or now - used < self.min_age:
+                break
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+            removed += size
+        return removed
+
+    def _evict_when_due(self):
+        if self.max_bytes is None:
+            return
+        with self._eviction_lock:
+            now = time.monotonic()
+            if self._last_eviction is not None and now - self._last_eviction < self.evict_interval:
+                return
+            self._last_eviction = now
+        try:
+            removed = self.evict()
+        except OSError as e:
+            logger.warning("Error evicting artifacts: %s", e)
+            return
+        if removed:
+            logger.info("Evicted %d bytes of least recently used artifacts", removed)
@@ -0,0 +1,260 @@
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from artifact_store import ArtifactStore
+from instrumentation import job_context, job_id_var
+from pipeline import ConversionPipeline, conversion_memory
+
+logger = logging.getLogger(__name__)
+
+
+def _extract_document(pdf_path, model_name, theme, store_root, job_id):
+    """Worker process: text and image extraction of one document, checkpointed in the artifact store."""
+    import fitz
+
+    pipeline = ConversionPipeline(model_name=model_name, theme=theme, artifact_store=ArtifactStore(store_root))
+    with job_context(job_id):
+        pipeline.set_document(pdf_path=pdf_path)
+        text = pipeline.extract_text(pdf_path)
+        image_data = pipeline.extract_images(pdf_path)
+        skeleton = pipeline.extract_outline(pdf_path)
+
+    with fitz.open(pdf_path) as pdf_document:
+        pages = pdf_document.page_count
+
+    return {
+        "document_key": pipeline.document_key,
+        "text": text,
+        "image_data": image_data,
+        "skeleton": skeleton,
+        "pages": pages,
+        "timings": pipeline.stage_timings
+    }
+
+
+def _render_document(pdf_path, document_structure, image_data, output_path, model_name, theme, job_id):
+    """Worker process: assigns images and renders a structure into a deck, writing to a temporary file first."""
+    pipeline = ConversionPipeline(model_name=model_name, theme=theme)
+    partial_path = output_path + ".part"
+    try:
+        with job_context(job_id):
+            document_structure = pipeline.assign(document_structure, image_data, pdf_path)
+            pipeline.render(document_structure, image_data, partial_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    # The final name only appears once the deck is complete, so interrupted runs are redone
+    os.replace(partial_path, output_path)
+    return pipeline.stage_timings
+
+
+class BatchConverter:
+    """
+    Converts many PDFs at once.
+
+    Extraction and rendering run in a pool of worker processes, while the LLM stages of each
+    document run in the parent under a separate concurrency limit, so one document can be
+    extracted while another one is waiting for the model. Documents whose output already exists
+    are skipped, which makes an interrupted batch resumable; stage artifacts are shared through
+    the artifact store.
+
+    A `cpu_pool` given by the caller (e.g. one shared by every batch of a server) is used instead
+    of a pool of `workers` processes started for the batch, and is left running afterwards. With
+    a `memory_budget` (memory.MemoryBudget) each document reserves its estimate before it is
+    extracted and holds it until its deck is written; one that may never fit fails on its own.
+    """
+
+    def __init__(self, model_name="llama3", theme="default", workers=None, llm_concurrency=1,
+                 artifact_root="artifacts", force=False, progress_callback=None, cpu_pool=None,
+                 memory_budget=None):
+        self.model_name = model_name
+        self.theme = theme
+        self.workers = workers or os.cpu_count() or 1
+        self.llm_concurrency = max(1, llm_concurrency)
+        self.artifact_root = artifact_root
+        self.force = force
+        self.progress_callback = progress_callback
+        self.cpu_pool = cpu_pool
+        self.memory_budget = memory_budget
+        self._llm_slots = threading.BoundedSemaphore(self.llm_concurrency)
+
+    def _emit(self, event, data):
+        if self.progress_callback:
+            try:
+                self.progress_callback(event, data)
+            except Exception as e:
+                logger.warning("Error reporting progress: %s", e)
+
+    @staticmethod
+    def find_pdfs(input_dir, recursive=True):
+        pdf_paths = []
+        for root, dirs, files in os.walk(input_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(".pdf"):
+                    pdf_paths.append(os.path.join(root, name))
+            if not recursive:
+                break
+        return pdf_paths
+
+    def convert_directory(self, input_dir, output_dir, recursive=True):
+        pdf_paths = self.find_pdfs(input_dir, recursive)
+        outputs = {}
+        for pdf_path in pdf_paths:
+            relative = os.path.relpath(pdf_path, input_dir)
+            outputs[pdf_path] = os.path.join(output_dir, os.path.splitext(relative)[0] + ".pptx")
+        return self.convert_files(outputs)
+
+    def convert_files(self, outputs):
+        """
+        Args:
+            outputs (dict): PDF path -> output PPTX path
+
+        Returns:
+            dict: Throughput summary with the result of every document
+        """
+        started = time.perf_counter()
+        results = []
+        pending = {}
+
+        for pdf_path, output_path in outputs.items():
+            if not self.force and os.path.exists(output_path):
+                results.append({"pdf": pdf_path, "output": output_path, "status": "skipped"})
+                self._emit("document_skipped", {"pdf": os.path.basename(pdf_path)})
+            else:
+                pending[pdf_path] = output_path
+
+        if pending:
+            # Threads only orchestrate: they wait on the process pool or on the LLM slots
+            orchestrators = min(len(pending), self.workers + self.llm_concurrency)
+            # "spawn" because batches may be started from a threaded web server
+            cpu_pool = self.cpu_pool or ProcessPoolExecutor(max_workers=self.workers,
+                                                            mp_context=multiprocessing.get_context("spawn"))
+            try:
+                with ThreadPoolExecutor(max_workers=orchestrators, thread_name_prefix="batch") as threads:
+                    futures = [threads.submit(self._convert_one, pdf_path, output_path, cpu_pool)
+                               for pdf_path, output_path in pending.items()]
+                    for future in as_completed(futures):
+                        results.append(future.result())
+            finally:
+                if cpu_pool is not self.cpu_pool:
+                    cpu_pool.shutdown(wait=True)
+
+        summary = self._summarize(results, time.perf_counter() - started)
+        self._emit("batch_finished", {key: value for key, value in summary.items() if key != "documents"})
+        return summary
+
+    def _reserve_memory(self, pdf_path):
+        if self.memory_budget is None:
+            return contextlib.nullcontext()
+        return self.memory_budget.reserve(conversion_memory(pdf_path))
+
+    def _convert_one(self, pdf_path, output_path, cpu_pool):
+        # One job id per document, also used by the worker processes
+        with job_context(uuid.uuid4().hex):
+            return self._convert_document(pdf_path, output_path, cpu_pool)
+
+    def _convert_document(self, pdf_path, output_path, cpu_pool):
+        name = os.path.basename(pdf_path)
+        started = time.perf_counter()
+        self._emit("document_started", {"pdf": name})
+        try:
+            with self._reserve_memory(pdf_path):
+                os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+                extracted = cpu_pool.submit(_extract_document, pdf_path, self.model_name, self.theme,
+                                            self.artifact_root, job_id_var.get()).result()
+                text = extracted["text"]
+                if not text or len(text.strip()) < 10:
+                    raise ValueError("Insufficient text for processing")
+
+                pipeline = ConversionPipeline(model_name=self.model_name, theme=self.theme,
+                                              artifact_store=ArtifactStore(self.artifact_root))
+                pipeline.document_key = extracted["document_key"]
+                document_name = os.path.splitext(name)[0]
+
+                with self._llm_slots:
+                    cleaned_text, document_structure = pipeline.structure(text, document_name, extracted["skeleton"])
+                    document_structure = pipeline.associate(document_structure, cleaned_text, extracted["image_data"])
+
+                render_timings = cpu_pool.submit(_render_document, pdf_path, document_structure,
+                                                 extracted["image_data"], output_path, self.model_name,
+                                                 self.theme, job_id_var.get()).result()
+
+                timings = {**extracted["timings"], **pipeline.stage_timings, **render_timings}
+                result = {"pdf": pdf_path, "output": output_path, "status": "converted",
+                          "pages": extracted["pages"], "seconds": time.perf_counter() - started,
+                          "timings": timings}
+            self._emit("document_finished", {"pdf": name, "seconds": round(result["seconds"], 3)})
+        except Exception as e:
+            logger.error("Error converting %s: %s", pdf_path, e)
+            result = {"pdf": pdf_path, "output": output_path, "status": "failed", "error": str(e),
+                      "seconds": time.perf_counter() - started}
+            self._emit("document_failed", {"pdf": name, "error": str(e)})
+        return result
+
+    def _summarize(self, results, elapsed):
+        converted = [r for r in results if r["status"] == "converted"]
+        pages = sum(r.get("pages", 0) for r in converted)
+
+        stage_totals = {}
+        for result in converted:
+            for stage, seconds in result["timings"].items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+        return {
+            "documents": results,
+            "converted": len(converted),
+            "skipped": sum(1 for r in results if r["status"] == "skipped"),
+            "failed": sum(1 for r in results if r["status"] == "failed"),
+            "pages": pages,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_minute": round(len(converted) / elapsed * 60, 2) if elapsed else 0.0,
+            "pages_per_minute": round(pages / elapsed * 60, 2) if elapsed else 0.0,
+            "stage_seconds": {stage: round(seconds, 3) for stage, seconds in stage_totals.items()}
+        }
+
+
+def print_summary(summary):
+    print(f"Converted: {summary['converted']}  Skipped: {summary['skipped']}  Failed: {summary['failed']}")
+    print(f"Elapsed: {summary['elapsed_seconds']:.1f}s  "
+          f"Throughput: {summary['documents_per_minute']:.2f} documents/min, "
+          f"{summary['pages_per_minute']:.1f} pages/min")
+    for stage, seconds in summary["stage_seconds"].items():
+        print(f"  {stage:<15} {seconds:8.2f}s total")
+    for result in summary["documents"]:
+        if result["status"] == "failed":
+            print(f"  FAILED {result['pdf']}: {result['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert every PDF in a directory into a PowerPoint presentation.")
+    parser.add_argument("input_dir", help="Directory with the PDF files")
+    parser.add_argument("-o", "--output-dir", help="Where to write the presentations (default: input directory)")
+    parser.add_argument("--model", default="llama3", help="Ollama model name")
+    parser.add_argument("--theme", default="default", choices=["default", "corporate", "minimal"])
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for extraction and rendering")
+    parser.add_argument("--llm-concurrency", type=int, default=1, help="Maximum simultaneous LLM calls")
+    parser.add_argument("--artifacts", default="artifacts", help="Artifact store directory")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    parser.add_argument("--force", action="store_true", help="Convert again even if the output already exists")
+    args = parser.parse_args(argv)
+
+    converter = BatchConverter(model_name=args.model, theme=args.theme, workers=args.workers,
+                               llm_concurrency=args.llm_concurrency, artifact_root=args.artifacts,
+                               force=args.force)
+    summary = converter.convert_directory(args.input_dir, args.output_dir or args.input_dir,
+                                          recursive=not args.no_recursive)
+    print_summary(summary)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,217 @@
+import argparse
+import copy
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import fitz
+
+from image_assignment import assign_images
+from image_association import TfidfImageAssociator
+from image_extractor import ImageExtractor
+from outline import extract_skeleton
+from pipeline import FAST_MODE, create_fallback_structure, normalize_document_structure, pdf_to_pptx_with_ollama
+from ppt_generator import PdfToPptxConverter
+from readPDF import PdfExtractor
+from synthetic_pdfs import CORPUS_CLASSES, build_corpus
+
+logger = logging.getLogger(__name__)
+
+# Results format; bump when stage names or fields change meaning
+RESULTS_VERSION = 1
+# A stage is a regression when its median grows by more than the threshold and by more than the noise floor
+DEFAULT_THRESHOLD = 0.2
+NOISE_FLOOR_SECONDS = 0.005
+
+
+def measure(function, repeat, setup=None):
+    """
+    Calls `function` `repeat` times; `setup` returns its arguments and runs outside the timing.
+
+    Returns:
+        tuple: (list of wall times in seconds, result of the last call)
+    """
+    runs = []
+    result = None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        started = time.perf_counter()
+        result = function(*args)
+        runs.append(time.perf_counter() - started)
+    return runs, result
+
+
+def _result(corpus, stage, pages, runs, **extra):
+    return dict({
+        "corpus": corpus,
+        "stage": stage,
+        "pages": pages,
+        "runs": [round(run, 6) for run in runs],
+        "min": round(min(runs), 6),
+        "median": round(statistics.median(runs), 6),
+        "ms_per_page": round(statistics.median(runs) / max(pages, 1) * 1000, 4),
+    }, **extra)
+
+
+def benchmark_document(corpus, pdf_path, repeat=3, work_dir=None):
+    """
+    Times every local stage of the pipeline on one PDF, each on its own, with the output of the
+    previous stage as input: the text extraction engines, the outline reader, image extraction
+    and downscaling, the heuristics of pipeline.py, image association and assignment, rendering, and
+    a whole conversion in fast mode.
+
+    Returns:
+        list: One result dict per stage
+    """
+    with fitz.open(pdf_path) as pdf_document:
+        pages = pdf_document.page_count
+    work_dir = work_dir or tempfile.mkdtemp(prefix="pdf2pptx-bench-")
+    results = []
+
+    def record(stage, function, setup=None, **extra):
+        runs, output = measure(function, repeat, setup)
+        results.append(_result(corpus, stage, pages, runs, **extra))
+        logger.info("%s %-22s median %.4fs", corpus, stage, results[-1]["median"])
+        return output
+
+    record("extract.pypdf2", lambda: PdfExtractor.extract_with_pypdf2(pdf_path))
+    text = record("extract.pdfminer", lambda: PdfExtractor.extract_with_pdfminer(pdf_path))
+    page_texts = record("extract.pymupdf_pages", lambda: PdfExtractor.extract_page_texts(pdf_path))
+    record("outline", lambda: extract_skeleton(pdf_path))
+
+    def image_folder():
+        folder = os.path.join(work_dir, "images")
+        shutil.rmtree(folder, ignore_errors=True)
+        return (folder,)
+
+    image_data = record("images.extract", lambda folder: ImageExtractor.extract_images_from_pdf(pdf_path, folder),
+                        setup=image_folder)
+    record("images.optimize", lambda images: ImageExtractor.optimize_images(images),
+           setup=lambda: (copy.deepcopy(image_data),), images=len(image_data))
+
+    document_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    structure = record("heuristics.segment", lambda: create_fallback_structure(text, document_name))
+    structure = record("heuristics.normalize", lambda: normalize_document_structure(structure, document_name, text),
+                       sections=len(structure["sections"]))
+    if image_data:
+        structure = record("associate.local",
+                           lambda s: TfidfImageAssociator().associate_images(s, text, image_data),
+                           setup=lambda: (copy.deepcopy(structure),))
+        structure = record("assign_images", lambda s: assign_images(s, image_data, page_texts),
+                           setup=lambda: (copy.deepcopy(structure),))
+
+    def render(output):
+        PdfToPptxConverter(output, theme="default").create_presentation(structure, image_data)
+        return output.getbuffer().nbytes
+
+    record("render", render, setup=lambda: (io.BytesIO(),))
+    record("fast_mode", lambda output: pdf_to_pptx_with_ollama(pdf_path=pdf_path, output_file=output,
+                                                           model_name=FAST_MODE),
+           setup=lambda: (io.BytesIO(),))
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(corpus_dir, classes=None, repeat=3, seed=0):
+    """Builds (or reuses) the synthetic corpus and benchmarks every document of it."""
+    corpus = build_corpus(corpus_dir, classes, seed=seed)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pdf2pptx-bench-") as work_dir:
+        for name, pdf_path in corpus.items():
+            results.extend(benchmark_document(name, pdf_path, repeat=repeat, work_dir=work_dir))
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def compare_results(previous, current, threshold=DEFAULT_THRESHOLD, noise_floor=NOISE_FLOOR_SECONDS):
+    """
+    Stages whose median got slower than in `previous` by more than `threshold` (a fraction) and
+    by more than `noise_floor` seconds. Stages missing from either run are not compared.
+
+    Returns:
+        list: {"corpus", "stage", "previous", "current", "change"} per regression
+    """
+    before = {(r["corpus"], r["stage"]): r["median"] for r in previous.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        old = before.get((result["corpus"], result["stage"]))
+        if old is None:
+            continue
+        new = result["median"]
+        if new - old > noise_floor and new > old * (1 + threshold):
+            regressions.append({"corpus": result["corpus"], "stage": result["stage"], "previous": old,
+                                "current": new, "change": round(new / old - 1, 4) if old else None})
+    return regressions
+
+
+def print_results(report, regressions=(), out=None):
+    out = out or sys.stdout
+    slower = {(r["corpus"], r["stage"]) for r in regressions}
+    print(f"{'corpus':<12} {'stage':<22} {'median s':>10} {'min s':>10} {'ms/page':>9}", file=out)
+    for r in report["results"]:
+        flag = "  REGRESSION" if (r["corpus"], r["stage"]) in slower else ""
+        print(f"{r['corpus']:<12} {r['stage']:<22} {r['median']:>10.4f} {r['min']:>10.4f} {r['ms_per_page']:>9.3f}{flag}",
+              file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time every local pipeline stage on synthetic PDFs.")
+    parser.add_argument("--classes", default=",".join(CORPUS_CLASSES),
+                        help=f"Comma separated corpus classes ({', '.join(CORPUS_CLASSES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the median is compared")
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "pdf2pptx-corpus"),
+                        help="Where the synthetic PDFs are written and reused from")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic documents")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="Results of an earlier run; exit with 1 when a stage got slower")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown of a median as a fraction (default 0.2)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every stage while it runs")
+    args = parser.parse_args(argv)
+    # Stage modules log per call, which would drown the table
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+
+    classes = [name.strip() for name in args.classes.split(",") if name.strip()]
+    report = run_benchmarks(args.corpus_dir, classes, repeat=args.repeat, seed=args.seed)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare_results(json.load(f), report, threshold=args.threshold)
+        report["compared_with"] = {"file": args.compare, "threshold": args.threshold, "regressions": regressions}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_results(report, regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+from segmenter import condense_text, segment_document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODELS = ("llama3", "llama3.2:1b", "llama3:8b", "deepseek-r1:14b", "gemma3:12b")
+# Roughly how many characters make one token of English text
+CHARS_PER_TOKEN = 4
+_TOKEN = re.compile(r"\s*\S+")
+
+
+class LatencyModel:
+    """
+    Time to answer a request: a fixed load time, then the prompt at `prompt_tokens_per_second`
+    and every generated token at `tokens_per_second`. `jitter` (a fraction) varies both rates;
+    it is derived from the prompt, so the same request always takes the same time.
+    """
+
+    def __init__(self, tokens_per_second=40.0, prompt_tokens_per_second=800.0, load_seconds=0.0, jitter=0.0):
+        self.tokens_per_second = tokens_per_second
+        self.prompt_tokens_per_second = prompt_tokens_per_second
+        self.load_seconds = load_seconds
+        self.jitter = jitter
+
+    def _factor(self, prompt):
+        if not self.jitter:
+            return 1.0
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return 1.0 + self.jitter * (digest[0] / 127.5 - 1.0)
+
+    def prompt_seconds(self, prompt, prompt_tokens):
+        if not self.prompt_tokens_per_second:
+            return self.load_seconds
+        return self.load_seconds + prompt_tokens / self.prompt_tokens_per_second * self._factor(prompt)
+
+    def token_seconds(self, prompt):
+        if not self.tokens_per_second:
+            return 0.0
+        return 1.0 / self.tokens_per_second * self._factor(prompt[::-1])
+
+
+def _section(prompt, start, end):
+    match = re.search(re.escape(start) + r"\s*([\s\S]*?)\s*" + re.escape(end), prompt)
+    return match.group(1) if match else ""
+
+
+def canned_answer(prompt):
+    """
+    The answer the pipeline expects for one of OllamaProcessor's prompts: cleaning echoes the
+    text, structure analysis returns the heuristic segmentation of the document, condensation
+    returns a JSON array of bullets and image association returns no picks.
+    """
+    if "Please clean and structure" in prompt:
+        return _section(prompt, "TEXT:", "Return ONLY the cleaned")
+    if "transform it into a structure optimized for a slide presentation" in prompt:
+        structure = segment_document(_section(prompt, "DOCUMENT:", "Return a JSON object"), "Document")
+        return "```json\n" + json.dumps(structure, indent=2) + "\n```"
+    if "slide bullet points" in prompt:
+        text = _section(prompt, "SECTION:", "Return ONLY a JSON array")
+        return json.dumps(condense_text(text.split("\n", 1)[-1]) or ["Key point"])
+    if "AVAILABLE IMAGES" in prompt:
+        return json.dumps({"sections": []})
+    return "This is a response from the local Ollama stand-in."
+
+
+def schema_instance(schema):
+    """Smallest value that satisfies a JSON schema (the subset Ollama structured output uses)."""
+    if not isinstance(schema, dict):
+        return {}
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    for combinator in ("anyOf", "oneOf", "allOf"):
+        if schema.get(combinator):
+            return schema_instance(schema[combinator][0])
+
+    kind = schema.get("type", "object")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {name: schema_instance(properties[name])
+                for name in schema.get("required", properties.keys()) if name in properties}
+    if kind == "array":
+        return [schema_instance(schema.get("items", {}))] * max(1, schema.get("minItems", 1))
+    if kind == "string":
+        return "x" * schema.get("minLength", 0) or "example"
+    if kind == "integer":
+        return int(schema.get("minimum", 0))
+    if kind == "number":
+        return float(schema.get("minimum", 0))
+    if kind == "boolean":
+        return False
+    return None
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _json_answer(prompt):
+    """The canned answer as bare JSON, for requests with format "json"."""
+    answer = canned_answer(prompt)
+    fenced = re.search(r"```json\s*([\s\S]*?)\s*```", answer)
+    answer = fenced.group(1) if fenced else answer
+    try:
+        json.loads(answer)
+        return answer
+    except ValueError:
+        return "{}"
+
+
+def create_app(latency=None, models=DEFAULT_MODELS, num_parallel=4):
+    """
+    Deterministic stand-in for an Ollama server, for benchmarks and load tests without a GPU.
+
+    Implements /api/chat (streamed and not), /api/tags, /api/ps and structured output ("format").
+    Answers are canned but schema-valid; a model is listed as loaded once it has answered. At most
+    `num_parallel` requests generate at once, like OLLAMA_NUM_PARALLEL; the others wait for a
+    slot. Run it with
+
+        python fake_ollama.py --port 11434 --tokens-per-second 40
+
+    and point the application at it with OLLAMA_HOST=http://127.0.0.1:11434.
+    """
+    app = Flask(__name__)
+    latency = latency or LatencyModel()
+    slots = threading.BoundedSemaphore(num_parallel)
+    loaded = {}
+
+    @app.route("/api/tags")
+    def tags():
+        return jsonify({"models": [{
+            "name": name,
+            "model": name,
+            "modified_at": "2024-01-01T00:00:00Z",
+            "size": 4_000_000_000,
+            "digest": hashlib.sha256(name.encode()).hexdigest(),
+            "details": {"format": "gguf", "family": name.split(":")[0], "parameter_size": "8B",
+                        "quantization_level": "Q4_0"}
+        } for name in models]})
+
+    @app.route("/api/ps")
+    def running():
+        return jsonify({"models": [{
+            "name": name,
+            "model": name,
+            "size": 4_000_000_000,
+            "size_vram": 4_000_000_000,
+            "digest": hashlib.sha256(name.encode()).hexdigest(),
+            "expires_at": expires_at,
+            "details": {"format": "gguf", "family": name.split(":")[0]}
+        } for name, expires_at in sorted(loaded.items())]})
+
+    @app.route("/api/version")
+    def version():
+        return jsonify({"version": "0.0.0-fake"})
+
+    @app.route("/api/chat", methods=["POST"])
+    def chat():
+        body = request.get_json(force=True, silent=True) or {}
+        model = body.get("model")
+        if model not in models:
+            return jsonify({"error": f"model '{model}' not found"}), 404
+
+        loaded[model] = "2099-01-01T00:00:00Z"
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        output_format = body.get("format")
+        if isinstance(output_format, dict):
+            answer = json.dumps(schema_instance(output_format))
+        elif output_format == "json":
+            answer = _json_answer(prompt)
+        else:
+            answer = canned_answer(prompt)
+
+        tokens = _TOKEN.findall(answer) or [""]
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        prompt_seconds = latency.prompt_seconds(prompt, prompt_tokens)
+        token_seconds = latency.token_seconds(prompt)
+
+        def stats(started, generation_started):
+            finished = time.perf_counter()
+            return {
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int((finished - started) * 1e9),
+                "load_duration": int(latency.load_seconds * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int((generation_started - started) * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int((finished - generation_started) * 1e9),
+            }
+
+        def generate():
+            # Holding a slot for the whole answer is what makes extra requests queue
+            with slots:
+                started = time.perf_counter()
+                time.sleep(prompt_seconds)
+                generation_started = time.perf_counter()
+                for token in tokens:
+                    time.sleep(token_seconds)
+                    yield token, started, generation_started
+
+        if body.get("stream", True):
+            def stream():
+                started = generation_started = time.perf_counter()
+                for token, started, generation_started in generate():
+                    yield json.dumps({"model": model, "created_at": _timestamp(),
+                                      "message": {"role": "assistant", "content": token}, "done": False}) + "\n"
+                yield json.dumps(dict({"model": model, "created_at": _timestamp(),
+                                       "message": {"role": "assistant", "content": ""}},
+                                      **stats(started, generation_started))) + "\n"
+
+            return Response(stream(), mimetype="application/x-ndjson")
+
+        started = generation_started = time.perf_counter()
+        for _, started, generation_started in generate():
+            pass
+        return jsonify(dict({"model": model, "created_at": _timestamp(),
+                             "message": {"role": "assistant", "content": "".join(tokens)}},
+                            **stats(started, generation_started)))
+
+    return app
+
+
+class FakeOllamaServer:
+    """Runs the stand-in on a background thread; `url` is what OLLAMA_HOST or ollama.Client(host=...) needs."""
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        self.app = create_app(**options)
+        self._server = make_server(host, port, self.app, threaded=True)
+        self.url = f"http://{host}:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a deterministic local stand-in for the Ollama API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Generation speed")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=800.0, help="Prompt processing speed")
+    parser.add_argument("--load-seconds", type=float, default=0.0, help="Fixed delay before every answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Deterministic +/- fraction applied to the rates")
+    parser.add_argument("--num-parallel", type=int, default=4, help="Requests generating at the same time")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS), help="Comma separated model names")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    latency = LatencyModel(args.tokens_per_second, args.prompt_tokens_per_second, args.load_seconds, args.jitter)
+    app = create_app(latency, models=tuple(args.models.split(",")), num_parallel=args.num_parallel)
+    logger.info("Ollama stand-in listening on http://%s:%d", args.host, args.port)
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
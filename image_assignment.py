@@ -0,0 +1,159 @@
+import bisect
+import logging
+import math
+import re
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_BULLET_PREFIX = re.compile(r"^[\s•\-*·]+")
+
+# Words taken from the start of a bullet to look it up in the page text
+PROBE_WORDS = 6
+# Pages after the previous section start searched for the next one; at least this many, or four
+# times the average section length, so a missing probe never scans the rest of the document
+SEARCH_PAGES = 10
+
+
+def _normalize(text):
+    return _WHITESPACE.sub(" ", text or "").strip().lower()
+
+
+def _probes(section):
+    """Short strings that identify where a section starts in the document text."""
+    probes = []
+    title = _normalize(section.get("title"))
+    if title:
+        probes.append(title)
+    for point in section.get("content") or []:
+        if isinstance(point, str):
+            words = _normalize(_BULLET_PREFIX.sub("", point)).split(" ")
+            if len(words) >= 3:
+                probes.append(" ".join(words[:PROBE_WORDS]))
+    return probes
+
+
+def locate_section_pages(sections, page_texts):
+    """
+    Records the page span of every section without one as "page_start"/"page_end" (0-based,
+    inclusive); spans already known, e.g. from the PDF outline, are kept and anchor the others.
+
+    Sections are looked up in document order, each in a window of pages after the start of the
+    previous one (see SEARCH_PAGES), so a section always starts at or after the previous one and
+    the document is scanned about once. Sections that cannot be found share the start page of the
+    previous section. A section ends on the page where the next one starts.
+
+    Returns:
+        list: The same sections, updated in place
+    """
+    if not sections or not page_texts:
+        return sections
+
+    normalized_pages = [_normalize(text) for text in page_texts]
+    page_offsets = []
+    offset = 0
+    for text in normalized_pages:
+        page_offsets.append(offset)
+        offset += len(text) + 1
+    full_text = "\n".join(normalized_pages)
+    last_page = len(page_texts) - 1
+    window = max(SEARCH_PAGES, math.ceil(4 * len(page_texts) / len(sections)))
+
+    cursor = 0
+    starts = []
+    for section in sections:
+        page = bisect.bisect_right(page_offsets, cursor) - 1
+        known = section.get("page_start")
+        if known is not None and 0 <= known <= last_page:
+            if known >= page:
+                cursor = page_offsets[known]
+            starts.append(known)
+            continue
+        end = page_offsets[page + window + 1] if page + window + 1 <= last_page else len(full_text)
+        found = -1
+        for probe in _probes(section):
+            position = full_text.find(probe, cursor, end)
+            if position != -1 and (found == -1 or position < found):
+                found = position
+        if found != -1:
+            cursor = found
+        starts.append(bisect.bisect_right(page_offsets, cursor) - 1)
+
+    for i, section in enumerate(sections):
+        if section.get("page_start") is None or section.get("page_end") is None:
+            section["page_start"] = starts[i]
+            section["page_end"] = max(starts[i], starts[i + 1]) if i + 1 < len(sections) else last_page
+    return sections
+
+
+class PageImageIndex:
+    """Unused images of each page, largest first, so every image is handed out at most once."""
+
+    def __init__(self, image_data):
+        by_page = {}
+        for index, image in enumerate(image_data or []):
+            if isinstance(image, dict) and image.get("page_num") is not None:
+                by_page.setdefault(image["page_num"], []).append(index)
+
+        def area(index):
+            image = image_data[index]
+            return (image.get("width") or 0) * (image.get("height") or 0)
+
+        self._pages = {page: deque(sorted(indices, key=area, reverse=True)) for page, indices in by_page.items()}
+        self.used = set()
+
+    def take(self, index):
+        """Marks an explicitly chosen image as used; False if it was already taken."""
+        if index in self.used:
+            return False
+        self.used.add(index)
+        return True
+
+    def take_from_pages(self, first_page, last_page):
+        """First unused image on the pages of a span, or None."""
+        for page in range(first_page, last_page + 1):
+            queue = self._pages.get(page)
+            while queue:
+                index = queue.popleft()
+                if index not in self.used:
+                    self.used.add(index)
+                    return index
+        return None
+
+
+def assign_images(document_structure, image_data, page_texts=None):
+    """
+    Gives every section at most one image and every image to at most one section.
+
+    Images picked by the model (image_info.relevant_images) are kept when still unused; other
+    sections get the largest unused image on the pages they span. Sections without a match keep
+    has_images False and are rendered as text-only slides.
+    """
+    sections = document_structure.get("sections", [])
+    # Sections read from the PDF outline already know their pages and keep them
+    if page_texts and any(section.get("page_start") is None for section in sections):
+        locate_section_pages(sections, page_texts)
+
+    index = PageImageIndex(image_data)
+    chosen = [None] * len(sections)
+
+    # Model picks first, so a page-based pick never takes an image another section asked for
+    for i, section in enumerate(sections):
+        for candidate in (section.get("image_info") or {}).get("relevant_images") or []:
+            if isinstance(candidate, int) and 0 <= candidate < len(image_data) and index.take(candidate):
+                chosen[i] = candidate
+                break
+
+    for i, section in enumerate(sections):
+        if chosen[i] is None and section.get("page_start") is not None:
+            chosen[i] = index.take_from_pages(section["page_start"], section["page_end"])
+
+        image_info = dict(section.get("image_info") or {})
+        image_info["relevant_images"] = [chosen[i]] if chosen[i] is not None else []
+        section["image_info"] = image_info
+        section["has_images"] = chosen[i] is not None
+
+    logger.info("Assigned %d of %d images to %d sections",
+                sum(1 for image in chosen if image is not None), len(image_data or []), len(sections))
+    return document_structure
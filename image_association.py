@@ -0,0 +1,177 @@
+import itertools
+import logging
+import math
+import re
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]{2,}")
+FIGURE_REFERENCE = re.compile(r"\b(fig(?:ure)?|table|chart|graph|diagram|image|plate)s?\.?\s*(\d+(?:\.\d+)*)",
+                              re.IGNORECASE)
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were which with
+will not but can also these those their there than then into such more most other some our we you they
+""".split())
+
+# Figure references ("Figure 3", "Fig. 3") are counted this many times, they are the strongest signal
+REFERENCE_WEIGHT = 3
+TITLE_WEIGHT = 2
+CAPTION_WEIGHT = 2
+
+
+def tokenize(text):
+    """Lower-case word tokens without stop words, plus one token per figure reference ("fig_3")."""
+    text = (text or "").lower()
+    tokens = [token for token in TOKEN_PATTERN.findall(text) if token not in STOP_WORDS]
+    for kind, number in FIGURE_REFERENCE.findall(text):
+        kind = "fig" if kind.startswith("fig") else kind
+        tokens.extend([f"{kind}_{number}"] * REFERENCE_WEIGHT)
+    return tokens
+
+
+def tfidf_similarity(first_docs, second_docs):
+    """
+    Cosine similarity of the TF-IDF vectors of two groups of token lists.
+
+    Term frequencies are counted with NumPy over (document, term) pairs; only the terms that
+    appear in both groups are materialized, so the dense product stays small.
+
+    Returns:
+        numpy.ndarray: len(first_docs) x len(second_docs) similarity matrix
+    """
+    docs = list(first_docs) + list(second_docs)
+    split = len(first_docs)
+    result = np.zeros((len(first_docs), len(second_docs)), dtype=np.float64)
+    if not first_docs or not second_docs:
+        return result
+
+    lengths = [len(tokens) for tokens in docs]
+    if not sum(lengths):
+        return result
+    all_tokens = np.array(list(itertools.chain.from_iterable(docs)))
+    vocabulary, token_ids = np.unique(all_tokens, return_inverse=True)
+    vocabulary_size = len(vocabulary)
+    doc_of_token = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+
+    pairs, term_counts = np.unique(doc_of_token * vocabulary_size + token_ids.ravel(), return_counts=True)
+    doc_ids = pairs // vocabulary_size
+    term_ids = pairs % vocabulary_size
+
+    document_frequency = np.bincount(term_ids, minlength=vocabulary_size)
+    idf = np.log((1 + len(docs)) / (1 + document_frequency)) + 1.0
+    weights = (1.0 + np.log(term_counts)) * idf[term_ids]
+
+    norms = np.sqrt(np.bincount(doc_ids, weights=weights ** 2, minlength=len(docs)))
+    weights = weights / np.where(norms[doc_ids] > 0, norms[doc_ids], 1.0)
+
+    # Terms present on both sides are the only ones contributing to the dot products
+    in_first = np.bincount(term_ids[doc_ids < split], minlength=vocabulary_size) > 0
+    in_second = np.bincount(term_ids[doc_ids >= split], minlength=vocabulary_size) > 0
+    shared = in_first & in_second
+    if not shared.any():
+        return result
+    column = np.cumsum(shared) - 1
+
+    keep = shared[term_ids]
+    doc_ids, term_ids, weights = doc_ids[keep], term_ids[keep], weights[keep]
+    first = doc_ids < split
+
+    first_matrix = np.zeros((split, int(shared.sum())))
+    first_matrix[doc_ids[first], column[term_ids[first]]] = weights[first]
+    second_matrix = np.zeros((len(docs) - split, int(shared.sum())))
+    second_matrix[doc_ids[~first] - split, column[term_ids[~first]]] = weights[~first]
+
+    return first_matrix @ second_matrix.T
+
+
+def greedy_assignment(similarity, min_score):
+    """
+    Pairs rows with columns by decreasing score, each row and column used at most once.
+
+    Returns:
+        dict: row index -> (column index, score)
+    """
+    pairs = {}
+    if similarity.size == 0:
+        return pairs
+
+    flat = similarity.ravel()
+    # Only pairs above the threshold can be chosen, so only those are sorted
+    candidates = np.flatnonzero(flat >= min_score)
+    order = candidates[np.argsort(-flat[candidates], kind="stable")]
+    used_columns = set()
+    limit = min(similarity.shape)
+    columns = similarity.shape[1]
+
+    for position in order:
+        score = flat[position]
+        if len(pairs) == limit:
+            break
+        row, column = divmod(int(position), columns)
+        if row in pairs or column in used_columns:
+            continue
+        pairs[row] = (column, float(score))
+        used_columns.add(column)
+    return pairs
+
+
+class TfidfImageAssociator:
+    """
+    Associates images with sections locally: the caption and text around each image are scored
+    against every section with TF-IDF cosine similarity, then each image goes to at most one section.
+    Drop-in replacement for OllamaProcessor.associate_images.
+    """
+
+    def __init__(self, min_score=0.08):
+        self.min_score = min_score
+
+    @staticmethod
+    def section_tokens(section):
+        content = " \n".join(point for point in section.get("content") or [] if isinstance(point, str))
+        return tokenize(section.get("title")) * TITLE_WEIGHT + tokenize(content)
+
+    @staticmethod
+    def image_tokens(image):
+        if not isinstance(image, dict):
+            return []
+        return tokenize(image.get("caption")) * CAPTION_WEIGHT + tokenize(image.get("context"))
+
+    def associate_images(self, doc_structure, text, image_data):
+        """
+        Args:
+            doc_structure (dict): Document structure returned by analyze_document_structure
+            text (str): The document text (unused, kept for interface compatibility)
+            image_data (list): Extracted images, with "caption" and "context" when available
+
+        Returns:
+            dict: The same structure with "image_info"/"has_images" set on its sections
+        """
+        if not image_data or not isinstance(image_data, list):
+            return doc_structure
+
+        started = time.perf_counter()
+        sections = doc_structure.get("sections", [])
+        similarity = tfidf_similarity([self.section_tokens(section) for section in sections],
+                                      [self.image_tokens(image) for image in image_data])
+        pairs = greedy_assignment(similarity, self.min_score)
+
+        for index, section in enumerate(sections):
+            if index in pairs:
+                image_index, score = pairs[index]
+                caption = image_data[image_index].get("caption") if isinstance(image_data[image_index], dict) else ""
+                section["image_info"] = {
+                    "relevant_images": [image_index],
+                    "image_references": [caption] if caption else [],
+                    "presentation_style": "side-by-side",
+                    "score": round(score, 4) if math.isfinite(score) else 0.0
+                }
+                section["has_images"] = True
+            else:
+                section["has_images"] = False
+
+        logger.info("Associated %d of %d images locally in %.1fms", len(pairs), len(image_data),
+                    (time.perf_counter() - started) * 1000)
+        return doc_structure
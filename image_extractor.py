@@ -1,26 +1,81 @@
 import fitz  # PyMuPDF
 import io
+import logging
 import os
+import re
 from PIL import Image
 
+logger = logging.getLogger(__name__)
+
+CAPTION_PATTERN = re.compile(r"^\s*(fig(ure)?|table|chart|graph|diagram|image|plate)\.?\s*\d+", re.IGNORECASE)
+# Characters of nearby page text kept per image, closest blocks first
+CONTEXT_CHARS = 800
+
 
 class ImageExtractor:
     @staticmethod
-    def extract_images_from_pdf(pdf_path, output_folder=None):
-        """Extracts images from a PDF with page metadata"""
+    def image_context(page_blocks, image_rects):
+        """
+        Caption and surrounding text of an image, from the page's text blocks.
+
+        Args:
+            page_blocks (list): page.get_text("blocks") tuples (x0, y0, x1, y1, text, block_no, block_type)
+            image_rects (list): Rectangles where the image is drawn on the page
+
+        Returns:
+            tuple: (caption, context); the caption is the closest "Figure N"-style block
+        """
+        text_blocks = [block for block in page_blocks if len(block) > 6 and block[6] == 0 and block[4].strip()]
+        if not text_blocks:
+            return "", ""
+
+        def distance(block):
+            if not image_rects:
+                return 0.0
+            rect = image_rects[0]
+            # Vertical gap to the image; captions below the image win ties
+            if block[1] >= rect[3]:
+                return block[1] - rect[3]
+            if block[3] <= rect[1]:
+                return rect[1] - block[3] + 0.5
+            return 0.0
+
+        ordered = sorted(text_blocks, key=distance)
+        caption = next((" ".join(block[4].split()) for block in ordered if CAPTION_PATTERN.match(block[4])), "")
+
+        context = []
+        length = 0
+        for block in ordered:
+            text = " ".join(block[4].split())
+            context.append(text)
+            length += len(text)
+            if length >= CONTEXT_CHARS:
+                break
+        return caption, " ".join(context)[:CONTEXT_CHARS]
+
+    @staticmethod
+    def extract_images_from_pdf(pdf_path, output_folder=None, pages=None):
+        """Extracts images from a PDF with page metadata; `pages` (0-based numbers) limits it to those pages."""
         if output_folder is None:
             base_name = os.path.splitext(os.path.basename(pdf_path))[0]
             output_folder = f"temp_images_{base_name}"
 
         os.makedirs(output_folder, exist_ok=True)
 
-        image_data = []  # List with {path, page_num, width, height}
+        image_data = []  # List with {path, page_num, width, height, caption, context}
 
         try:
             pdf_document = fitz.open(pdf_path)
+        except Exception as e:
+            logger.error("Error extracting images from PDF: %s", e)
+            return []
 
-            for page_num, page in enumerate(pdf_document):
+        try:
+            selected = enumerate(pdf_document) if pages is None else \
+                ((page_num, pdf_document[page_num]) for page_num in sorted(pages))
+            for page_num, page in selected:
                 image_list = page.get_images(full=True)
+                page_blocks = None
 
                 for img_index, img_info in enumerate(image_list):
                     xref = img_info[0]
@@ -33,6 +88,8 @@ class ImageExtractor:
                         try:
                             img = Image.open(io.BytesIO(image_bytes))
                             width, height = img.size
+                            # Only the header was read, the pixels are never decoded
+                            img.close()
 
                             # Filter very small images
                             if width < 150 or height < 150:
@@ -47,16 +104,32 @@ class ImageExtractor:
                             with open(image_filename, "wb") as f:
                                 f.write(image_bytes)
 
+                            # Text around the image, read once per page, used to match it with sections
+                            caption, context = "", ""
+                            try:
+                                if page_blocks is None:
+                                    page_blocks = list(page.get_text("blocks"))
+                                caption, context = ImageExtractor.image_context(
+                                    page_blocks, [tuple(rect) for rect in page.get_image_rects(xref)])
+                            except Exception as e:
+                                logger.debug("Error reading text around image: %s", e)
+
                             # Store image metadata for later association
                             image_data.append({
                                 "path": image_filename,
                                 "page_num": page_num,
                                 "width": width,
                                 "height": height,
-                                "size": width * height  # for size sorting
+                                "size": width * height,  # for size sorting
+                                "caption": caption,
+                                "context": context
                             })
                         except Exception as e:
-                            print(f"Error processing image: {e}")
+                            logger.warning("Error processing image: %s", e)
+
+                # MuPDF keeps every decoded image in its process-wide store (up to 256 MB) even after
+                # the document is closed; emptying it per page bounds the extraction to one page of images
+                fitz.TOOLS.store_shrink(100)
 
             # Sort images by size (largest first)
             image_data.sort(key=lambda x: x["size"], reverse=True)
@@ -64,5 +137,33 @@ class ImageExtractor:
             return image_data
 
         except Exception as e:
-            print(f"Error extracting images from PDF: {e}")
-            return []
\ No newline at end of file
+            logger.error("Error extracting images from PDF: %s", e)
+            return []
+        finally:
+            pdf_document.close()
+
+    @staticmethod
+    def optimize_images(image_data, max_dimension=1600):
+        """
+        Downscales images larger than max_dimension in place so they are cheaper to embed.
+        Page metadata is kept; width, height and size are updated to the new dimensions.
+        """
+        for img_meta in image_data:
+            try:
+                with Image.open(img_meta["path"]) as img:
+                    if max(img.size) <= max_dimension:
+                        continue
+                    img_format = img.format
+                    resized = img.copy()
+
+                resized.thumbnail((max_dimension, max_dimension))
+                resized.save(img_meta["path"], format=img_format)
+                width, height = resized.size
+
+                img_meta["width"] = width
+                img_meta["height"] = height
+                img_meta["size"] = width * height
+            except Exception as e:
+                logger.warning("Error optimizing image %s: %s", img_meta.get('path'), e)
+
+        return image_data
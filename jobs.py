@@ -0,0 +1,132 @@
+import json
+import logging
+import threading
+import time
+import uuid
+
+from instrumentation import job_context
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgress:
+    """
+    Thread-safe, append-only list of progress events for one conversion job.
+    Producers call emit(); any number of consumers can replay and follow the events.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self._condition = threading.Condition()
+
+    def emit(self, event, data=None):
+        with self._condition:
+            self.events.append({
+                "id": len(self.events),
+                "event": event,
+                "time": time.time(),
+                "data": data or {}
+            })
+            if event in ("job_finished", "job_failed"):
+                self.finished = True
+            self._condition.notify_all()
+
+    def follow(self, start=0, heartbeat=15.0):
+        """
+        Yields events from index `start` as they are emitted, until the job finishes.
+        Yields None every `heartbeat` seconds without events so callers can keep the connection alive.
+        """
+        index = start
+        while True:
+            with self._condition:
+                if index >= len(self.events) and not self.finished:
+                    self._condition.wait(timeout=heartbeat)
+                pending = self.events[index:]
+                finished = self.finished
+
+            if not pending:
+                if finished:
+                    return
+                yield None
+                continue
+
+            for event in pending:
+                yield event
+            index += len(pending)
+
+
+def format_sse(event):
+    """Formats an event (or a heartbeat when None) as a Server-Sent Events message."""
+    if event is None:
+        return ": keep-alive\n\n"
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+class Job:
+
+    def __init__(self, filename):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.status = "queued"
+        self.created = time.time()
+        self.progress = JobProgress()
+        self.result = None
+        self.result_name = None
+        self.result_mimetype = None
+        self.error = None
+        # Stages that degraded to meet the job's deadline
+        self.degradations = []
+        # Bytes reserved in the memory budget while the job runs
+        self.memory_estimate = None
+
+
+class JobManager:
+    """Keeps conversion jobs in memory and runs them on background threads."""
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, filename):
+        self._prune()
+        job = Job(filename)
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def start(self, job, target):
+        """Runs target(job) on a background thread; its return value becomes the job result."""
+
+        def run():
+            with job_context(job.id):
+                job.status = "running"
+                started = time.perf_counter()
+                job.progress.emit("job_started", {"filename": job.filename})
+                try:
+                    job.result = target(job)
+                    job.status = "finished"
+                    job.progress.emit("job_finished", {"seconds": round(time.perf_counter() - started, 3)})
+                except Exception as e:
+                    logger.error("Job failed: %s", e)
+                    job.error = str(e)
+                    job.status = "failed"
+                    job.progress.emit("job_failed", {"error": job.error,
+                                                     "seconds": round(time.perf_counter() - started, 3)})
+
+        thread = threading.Thread(target=run, name=f"job-{job.id[:8]}", daemon=True)
+        thread.start()
+        return thread
+
+    def _prune(self):
+        now = time.time()
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.progress.finished and now - job.created > self.ttl]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,418 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def percentile(values, fraction):
+    """Linear interpolation between the closest ranks; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def parse_server_timing(header):
+    """Stage durations in seconds from a Server-Timing header ("extract_text;dur=12.5, render;dur=80.1")."""
+    timings = {}
+    for metric in (header or "").split(","):
+        name, _, params = metric.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                try:
+                    timings[name] = float(value) / 1000
+                except ValueError:
+                    pass
+    return timings
+
+
+def iter_sse(lines):
+    """(event, data) pairs of a Server-Sent Events stream given as text lines."""
+    event, data = None, []
+    for line in lines:
+        if not line:
+            if event or data:
+                yield event or "message", "\n".join(data)
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+
+
+class LoadTester:
+    """
+    Sends conversions to a running server and records, per request, the status, the latency and
+    the stage timings the server reported for it (Server-Timing on /convert, stage_finished
+    events on /jobs), together with the job id, so slow requests can be traced to a stage.
+
+    `documents` is a list of (name, pdf_bytes, pages); requests cycle through it. With `unique`
+    every request asks the server to convert from scratch instead of reusing cached stage results.
+    """
+
+    def __init__(self, base_url, documents, model="llama3", theme="default", api="convert", timeout=600.0,
+                 unique=True):
+        if api not in ("convert", "jobs"):
+            raise ValueError(f"Unknown API: {api}")
+        self.base_url = base_url.rstrip("/")
+        self.documents = documents
+        self.model = model
+        self.theme = theme
+        self.api = api
+        self.unique = unique
+        self.client = httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=None))
+
+    def close(self):
+        self.client.close()
+
+    def _upload(self, index):
+        name, pdf_bytes, pages = self.documents[index % len(self.documents)]
+        files = {"pdf_file": (name, pdf_bytes, "application/pdf")}
+        data = {"model": self.model, "theme": self.theme}
+        # The artifact store keys pages and model answers on their content, so changing the bytes
+        # of a repeated document would not stop them being served from it
+        if self.unique:
+            data["cache"] = "0"
+        return name, pages, files, data
+
+    def _convert(self, files, data, result):
+        response = self.client.post(f"{self.base_url}/convert", files=files, data=data)
+        result["status"] = response.status_code
+        result["job_id"] = response.headers.get("X-Job-Id")
+        result["stages"] = parse_server_timing(response.headers.get("Server-Timing"))
+        result["bytes"] = len(response.content)
+        if response.status_code != 200:
+            result["error"] = response.text[:200]
+
+    def _job(self, files, data, result):
+        response = self.client.post(f"{self.base_url}/jobs", files=files, data=data)
+        result["status"] = response.status_code
+        if response.status_code != 202:
+            result["error"] = response.text[:200]
+            return
+        job = response.json()
+        result["job_id"] = job["job_id"]
+
+        with self.client.stream("GET", self.base_url + job["events_url"]) as events:
+            for event, payload in iter_sse(events.iter_lines()):
+                payload = json.loads(payload) if payload else {}
+                if event == "stage_finished":
+                    result["stages"][payload["stage"]] = payload["seconds"]
+                elif event == "job_failed":
+                    result["error"] = payload.get("error", "job failed")
+                    break
+                elif event == "job_finished":
+                    break
+
+        response = self.client.get(self.base_url + job["result_url"])
+        result["status"] = response.status_code
+        result["bytes"] = len(response.content)
+        if response.status_code != 200:
+            result["error"] = result.get("error") or response.text[:200]
+
+    def send(self, index, scheduled=None):
+        """
+        One conversion. Latency is measured from `scheduled` (the planned arrival time) when given,
+        so time spent waiting for a free client thread counts, as it would for a real user.
+        """
+        name, pages, files, data = self._upload(index)
+        started = time.perf_counter()
+        scheduled = scheduled if scheduled is not None else started
+        result = {"index": index, "document": name, "pages": pages, "status": None, "job_id": None,
+                  "stages": {}, "error": None}
+        try:
+            (self._convert if self.api == "convert" else self._job)(files, data, result)
+        except httpx.HTTPError as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        finished = time.perf_counter()
+        result.update(start=started, client_wait=round(started - scheduled, 6), latency=round(finished - scheduled, 6))
+        return result
+
+    def run(self, concurrency=4, rate=None, requests=None, duration=None, seed=0):
+        """
+        Closed loop without `rate`: `concurrency` users each send a request as soon as their last
+        one finished. Open loop with `rate`: requests arrive as a Poisson process of `rate` per
+        second and at most `concurrency` are in flight. Stops after `requests` requests or when
+        `duration` seconds have passed, whichever comes first, and waits for those in flight.
+
+        Returns:
+            tuple: (results in order of sending, elapsed seconds)
+        """
+        if requests is None and duration is None:
+            raise ValueError("Give a number of requests or a duration")
+        counter = itertools.count()
+        started = time.perf_counter()
+        deadline = started + duration if duration else None
+        results = []
+        lock = threading.Lock()
+
+        def next_index():
+            index = next(counter)
+            if requests is not None and index >= requests:
+                return None
+            if deadline and time.perf_counter() >= deadline:
+                return None
+            return index
+
+        def record(result):
+            with lock:
+                results.append(result)
+
+        if rate is None:
+            def user():
+                while (index := next_index()) is not None:
+                    record(self.send(index))
+
+            threads = [threading.Thread(target=user, daemon=True) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        else:
+            arrivals = random.Random(seed)
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                planned = started
+                while (index := next_index()) is not None:
+                    planned += arrivals.expovariate(rate)
+                    delay = planned - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    pool.submit(lambda i=index, at=planned: record(self.send(i, at)))
+
+        elapsed = time.perf_counter() - started
+        for result in results:
+            result["start"] = round(result["start"] - started, 6)
+        results.sort(key=lambda result: result["index"])
+        return results, elapsed
+
+
+def _distribution(values):
+    summary = {f"p{int(p * 100)}": round(percentile(values, p), 4) if values else None for p in PERCENTILES}
+    summary["mean"] = round(statistics.fmean(values), 4) if values else None
+    summary["max"] = round(max(values), 4) if values else None
+    return summary
+
+
+def summarize(results, elapsed, slowest=5):
+    """Latency percentiles, throughput, error and 429 rates, and per-stage server timings."""
+    total = len(results)
+    ok = [r for r in results if r["status"] in (200, 202) and not r["error"]]
+    throttled = [r for r in results if r["status"] == 429]
+    failed = total - len(ok) - len(throttled)
+
+    stages = {}
+    for result in ok:
+        for stage, seconds in result["stages"].items():
+            stages.setdefault(stage, []).append(seconds)
+
+    return {
+        "requests": total,
+        "succeeded": len(ok),
+        "failed": failed,
+        "throttled": len(throttled),
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "throttled_rate": round(len(throttled) / total, 4) if total else 0.0,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": round(len(ok) / elapsed, 4) if elapsed else 0.0,
+        "latency_seconds": _distribution([r["latency"] for r in ok]),
+        "client_wait_seconds": _distribution([r["client_wait"] for r in results]),
+        "stages_seconds": {stage: _distribution(values) for stage, values in stages.items()},
+        "slowest": [{key: r[key] for key in ("index", "job_id", "document", "latency", "stages")}
+                    for r in sorted(ok, key=lambda r: r["latency"], reverse=True)[:slowest]],
+        "errors": sorted({r["error"] for r in results if r["error"]})[:10],
+    }
+
+
+def print_summary(summary, out=None):
+    out = out or sys.stdout
+    latency = summary["latency_seconds"]
+    print(f"Requests: {summary['requests']}, succeeded {summary['succeeded']}, failed {summary['failed']} "
+          f"({summary['error_rate']:.1%}), 429 {summary['throttled']} ({summary['throttled_rate']:.1%})", file=out)
+    print(f"Throughput: {summary['throughput_per_second']:.3f} conversions/s over {summary['elapsed_seconds']:.1f}s",
+          file=out)
+    if latency["p50"] is not None:
+        print(f"Latency: p50 {latency['p50']:.3f}s  p95 {latency['p95']:.3f}s  p99 {latency['p99']:.3f}s  "
+              f"max {latency['max']:.3f}s", file=out)
+    if summary["stages_seconds"]:
+        print(f"{'stage':<16} {'p50 s':>9} {'p95 s':>9} {'p99 s':>9}", file=out)
+        for stage, values in summary["stages_seconds"].items():
+            print(f"{stage:<16} {values['p50']:>9.3f} {values['p95']:>9.3f} {values['p99']:>9.3f}", file=out)
+    for error in summary["errors"]:
+        print(f"Error: {error}", file=out)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalStack:
+    """
+    The Ollama stand-in (fake_ollama.py) and the web app, each in its own process, started from a
+    fresh temporary directory so uploads and the artifact cache start empty. Use as a context
+    manager; `url` is the address of the app.
+    """
+
+    def __init__(self, tokens_per_second=500.0, num_parallel=4, startup_timeout=60.0):
+        self.fake_options = ["--tokens-per-second", str(tokens_per_second), "--num-parallel", str(num_parallel)]
+        self.startup_timeout = startup_timeout
+        self.processes = []
+        self.work_dir = None
+        self.url = None
+
+    def _spawn(self, args, env, log_name):
+        log = open(os.path.join(self.work_dir.name, log_name), "wb")
+        process = subprocess.Popen(args, cwd=self.work_dir.name, env=env, stdout=log, stderr=subprocess.STDOUT)
+        log.close()
+        self.processes.append((process, log_name))
+        return process
+
+    def _wait_ready(self, url):
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if any(process.poll() is not None for process, _ in self.processes):
+                break
+            try:
+                if httpx.get(url, timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"{url} did not come up")
+
+    def start(self):
+        self.work_dir = tempfile.TemporaryDirectory(prefix="pdf2pptx-load-")
+        ollama_url = f"http://127.0.0.1:{_free_port()}"
+        app_port = _free_port()
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PROJECT_DIR, os.environ.get("PYTHONPATH")])),
+                   OLLAMA_HOST=ollama_url)
+
+        self._spawn([sys.executable, os.path.join(PROJECT_DIR, "fake_ollama.py"),
+                     "--port", ollama_url.rsplit(":", 1)[1]] + self.fake_options, env, "fake_ollama.log")
+        self._wait_ready(ollama_url + "/api/version")
+        self._spawn([sys.executable, "-m", "flask", "--app", "main", "run", "--host", "127.0.0.1",
+                     "--port", str(app_port), "--no-reload", "--no-debugger"], env, "app.log")
+        self.url = f"http://127.0.0.1:{app_port}"
+        self._wait_ready(self.url + "/models")
+        return self
+
+    def stop(self):
+        for process, _ in self.processes:
+            process.terminate()
+        for process, _ in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.processes = []
+        if self.work_dir:
+            self.work_dir.cleanup()
+            self.work_dir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def load_documents(paths=(), synthetic_pages=(2, 20), seed=0):
+    """(name, bytes, pages) for the given PDFs, or synthetic documents of the given page counts."""
+    import fitz
+
+    from synthetic_pdfs import write_synthetic_pdf
+
+    documents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            documents.append((os.path.basename(path), pdf_bytes, pdf_document.page_count))
+    if not documents:
+        with tempfile.TemporaryDirectory(prefix="pdf2pptx-load-") as directory:
+            for number, pages in enumerate(synthetic_pages):
+                path = write_synthetic_pdf(os.path.join(directory, f"synthetic-{pages}p.pdf"), pages,
+                                           seed=seed + number)
+                with open(path, "rb") as f:
+                    documents.append((os.path.basename(path), f.read(), pages))
+    return documents
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load test /convert or the job API and report latency percentiles and stage timings.")
+    parser.add_argument("--url", help="Base URL of a running server; without it the app and an Ollama "
+                                      "stand-in are started locally")
+    parser.add_argument("--api", choices=["convert", "jobs"], default="convert")
+    parser.add_argument("--concurrency", type=int, default=4, help="Users (closed loop) or requests in flight")
+    parser.add_argument("--rate", type=float, help="Open loop: arrivals per second (Poisson)")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--duration", type=float, help="Stop sending after this many seconds (default 60 "
+                                                       "when --requests is not given)")
+    parser.add_argument("--pdf", action="append", default=[], help="PDF to send (repeatable)")
+    parser.add_argument("--pages", default="2,20", help="Page counts of the synthetic PDFs used without --pdf")
+    parser.add_argument("--model", default="llama3")
+    parser.add_argument("--theme", default="default")
+    parser.add_argument("--repeat-documents", action="store_true",
+                        help="Let repeated documents be served from the artifact cache")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="Speed of the local stand-in")
+    parser.add_argument("--num-parallel", type=int, default=4, help="Parallel generations of the local stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="JSON file with the summary and every request")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    # One line per request would bury the summary
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    duration = args.duration if args.duration or args.requests else 60.0
+    documents = load_documents(args.pdf, [int(p) for p in args.pages.split(",") if p.strip()], seed=args.seed)
+
+    stack = None
+    if not args.url:
+        stack = LocalStack(tokens_per_second=args.tokens_per_second, num_parallel=args.num_parallel).start()
+        logger.info("Local app at %s", stack.url)
+    try:
+        tester = LoadTester(args.url or stack.url, documents, model=args.model, theme=args.theme, api=args.api,
+                            unique=not args.repeat_documents)
+        try:
+            results, elapsed = tester.run(concurrency=args.concurrency, rate=args.rate, requests=args.requests,
+                                          duration=duration, seed=args.seed)
+        finally:
+            tester.close()
+    finally:
+        if stack:
+            stack.stop()
+
+    summary = summarize(results, elapsed)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "summary": summary, "requests": results}, f, indent=2)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,286 +1,261 @@
+import io
+import logging
+import multiprocessing
 import os
+import shutil
 import threading
 import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, Response, render_template, request, send_file, jsonify, stream_with_context
 from werkzeug.utils import secure_filename
 
-from manageData import OllamaProcessor
-from ppt_generator import PdfToPptxConverter
-from readPDF import PdfExtractor
+from artifact_store import ArtifactStore
+from batch import BatchConverter
+from instrumentation import METRICS, configure_logging, job_context
+from jobs import JobManager, format_sse
+from manageData import DEFAULT_TENANT, MODEL_SLOTS, Deadline, scheduling_context, set_chat_backend
+from memory import MemoryBudget, MemoryBudgetExceeded, physical_memory_bytes, start_tracing
+from ollama_pool import OllamaPool
+from pipeline import FAST_MODE, conversion_memory, parse_pages, pdf_to_pptx_with_ollama
+from themes import THEME_TEMPLATES, THEMES
+
+logger = logging.getLogger(__name__)
+configure_logging()
 
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+# Uploads are spooled to disk in chunks, so their size does not bound the worker's memory
+app.config['MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024
 app.config['ALLOWED_EXTENSIONS'] = {'pdf'}
+app.config['ARTIFACT_FOLDER'] = 'artifacts'
+# Size the artifact store is trimmed back to, least recently used documents and pieces first
+app.config['ARTIFACT_MAX_BYTES'] = int(os.environ.get('ARTIFACT_MAX_BYTES') or 1024 ** 3)
+# Worker processes shared by every batch conversion, however many run at once
+app.config['BATCH_WORKERS'] = os.cpu_count()
+app.config['BATCH_LLM_CONCURRENCY'] = 1
+# Documents a batch may hold and bytes the PDFs of a batch archive may take once extracted
+app.config['BATCH_MAX_FILES'] = 500
+app.config['BATCH_MAX_BYTES'] = 2 * 1024 ** 3
+# Requests in flight per model across all jobs, per healthy host with OLLAMA_HOSTS; match OLLAMA_NUM_PARALLEL
+# on the server
+app.config['LLM_MAX_IN_FLIGHT'] = 4
+# Comma separated Ollama hosts to balance calls over; empty sends every call to OLLAMA_HOST
+app.config['OLLAMA_HOSTS'] = os.environ.get('OLLAMA_HOSTS', '')
+app.config['OLLAMA_PROBE_INTERVAL'] = 15.0
+# Seconds a conversion may take unless the request gives its own "budget"; None for no limit
+app.config['REQUEST_BUDGET_SECONDS'] = 600
+# Relative share of the model slots per tenant (the "tenant" form field or X-Tenant header) under contention
+app.config['TENANT_WEIGHTS'] = {}
+# Processes rendering the decks of a multi-theme conversion; 0 renders them one after another in-process
+app.config['THEME_RENDER_WORKERS'] = min(len(THEMES), os.cpu_count() or 1)
+# "local" scores image captions/context against sections with TF-IDF; "llm" asks the model
+app.config['IMAGE_ASSOCIATION'] = 'local'
+# Render a heuristic deck alongside the model pipeline and serve it when the model fails or runs out of time
+app.config['SPECULATIVE_FALLBACK'] = os.environ.get('SPECULATIVE_FALLBACK', '') not in ('', '0', 'false')
+# Estimated memory (bytes) of the conversions running at once, by default half the RAM, and of a single one
+app.config['MEMORY_BUDGET_BYTES'] = int(os.environ.get('MEMORY_BUDGET_BYTES') or
+                                        (physical_memory_bytes() or 8 * 1024 ** 3) // 2)
+app.config['JOB_MEMORY_LIMIT_BYTES'] = int(os.environ.get('JOB_MEMORY_LIMIT_BYTES') or 2 * 1024 ** 3)
+# Seconds a /convert request waits for room in the memory budget before it is answered with 429
+app.config['MEMORY_ADMISSION_TIMEOUT'] = 30.0
+# Trace Python allocations to report the allocation peak of every stage (slows every allocation)
+app.config['MEMORY_TRACING'] = os.environ.get('MEMORY_TRACING', '') not in ('', '0', 'false')
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+artifact_store = ArtifactStore(app.config['ARTIFACT_FOLDER'], max_bytes=app.config['ARTIFACT_MAX_BYTES'])
+MODEL_SLOTS.set_limit(app.config['LLM_MAX_IN_FLIGHT'])
+for tenant_name, tenant_weight in app.config['TENANT_WEIGHTS'].items():
+    MODEL_SLOTS.set_weight(tenant_name, tenant_weight)
+job_manager = JobManager()
+memory_budget = MemoryBudget(app.config['MEMORY_BUDGET_BYTES'], app.config['JOB_MEMORY_LIMIT_BYTES'])
+if app.config['MEMORY_TRACING']:
+    start_tracing()
 
-def allowed_file(filename):
-    return '.' in filename and \
-        filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+ollama_pool = OllamaPool.from_env(app.config['OLLAMA_HOSTS'], probe_interval=app.config['OLLAMA_PROBE_INTERVAL'],
+                                  slots=MODEL_SLOTS, per_host_limit=app.config['LLM_MAX_IN_FLIGHT'])
+if ollama_pool:
+    set_chat_backend(ollama_pool.start())
+
+# Theme templates are built once here; each conversion clones one
+THEME_TEMPLATES.preload()
+
+_theme_render_pool = None
+
+
+def theme_render_pool():
+    """Process pool shared by multi-theme conversions, started on first use so its workers stay warm."""
+    global _theme_render_pool
+    if _theme_render_pool is None and app.config['THEME_RENDER_WORKERS'] > 1:
+        # "spawn" because the pool is started from a threaded web server
+        _theme_render_pool = ProcessPoolExecutor(max_workers=app.config['THEME_RENDER_WORKERS'],
+                                                 mp_context=multiprocessing.get_context("spawn"))
+    return _theme_render_pool
+
+
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+
+def batch_pool():
+    """Process pool of every batch conversion: concurrent batches queue for its workers instead of adding their own."""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            # "spawn" because the pool is started from a threaded web server
+            _batch_pool = ProcessPoolExecutor(max_workers=app.config['BATCH_WORKERS'],
+                                              mp_context=multiprocessing.get_context("spawn"))
+    return _batch_pool
 
 
-def pdf_to_pptx_with_ollama(pdf_path=None, pdf_text=None, output_file=None, model_name="llama3", theme="default"):
+def parse_themes(values):
     """
-    Converts a PDF into a PowerPoint presentation using text and image processing.
+    Theme names from form values, each possibly comma separated, without duplicates.
+
+    Returns:
+        list: Theme names; a ValueError names the unknown ones
     """
-    print(f"Starting processing with model: {model_name}")
-    current_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-    print(current_time)
-    ollama_processor = OllamaProcessor(model_name=model_name)
-
-    # Output file configuration
-    if not output_file:
-        if pdf_path:
-            base_name = os.path.splitext(os.path.basename(pdf_path))[0]
-            output_file = f"{base_name}.pptx"
-        else:
-            output_file = "presentation.pptx"
+    themes = [name.strip() for value in values for name in value.split(",") if name.strip()]
+    unknown = [name for name in themes if name not in THEMES]
+    if unknown:
+        raise ValueError(f"Unknown theme: {', '.join(unknown)}")
+    return list(dict.fromkeys(themes)) or ["default"]
 
-    text = pdf_text
-    document_name = "Document"
-    image_data = []
 
-    # Text and image extraction from PDF
-    if not text and pdf_path:
-        print(f"Extracting text from PDF: {pdf_path}")
-        try:
-            extractor = PdfExtractor()
-            text = extractor.extract_text(pdf_path)
-            document_name = os.path.splitext(os.path.basename(pdf_path))[0]
+def request_tenant():
+    """Tenant a request is scheduled for; requests without one share the default tenant."""
+    return request.form.get('tenant') or request.headers.get('X-Tenant') or DEFAULT_TENANT
 
-            # Extract images from PDF
-            print("Extracting images from PDF...")
-            from image_extractor import ImageExtractor
-            image_data = ImageExtractor.extract_images_from_pdf(pdf_path)
-            print(f"Found {len(image_data)} images in the PDF")
 
-        except Exception as e:
-            print(f"Error extracting text or images from PDF: {e}")
-            raise ValueError(f"Failure to extract text or images: {str(e)}")
+def request_use_cache():
+    """
+    False when a request asks to be converted from scratch, with a "cache" form field of 0 or a
+    Cache-Control: no-cache header; stage results are then neither read from nor saved to the store.
+    """
+    if request.form.get('cache', '').lower() in ('0', 'false', 'no', 'off'):
+        return False
+    return not request.cache_control.no_cache
 
-    if not text or len(text.strip()) < 10:
-        raise ValueError("Insufficient text for processing")
 
+def request_deadline():
+    """
+    Deadline of a request: the "budget" form field or X-Request-Budget header in seconds, or the
+    configured default. Raises ValueError for a budget that is not a positive number.
+    """
+    value = request.form.get('budget') or request.headers.get('X-Request-Budget')
     try:
-        # Text cleaning and structuring
-        print("Cleaning up and structuring the text...")
-        cleaned_text = ollama_processor.clean_and_structure_text(text)
+        seconds = float(value) if value else app.config['REQUEST_BUDGET_SECONDS']
+    except ValueError:
+        raise ValueError(f"Invalid budget: {value}")
+    if seconds is None:
+        return None
+    if not seconds > 0:
+        raise ValueError(f"Invalid budget: {value}")
+    return Deadline(seconds, requested=bool(value))
 
-        # Document structural analysis
-        print("Analyzing the structure of the document...")
-        document_structure = ollama_processor.analyze_document_with_images(cleaned_text, image_data)
-        # Structure validation and processing
-        document_structure = normalize_document_structure(document_structure, document_name, text)
 
-        # Presentation generation
-        print(f"Generating presentation with theme '{theme}'...")
-        converter = PdfToPptxConverter(output_file, ollama_processor, theme=theme)
-        converter.create_presentation(document_structure, image_data)
+def format_degradations(degradations):
+    """Degraded stages as a header value, e.g. "clean=skipped, analyze=heuristic"."""
+    return ", ".join(f"{entry['stage']}={entry['action']}" for entry in degradations)
 
-        print(f"Presentation successfully generated: {output_file}")
-        return output_file
 
-    except Exception as e:
-        print(f"Error during processing: {str(e)}")
-        # Error recovery attempt
-        try:
-            print("Trying alternative generation method...")
-            fallback_structure = create_fallback_structure(text, document_name)
+def memory_error(error):
+    """413 for a document larger than a conversion may be, 429 when no memory was freed in time."""
+    if error.reason == "job_limit":
+        return jsonify({'error': str(error), 'estimated_bytes': error.estimate}), 413
+    response = jsonify({'error': str(error), 'estimated_bytes': error.estimate})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(max(1, int(app.config['MEMORY_ADMISSION_TIMEOUT'])))
+    return response
+
 
-            converter = PdfToPptxConverter(output_file, ollama_processor, theme=theme)
-            converter.create_presentation(fallback_structure, image_data)
+def allowed_file(filename):
+    return '.' in filename and \
+        filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-            print(f"Presentation generated via alternative method: {output_file}")
-            current_time2 = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            print(current_time2)
-            return output_file
-        except Exception as fallback_error:
-            print(f"Total processing failure: {str(fallback_error)}")
-            raise ValueError(f"The presentation could not be generated: {str(e)}")
 
-    finally:
-        # Clean up temporary image files
-        for img in image_data:
-            try:
-                img_path = img['path'] if isinstance(img, dict) else img
-                if os.path.exists(img_path):
-                    os.remove(img_path)
-            except Exception as e:
-                print(f"Error cleaning temporary file: {e}")
-
-        # Remove temporary directory if empty
-        if image_data:
-            try:
-                img_path = image_data[0]['path'] if isinstance(image_data[0], dict) else image_data[0]
-                img_dir = os.path.dirname(img_path)
-                if os.path.exists(img_dir) and not os.listdir(img_dir):
-                    os.rmdir(img_dir)
-            except Exception as e:
-                print(f"Error removing temporary directory: {e}")
-
-
-def normalize_document_structure(structure, document_name, original_text):
-    if isinstance(structure, str):
-        try:
-            import json
-            structure = json.loads(structure)
-        except json.JSONDecodeError:
-            return create_fallback_structure(original_text, document_name)
-
-    if not isinstance(structure, dict):
-        return create_fallback_structure(original_text, document_name)
-
-    normalized = {
-        "title": structure.get("title", document_name),
-        "subtitle": structure.get("subtitle", ""),
-        "version": structure.get("version", ""),
-        "date": structure.get("date", ""),
-        "sections": []
-    }
-
-    sections = structure.get("sections", [])
-    if not sections:
-        paragraphs = [p for p in original_text.split('\n\n') if p.strip()]
-        if paragraphs:
-            normalized["sections"] = [{
-                "title": "Main Content",
-                "content": paragraphs[:10],  # First 10 paragraphs
-                "importance": "high",
-                "type": "overview"
-            }]
-    else:
-        for section in sections:
-            if not isinstance(section, dict):
-                continue
-
-            normalized_section = {
-                "title": section.get("title", "Untitled Section"),
-                "content": section.get("content", []),
-                "importance": section.get("importance", "medium"),
-                "type": section.get("type", "overview")
-            }
-
-            if isinstance(normalized_section["content"], str):
-                normalized_section["content"] = [normalized_section["content"]]
-
-            normalized_section["content"] = [item for item in normalized_section["content"] if
-                                             item and isinstance(item, str)]
-
-            if normalized_section["content"]:
-                normalized["sections"].append(normalized_section)
-
-    return normalized
-
-
-def create_fallback_structure(text, document_name):
-    fallback = {
-        "title": document_name,
-        "subtitle": "",
-        "version": "",
-        "date": "",
-        "sections": []
-    }
-
-    lines = text.split('\n')
-
-    potential_titles = []
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if line and 10 <= len(line) <= 100:
-            if line.isupper() or line.endswith(':') or line.startswith('#'):
-                potential_titles.append((i, line.lstrip('#').strip()))
-
-    if potential_titles:
-        for i in range(len(potential_titles)):
-            start_idx = potential_titles[i][0] + 1
-            end_idx = potential_titles[i + 1][0] if i < len(potential_titles) - 1 else len(lines)
-
-            section_title = potential_titles[i][1]
-            section_content = [l.strip() for l in lines[start_idx:end_idx] if l.strip()]
-
-            paragraphs = []
-            current = []
-            for line in section_content:
-                if len(line) < 3:
-                    if current:
-                        paragraphs.append(' '.join(current))
-                        current = []
-                else:
-                    current.append(line)
-            if current:
-                paragraphs.append(' '.join(current))
-
-            if paragraphs:
-                fallback["sections"].append({
-                    "title": section_title,
-                    "content": paragraphs[:7],
-                    "importance": "medium",
-                    "type": "overview"
-                })
-
-    if not fallback["sections"]:
-        paragraphs = []
-        current = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                if current:
-                    paragraphs.append(' '.join(current))
-                    current = []
-            else:
-                current.append(line)
-        if current:
-            paragraphs.append(' '.join(current))
-
-        paragraphs = [p for p in paragraphs if len(p) > 20]
-
-        if paragraphs:
-            fallback["sections"].append({
-                "title": "Document Content",
-                "content": paragraphs[:10],
-                "importance": "high",
-                "type": "overview"
-            })
-
-    return fallback
-
-
-def pdf_bytes_to_pptx(pdf_bytes, output_file="presentation.pptx", model_name="llama3", theme="default"):
+def temp_upload_path():
     # Ensure uploads folder exists
     uploads_folder = app.config['UPLOAD_FOLDER']
     os.makedirs(uploads_folder, exist_ok=True)
 
-    # Create unique filenames based on timestamp
-    import time
+    # Create unique filenames, concurrent jobs may start within the same second
     timestamp = int(time.time())
-    temp_pdf_path = os.path.join(uploads_folder, f"temp_pdf_{timestamp}.pdf")
+    return os.path.join(uploads_folder, f"temp_pdf_{timestamp}_{uuid.uuid4().hex[:8]}.pdf")
+
+
+def spool_upload(file):
+    """Copies an uploaded file to a temporary PDF in chunks and returns its path, never holding it in memory."""
+    temp_pdf_path = temp_upload_path()
+    file.save(temp_pdf_path)
+    return temp_pdf_path
+
+
+def unique_filename(name, taken):
+    """`name`, or "<stem>-<n><ext>" when another file of the batch already has it; adds the result to `taken`."""
+    stem, ext = os.path.splitext(name)
+    counter = 1
+    while name.lower() in taken:
+        counter += 1
+        name = f"{stem}-{counter}{ext}"
+    taken.add(name.lower())
+    return name
 
-    with open(temp_pdf_path, "wb") as f:
-        f.write(pdf_bytes)
 
+def remove_temp_file(path):
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+            logger.debug("Temporary file removed: %s", path)
+        except Exception as e:
+            logger.warning("Error removing temporary file: %s", e)
+
+
+def pdf_file_to_pptx(pdf_path, output_file="presentation.pptx", model_name="llama3", theme="default",
+                     progress_callback=None, pages=None, use_cache=True):
+    """Converts a PDF on disk with the application's artifact store (unless `use_cache` is False) and settings."""
     try:
-        # Use complete path for temporary file
-        result = pdf_to_pptx_with_ollama(
-            pdf_path=temp_pdf_path,
+        return pdf_to_pptx_with_ollama(
+            pdf_path=pdf_path,
             output_file=output_file,
             model_name=model_name,
-            theme=theme
+            theme=theme,
+            artifact_store=artifact_store if use_cache else None,
+            progress_callback=progress_callback,
+            image_association=app.config['IMAGE_ASSOCIATION'],
+            render_executor=None if isinstance(theme, str) or len(theme) == 1 else theme_render_pool(),
+            speculative=app.config['SPECULATIVE_FALLBACK'],
+            pages=pages
         )
-        return result
     except Exception as e:
-        print(f"Error processing PDF: {str(e)}")
+        logger.error("Error processing PDF: %s", e)
         raise e
+
+
+def pdf_bytes_to_pptx(pdf_bytes, output_file="presentation.pptx", model_name="llama3", theme="default",
+                      progress_callback=None, pages=None):
+    temp_pdf_path = temp_upload_path()
+    with open(temp_pdf_path, "wb") as f:
+        f.write(pdf_bytes)
+
+    try:
+        return pdf_file_to_pptx(temp_pdf_path, output_file=output_file, model_name=model_name, theme=theme,
+                                progress_callback=progress_callback, pages=pages)
+    finally:
+        remove_temp_file(temp_pdf_path)
+
+
+def iter_buffer(buffer, chunk_size=64 * 1024):
+    """Yields the contents of a BytesIO in chunks without copying it."""
+    view = buffer.getbuffer()
+    try:
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset:offset + chunk_size])
     finally:
-        # Temporary file cleanup
-        if os.path.exists(temp_pdf_path):
-            try:
-                os.remove(temp_pdf_path)
-                print(f"Temporary file removed: {temp_pdf_path}")
-            except Exception as e:
-                print(f"Error removing temporary file: {str(e)}")
+        view.release()
 
 
 @app.route('/')
@@ -300,55 +275,292 @@ def convert_pdf():
 
     if file and allowed_file(file.filename):
         model_name = request.form.get('model', 'llama3')
-        theme = request.form.get('theme', 'default')
+        try:
+            themes = parse_themes(request.form.getlist('theme'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # Several themes are rendered from the same analysis and returned together in a zip
+        theme = themes[0] if len(themes) == 1 else themes
 
         filename = secure_filename(file.filename)
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
+        if len(themes) == 1:
+            output_filename = os.path.splitext(filename)[0] + '.pptx'
+            mimetype = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+        else:
+            output_filename = os.path.splitext(filename)[0] + '-themes.zip'
+            mimetype = 'application/zip'
 
+        job_id = uuid.uuid4().hex
+        tenant = request_tenant()
         try:
-            with open(file_path, 'rb') as f:
-                pdf_bytes = f.read()
+            deadline = request_deadline()
+            pages = parse_pages(request.form.get('pages'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        use_cache = request_use_cache()
+        stage_timings = {}
+        degradations = []
+
+        def collect_timings(event, data):
+            if event == "stage_finished":
+                stage_timings[data["stage"]] = data["seconds"]
+            elif event == "stage_degraded":
+                degradations.append(data)
+
+        # The deck is rendered into memory and streamed from there: no output file, no cleanup
+        output = io.BytesIO()
+        pdf_path = spool_upload(file)
+        try:
+            memory_estimate = conversion_memory(pdf_path, pages)
+        except ValueError as e:
+            remove_temp_file(pdf_path)
+            return jsonify({'error': str(e)}), 400
+        try:
+            with job_context(job_id), \
+                    memory_budget.reserve(memory_estimate, timeout=app.config['MEMORY_ADMISSION_TIMEOUT']), \
+                    scheduling_context(tenant=tenant, deadline=deadline):
+                pdf_file_to_pptx(pdf_path, output_file=output, model_name=model_name, theme=theme,
+                                 progress_callback=collect_timings, pages=pages, use_cache=use_cache)
+        except MemoryBudgetExceeded as e:
+            return memory_error(e)
+        except Exception as e:
+            return jsonify({'error': f'Error processing file: {str(e)}'}), 500
+        finally:
+            remove_temp_file(pdf_path)
 
-            output_filename = os.path.splitext(filename)[0] + '.pptx'
-            output_path = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
+        response = Response(iter_buffer(output), direct_passthrough=True, mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{output_filename}"'
+        response.headers['Content-Length'] = str(output.getbuffer().nbytes)
+        response.headers['X-Job-Id'] = job_id
+        response.headers['Server-Timing'] = format_server_timing(stage_timings)
+        if degradations:
+            response.headers['X-Degraded'] = format_degradations(degradations)
+        return response
 
-            pdf_bytes_to_pptx(pdf_bytes, output_file=output_path, model_name=model_name, theme=theme)
+    else:
+        return jsonify({'error': 'File type not allowed. Please upload a PDF.'}), 400
 
-            response = send_file(output_path,
-                                 as_attachment=True,
-                                 download_name=output_filename,
-                                 mimetype='application/vnd.openxmlformats-officedocument.presentationml.presentation')
 
-            def delayed_file_removal(filepath, delay=3):
-                time.sleep(delay)
-                try:
-                    if os.path.exists(filepath):
-                        os.remove(filepath)
-                        print(f"File removed successfully: {filepath}")
-                except Exception as e:
-                    print(f"Error removing file: {str(e)}")
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """
+    Starts a conversion in the background and returns immediately.
+    Progress is streamed from /jobs/<id>/events and the deck is downloaded from /jobs/<id>/result.
+    """
+    if 'pdf_file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
 
-            threading.Thread(target=delayed_file_removal, args=(output_path,)).start()
+    file = request.files['pdf_file']
 
-            return response
+    if file.filename == '':
+        return jsonify({'error': 'No file selected'}), 400
 
-        except Exception as e:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            if 'output_path' in locals() and os.path.exists(output_path):
-                try:
-                    os.remove(output_path)
-                except (PermissionError, FileNotFoundError):
-                    pass
-            return jsonify({'error': f'Error processing file: {str(e)}'}), 500
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'File type not allowed. Please upload a PDF.'}), 400
+
+    model_name = request.form.get('model', 'llama3')
+    try:
+        themes = parse_themes(request.form.getlist('theme'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    theme = themes[0] if len(themes) == 1 else themes
+    filename = secure_filename(file.filename)
+    tenant = request_tenant()
+    try:
+        # The budget counts from the upload, not from when the job thread starts
+        deadline = request_deadline()
+        pages = parse_pages(request.form.get('pages'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    use_cache = request_use_cache()
+    # The upload is closed with the request, the job reads the spooled copy
+    pdf_path = spool_upload(file)
+    # A document that may never fit is refused now; the others wait in the job for room
+    try:
+        memory_estimate = conversion_memory(pdf_path, pages)
+        memory_budget.check(memory_estimate)
+    except ValueError as e:
+        remove_temp_file(pdf_path)
+        return jsonify({'error': str(e)}), 400
+    except MemoryBudgetExceeded as e:
+        remove_temp_file(pdf_path)
+        return memory_error(e)
+
+    job = job_manager.create(filename)
+    job.memory_estimate = memory_estimate
+
+    def run_conversion(job):
+        output = io.BytesIO()
+
+        def progress(event, data):
+            if event == "stage_degraded":
+                job.degradations.append(data)
+            job.progress.emit(event, data)
 
+        try:
+            with memory_budget.reserve(memory_estimate), scheduling_context(tenant=tenant, deadline=deadline):
+                pdf_file_to_pptx(pdf_path, output_file=output, model_name=model_name, theme=theme,
+                                 progress_callback=progress, pages=pages, use_cache=use_cache)
         finally:
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            remove_temp_file(pdf_path)
+        if len(themes) > 1:
+            job.result_name = os.path.splitext(filename)[0] + '-themes.zip'
+            job.result_mimetype = 'application/zip'
+        return output.getvalue()
+
+    job_manager.start(job, run_conversion)
+
+    return jsonify({
+        'job_id': job.id,
+        'events_url': f"/jobs/{job.id}/events",
+        'result_url': f"/jobs/{job.id}/result"
+    }), 202
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+
+    # EventSource sends the last id it received when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    start = int(last_event_id) + 1 if last_event_id.isdigit() else 0
+    stream = (format_sse(event) for event in job.progress.follow(start))
+    return Response(stream_with_context(stream), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == "failed":
+        return jsonify({'error': f'Error processing file: {job.error}'}), 500
+    if job.status != "finished":
+        return jsonify({'error': 'Job not finished', 'status': job.status}), 409
+
+    response = send_file(io.BytesIO(job.result),
+                         as_attachment=True,
+                         download_name=job.result_name or os.path.splitext(job.filename)[0] + '.pptx',
+                         mimetype=job.result_mimetype or
+                         'application/vnd.openxmlformats-officedocument.presentationml.presentation')
+    if job.degradations:
+        response.headers['X-Degraded'] = format_degradations(job.degradations)
+    return response
+
+
+@app.route('/convert/batch', methods=['POST'])
+def convert_batch():
+    """
+    Converts several PDFs (multiple "pdf_files" or one .zip "archive") as a background batch job.
+    The result of the job is a zip with one presentation per PDF.
+    """
+    files = [f for f in request.files.getlist('pdf_files') if f.filename]
+    archive = request.files.get('archive')
 
-    else:
-        return jsonify({'error': 'File type not allowed. Please upload a PDF.'}), 400
+    if not files and not (archive and archive.filename):
+        return jsonify({'error': 'No files uploaded'}), 400
+    files = [f for f in files if allowed_file(f.filename)]
+    try:
+        themes = parse_themes(request.form.getlist('theme'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(themes) > 1:
+        return jsonify({'error': 'A batch is converted with a single theme'}), 400
+
+    members = []
+    if archive and archive.filename:
+        try:
+            with zipfile.ZipFile(archive.stream) as zf:
+                members = [member for member in zf.infolist() if not member.is_dir() and
+                           allowed_file(secure_filename(os.path.basename(member.filename)))]
+        except zipfile.BadZipFile:
+            return jsonify({'error': 'Invalid zip archive'}), 400
+        # The sizes in the archive bound what is extracted: zipfile stops reading a member at its size
+        if sum(member.file_size for member in members) > app.config['BATCH_MAX_BYTES']:
+            return jsonify({'error': f"The PDFs of the archive take more than "
+                                     f"{app.config['BATCH_MAX_BYTES'] // (1024 * 1024)} MB"}), 413
+    if len(members) + len(files) > app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f"A batch may hold at most {app.config['BATCH_MAX_FILES']} PDFs"}), 413
+    if not members and not files:
+        return jsonify({'error': 'No PDF files found in the upload'}), 400
+
+    job = job_manager.create(archive.filename if archive and archive.filename else f"{len(files)} files")
+    batch_dir = os.path.join(app.config['UPLOAD_FOLDER'], f"batch_{job.id}")
+    input_dir = os.path.join(batch_dir, "input")
+    output_dir = os.path.join(batch_dir, "output")
+    os.makedirs(input_dir, exist_ok=True)
+
+    # Documents of the same name (from different folders of the archive) are kept apart
+    names = set()
+    if members:
+        try:
+            with zipfile.ZipFile(archive.stream) as zf:
+                for member in members:
+                    # Flattened to a safe name (no paths taken from the archive)
+                    name = unique_filename(secure_filename(os.path.basename(member.filename)), names)
+                    with zf.open(member) as src, open(os.path.join(input_dir, name), 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+        except zipfile.BadZipFile:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return jsonify({'error': 'Invalid zip archive'}), 400
+    for file in files:
+        file.save(os.path.join(input_dir, unique_filename(secure_filename(file.filename), names)))
+    saved = len(names)
+
+    converter = BatchConverter(
+        model_name=request.form.get('model', 'llama3'),
+        theme=themes[0],
+        workers=app.config['BATCH_WORKERS'],
+        llm_concurrency=app.config['BATCH_LLM_CONCURRENCY'],
+        artifact_root=app.config['ARTIFACT_FOLDER'],
+        cpu_pool=batch_pool(),
+        memory_budget=memory_budget
+    )
+
+    def run_batch(job):
+        converter.progress_callback = job.progress.emit
+        try:
+            summary = converter.convert_directory(input_dir, output_dir)
+            if not summary['converted']:
+                raise ValueError("No presentation could be generated")
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as zf:
+                for result in summary['documents']:
+                    if result['status'] == 'converted':
+                        zf.write(result['output'], os.path.relpath(result['output'], output_dir))
+            job.result_name = 'presentations.zip'
+            job.result_mimetype = 'application/zip'
+            return buffer.getvalue()
+        finally:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+
+    job_manager.start(job, run_batch)
+
+    return jsonify({
+        'job_id': job.id,
+        'documents': saved,
+        'events_url': f"/jobs/{job.id}/events",
+        'result_url': f"/jobs/{job.id}/result"
+    }), 202
+
+
+def format_server_timing(stage_timings):
+    """Stage timings as a Server-Timing header value (durations in milliseconds)."""
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in stage_timings.items())
+
+
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/backends')
+def get_backends():
+    """Health, load and latency of every Ollama host when calls are balanced over several."""
+    return jsonify({'hosts': ollama_pool.stats() if ollama_pool else []})
 
 
 @app.route('/models')
@@ -358,6 +570,7 @@ def get_models():
         {"id": "llama3:8b", "name": "Llama 3 (8B)"},
         {"id": "deepseek-r1:14b", "name": "DeepSeek R1 (14B)"},
         {"id": "gemma3:12b", "name": "Gemma3 (12B)"},
+        {"id": FAST_MODE, "name": "Fast preview (no AI)"},
     ]
     return jsonify(models)
 
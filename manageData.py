@@ -1,12 +1,411 @@
+import contextvars
+import heapq
+import itertools
+import logging
 import re
+import threading
+import time
+from contextlib import contextmanager
 
 import ollama
 
+from instrumentation import LLM_CALL_DURATION, LLM_CANCELLED, LLM_SLOT_WAIT, PARSE_FAILURES
+
+logger = logging.getLogger(__name__)
+
+UNPARSED_CONTENT = "The document could not be properly parsed."
+
+
+def unparsed_structure():
+    """Placeholder structure returned when the model output cannot be parsed."""
+    return {
+        "title": "Extracted Document",
+        "subtitle": "",
+        "version": "",
+        "date": "",
+        "sections": [{
+            "title": "General Information",
+            "content": [UNPARSED_CONTENT]
+        }]
+    }
+
+
+def is_unparsed_structure(structure):
+    if not isinstance(structure, dict):
+        return True
+    sections = structure.get("sections") or []
+    return len(sections) == 1 and sections[0].get("content") == [UNPARSED_CONTENT]
+
+
+class DeadlineExceeded(TimeoutError):
+    """A model call was not started or was cancelled because the request ran out of time."""
+
+
+class Deadline:
+    """
+    Point in time by which a request must be answered. Model calls made under it wait for a slot
+    and for their answer only until then; the calls cancelled this way are listed in `cancelled`.
+    `requested` is False for a configured default the client did not ask for.
+    """
+
+    def __init__(self, seconds, at=None, requested=True):
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds if at is None else at
+        self.requested = requested
+        self.cancelled = []
+
+    def remaining(self):
+        return self.at - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def shortened(self, seconds):
+        """A deadline `seconds` earlier, e.g. to keep time for work that follows the model calls."""
+        return Deadline(self.seconds, at=self.at - seconds, requested=self.requested)
+
+
+# Tenant of calls made outside a scheduling context
+DEFAULT_TENANT = "default"
+# Size of the job an LLM call belongs to (characters of document text), the tenant that sent it
+# and the deadline of the request
+job_cost_var = contextvars.ContextVar("job_cost", default=None)
+tenant_var = contextvars.ContextVar("tenant", default=DEFAULT_TENANT)
+deadline_var = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def scheduling_context(cost=None, tenant=None, deadline=None):
+    """
+    Marks the LLM calls made inside the block as belonging to a job of `cost` characters sent by
+    `tenant`, to be answered before `deadline`. Like job_context, it follows the job into threads
+    started with a copy of the context.
+    """
+    tokens = []
+    if cost is not None:
+        tokens.append((job_cost_var, job_cost_var.set(cost)))
+    if tenant is not None:
+        tokens.append((tenant_var, tenant_var.set(tenant)))
+    if deadline is not None:
+        tokens.append((deadline_var, deadline_var.set(deadline)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class _Waiter:
+    __slots__ = ("event", "granted")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _ModelQueue:
+    def __init__(self):
+        self.active = 0
+        self.waiting = []
+
+
+class ModelSlots:
+    """
+    Process-wide limit on the number of requests in flight per model, shared by every job.
+    Calls beyond the limit wait here instead of queueing inside the Ollama server, and a freed
+    slot goes to the waiting call of the smallest job first, so a 2-page PDF is not stuck behind
+    every call of a 300-page manual.
+
+    A call's cost is the size of its job (scheduling_context) or, outside a job, of its prompt,
+    divided by the weight of its tenant. Waiting lowers it by `aging_rate` characters per second,
+    so large jobs still get their turn under a steady stream of small ones: with the default rate
+    a job a million characters larger than a new arrival is served after about 100 s.
+    """
+
+    def __init__(self, default_limit=4, aging_rate=10000.0):
+        self.default_limit = default_limit
+        self.aging_rate = aging_rate
+        self._limits = {}
+        self._weights = {}
+        self._queues = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def set_limit(self, limit, model=None):
+        """Sets the limit of one model, or the default of every model without its own limit."""
+        with self._lock:
+            if model is None:
+                self.default_limit = max(1, limit)
+            else:
+                self._limits[model] = max(1, limit)
+            for name, queue in self._queues.items():
+                self._dispatch(name, queue)
+
+    def limit(self, model):
+        return self._limits.get(model, self.default_limit)
+
+    def set_weight(self, tenant, weight):
+        """Share of the slots a tenant gets under contention, relative to the weight 1 of others."""
+        if weight <= 0:
+            raise ValueError("Tenant weight must be positive")
+        with self._lock:
+            self._weights[tenant] = weight
+
+    def weight(self, tenant):
+        return self._weights.get(tenant, 1.0)
+
+    def _priority(self, cost, tenant):
+        # Waiting time lowers the key of a call, so it is fixed at arrival: cost - rate * (now - arrival)
+        # orders calls the same way as cost + rate * arrival, and a heap can keep them ordered
+        return cost / self.weight(tenant) + self.aging_rate * time.monotonic()
+
+    def _dispatch(self, model, queue):
+        """Hands free slots to the waiting calls with the lowest keys. Called with the lock held."""
+        while queue.waiting and queue.active < self.limit(model):
+            waiter = heapq.heappop(queue.waiting)[-1]
+            queue.active += 1
+            waiter.granted = True
+            waiter.event.set()
+
+    def _release(self, model, queue):
+        with self._lock:
+            queue.active -= 1
+            self._dispatch(model, queue)
+
+    def _withdraw(self, model, queue, waiter):
+        """Takes a waiter out of the queue, giving back the slot when it was granted meanwhile."""
+        with self._lock:
+            if waiter.granted:
+                queue.active -= 1
+                self._dispatch(model, queue)
+            else:
+                queue.waiting = [entry for entry in queue.waiting if entry[-1] is not waiter]
+                heapq.heapify(queue.waiting)
+
+    @contextmanager
+    def slot(self, model, cost=None, tenant=None, timeout=None):
+        """
+        Holds one in-flight slot of `model` for the block. `cost` and `tenant` default to those
+        of the scheduling context; a call without any cost is scheduled as cost 0. Raises
+        DeadlineExceeded when no slot is free within `timeout` seconds. The block gets a function
+        that gives the slot back early; only its first call, or the end of the block, releases it.
+        """
+        cost = job_cost_var.get() if cost is None else cost
+        tenant = tenant_var.get() if tenant is None else tenant
+        started = time.perf_counter()
+
+        with self._lock:
+            queue = self._queues.get(model)
+            if queue is None:
+                queue = self._queues[model] = _ModelQueue()
+            if queue.active < self.limit(model) and not queue.waiting:
+                queue.active += 1
+                waiter = None
+            else:
+                waiter = _Waiter()
+                heapq.heappush(queue.waiting, (self._priority(cost or 0, tenant), next(self._sequence), waiter))
+
+        if waiter is not None:
+            try:
+                granted = waiter.event.wait(timeout)
+            except BaseException:
+                self._withdraw(model, queue, waiter)
+                raise
+            if not granted:
+                self._withdraw(model, queue, waiter)
+                raise DeadlineExceeded(f"No free slot of {model} before the deadline")
+        LLM_SLOT_WAIT.observe(time.perf_counter() - started, model=model)
+        held = threading.Lock()
+
+        def release():
+            if held.acquire(blocking=False):
+                self._release(model, queue)
+
+        try:
+            yield release
+        finally:
+            release()
+
+
+MODEL_SLOTS = ModelSlots()
+
+
+class OutputRates:
+    """
+    Characters per second each model has been answering with (a moving average), used to
+    estimate whether a call still fits in what is left of a request's budget.
+    """
+
+    def __init__(self, default_rate=100.0, smoothing=0.2):
+        self.default_rate = default_rate
+        self.smoothing = smoothing
+        self._rates = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model, characters, seconds):
+        if characters <= 0 or seconds <= 0:
+            return
+        with self._lock:
+            rate = characters / seconds
+            previous = self._rates.get(model)
+            self._rates[model] = rate if previous is None else previous + self.smoothing * (rate - previous)
+
+    def measured(self, model):
+        """Whether `model` has answered in this process, i.e. its rate is not the default guess."""
+        return model in self._rates
+
+    def rate(self, model):
+        return self._rates.get(model, self.default_rate)
+
+    def seconds(self, model, characters):
+        """Estimated time for `model` to write `characters` characters."""
+        return characters / self.rate(model)
+
+
+OUTPUT_RATES = OutputRates()
+
+# Where chat calls go: the ollama module (its default host) or anything with the same chat(), e.g. an OllamaPool
+_chat_backend = None
+
+
+def set_chat_backend(backend):
+    """Sends every OllamaProcessor call to `backend`; None restores the ollama module."""
+    global _chat_backend
+    _chat_backend = backend
+
+
+def chat_backend():
+    return _chat_backend or ollama
+
 
 class OllamaProcessor:
 
-    def __init__(self, model_name="llama3"):
+    PROGRESS_EVERY_TOKENS = 16
+    # How long a cancelled call keeps its slot while waiting for its answer to close; a call hung
+    # inside the client is only noticed between two chunks, which may never come
+    CANCEL_GRACE_SECONDS = 10.0
+
+    def __init__(self, model_name="llama3", progress_callback=None):
         self.model_name = model_name
+        self.progress_callback = progress_callback
+
+    def _emit(self, event, data):
+        if self.progress_callback:
+            try:
+                self.progress_callback(event, data)
+            except Exception as e:
+                logger.warning("Error reporting progress: %s", e)
+
+    def _chat(self, prompt, call):
+        """
+        Sends a single-message chat request to the model.
+
+        When a progress callback is set the response is streamed, so the number of tokens
+        generated so far can be reported while the call is in flight. The return value has
+        the same shape as a non-streamed ollama.chat response. The call first waits for a free
+        in-flight slot of its model; outside a job, its prompt size decides its place in the queue.
+
+        Under a Deadline (scheduling_context) the call raises DeadlineExceeded when it runs out
+        of time, waiting for a slot or for the answer; a cancelled answer stops being read, which
+        closes the connection and makes Ollama stop generating. Its slot stays taken until then,
+        or for CANCEL_GRACE_SECONDS at most.
+        """
+        deadline = deadline_var.get()
+        cost = job_cost_var.get() or len(prompt)
+        if deadline is None:
+            with MODEL_SLOTS.slot(self.model_name, cost=cost):
+                return self._chat_in_slot(prompt, call)
+
+        try:
+            if deadline.expired():
+                raise DeadlineExceeded(f"No time left for the LLM call '{call}'")
+            return self._chat_before(prompt, call, deadline, cost)
+        except DeadlineExceeded:
+            deadline.cancelled.append(call)
+            LLM_CANCELLED.inc(call=call)
+            logger.warning("LLM call '%s' cancelled at the request deadline", call)
+            raise
+
+    def _chat_before(self, prompt, call, deadline, cost):
+        """
+        Runs the call on its own thread and stops waiting for it at the deadline. The thread takes
+        the model slot itself, so a cancelled call holds it until its stream is actually closed or
+        the grace period is over.
+        """
+        cancel = threading.Event()
+        finished = threading.Event()
+        outcome = {}
+
+        def run():
+            try:
+                with MODEL_SLOTS.slot(self.model_name, cost=cost, timeout=deadline.remaining()) as release:
+                    outcome["release"] = release
+                    if cancel.is_set():
+                        raise DeadlineExceeded(f"LLM call '{call}' cancelled")
+                    outcome["response"] = self._chat_in_slot(prompt, call, cancel)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                finished.set()
+
+        # A daemon thread: a call stuck without any answer must not keep the process alive
+        threading.Thread(target=contextvars.copy_context().run, args=(run,), name=f"llm-{call}",
+                         daemon=True).start()
+        if not finished.wait(max(0.0, deadline.remaining())):
+            cancel.set()
+
+            def release_hung_call():
+                if not finished.is_set() and "release" in outcome:
+                    logger.warning("Cancelled LLM call '%s' is still open, releasing its slot", call)
+                    outcome["release"]()
+
+            timer = threading.Timer(self.CANCEL_GRACE_SECONDS, release_hung_call)
+            timer.daemon = True
+            timer.start()
+            raise DeadlineExceeded(f"LLM call '{call}' did not finish before the deadline")
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["response"]
+
+    def _chat_in_slot(self, prompt, call, cancel=None):
+        messages = [{'role': 'user', 'content': prompt}]
+        started = time.perf_counter()
+        self._emit("llm_started", {"call": call, "model": self.model_name, "prompt_chars": len(prompt)})
+
+        # A cancellable call is streamed, so it can stop between two chunks
+        if not self.progress_callback and cancel is None:
+            response = chat_backend().chat(model=self.model_name, messages=messages)
+            seconds = time.perf_counter() - started
+            LLM_CALL_DURATION.observe(seconds, call=call, model=self.model_name)
+            OUTPUT_RATES.observe(self.model_name, len(response['message']['content'] or ""), seconds)
+            logger.info("LLM call '%s' finished", call,
+                        extra={"call": call, "model": self.model_name, "seconds": round(seconds, 3)})
+            self._emit("llm_finished", {"call": call, "seconds": round(seconds, 3)})
+            return response
+
+        parts = []
+        tokens = 0
+        stream = chat_backend().chat(model=self.model_name, messages=messages, stream=True)
+        for chunk in stream:
+            if cancel is not None and cancel.is_set():
+                close = getattr(stream, "close", None)
+                if close:
+                    close()
+                raise DeadlineExceeded(f"LLM call '{call}' cancelled")
+            parts.append(chunk['message']['content'])
+            tokens += 1
+            if chunk.get('done') and chunk.get('eval_count'):
+                tokens = chunk['eval_count']
+            elif tokens % self.PROGRESS_EVERY_TOKENS == 0:
+                self._emit("llm_progress", {"call": call, "tokens": tokens})
+
+        seconds = time.perf_counter() - started
+        LLM_CALL_DURATION.observe(seconds, call=call, model=self.model_name)
+        OUTPUT_RATES.observe(self.model_name, sum(map(len, parts)), seconds)
+        logger.info("LLM call '%s' finished", call,
+                    extra={"call": call, "model": self.model_name, "tokens": tokens, "seconds": round(seconds, 3)})
+        self._emit("llm_finished", {"call": call, "tokens": tokens, "seconds": round(seconds, 3)})
+        return {'message': {'role': 'assistant', 'content': ''.join(parts)}}
 
     def clean_and_structure_text(self, text):
         prompt = f"""
@@ -32,13 +431,11 @@ class OllamaProcessor:
         """
 
         try:
-            response = ollama.chat(model=self.model_name, messages=[
-                {'role': 'user', 'content': prompt}
-            ])
+            response = self._chat(prompt, "clean")
             cleaned_text = response['message']['content']
             return cleaned_text
         except Exception as e:
-            print(f"Error using Ollama to clean text: {e}")
+            logger.error("Error using Ollama to clean text: %s", e)
             return text
 
     def analyze_document_structure(self, text):
@@ -89,9 +486,7 @@ class OllamaProcessor:
         """
 
         try:
-            response = ollama.chat(model=self.model_name, messages=[
-                {'role': 'user', 'content': prompt}
-            ])
+            response = self._chat(prompt, "analyze")
 
             if not response or 'message' not in response or not response['message'].get('content'):
                 raise ValueError("Ollama API response is empty or invalid.")
@@ -113,39 +508,62 @@ class OllamaProcessor:
                 structure = json.loads(result)
                 return structure
             except json.JSONDecodeError as e:
-                print(f"Error decoding JSON: {e}")
-                print(f"Received response: {result}")
+                PARSE_FAILURES.inc(call="analyze")
+                logger.warning("Error decoding JSON: %s", e, extra={"response": result})
 
                 try:
                     import json5
                     structure = json5.loads(result)
                     return structure
                 except:
-                    return {
-                        "title": "Extracted Document",
-                        "subtitle": "",
-                        "version": "",
-                        "date": "",
-                        "sections": [{
-                            "title": "General Information",
-                            "content": ["The document could not be properly parsed."]
-                        }]
-                    }
+                    return unparsed_structure()
         except Exception as e:
-            print(f"Error analyzing structure with Ollama: {e}")
-            print(
-                f"Received response: {response['message']['content'] if 'response' in locals() and response and 'message' in response else 'No response'}")
-
-            return {
-                "title": "Extracted Document",
-                "subtitle": "",
-                "version": "",
-                "date": "",
-                "sections": [{
-                    "title": "General Information",
-                    "content": ["The document could not be properly parsed."]
-                }]
-            }
+            logger.error(
+                "Error analyzing structure with Ollama: %s", e,
+                extra={"response": response['message']['content'] if 'response' in locals() and response and 'message' in response else 'No response'})
+
+            return unparsed_structure()
+
+    def condense_section(self, title, text, max_bullets=7):
+        """
+        Condenses the text of one already identified section into slide bullets.
+
+        Used when the section titles come from the PDF outline or its typography, so the prompt
+        only carries one section instead of the whole document.
+
+        Returns:
+            list: Bullet strings, empty when the model output cannot be used
+        """
+        prompt = f"""
+        Summarize the following section of a procedural document as at most {max_bullets} slide bullet points.
+        Each point must be short (maximum 2 lines), keep numbered steps in order and keep warnings.
+
+        SECTION: {title}
+        {text[:4000]}
+
+        Return ONLY a JSON array of strings, without additional explanations or comments.
+        """
+
+        try:
+            response = self._chat(prompt, "condense")
+            result = response['message']['content']
+
+            json_match = re.search(r'\[[\s\S]*\]', result)
+            if json_match:
+                try:
+                    import json
+                    points = json.loads(re.sub(r',\s*]', ']', json_match.group(0)))
+                    return [point.strip() for point in points if isinstance(point, str) and point.strip()][:max_bullets]
+                except json.JSONDecodeError:
+                    PARSE_FAILURES.inc(call="condense")
+
+            # Plain bullet lists are common enough to be worth reading
+            points = [re.sub(r'^\s*(?:[-*•]|\d+[.)])\s+', '', line).strip()
+                      for line in result.splitlines() if re.match(r'^\s*(?:[-*•]|\d+[.)])\s+\S', line)]
+            return points[:max_bullets]
+        except Exception as e:
+            logger.error("Error condensing section with Ollama: %s", e)
+            return []
 
     def analyze_document_with_images(self, text, image_data):
         """
@@ -161,7 +579,20 @@ class OllamaProcessor:
         """
         # Get the basic document structure
         doc_structure = self.analyze_document_structure(text)
+        return self.associate_images(doc_structure, text, image_data)
 
+    def associate_images(self, doc_structure, text, image_data):
+        """
+        Asks the model which images belong to which section of an already analyzed structure.
+
+        Args:
+            doc_structure (dict): Document structure returned by analyze_document_structure
+            text (str): The document text
+            image_data (list): List of dictionaries containing extracted image information
+
+        Returns:
+            dict: The same structure with "image_info"/"has_images" set on its sections
+        """
         if not image_data or not isinstance(image_data, list) or len(image_data) == 0:
             return doc_structure
 
@@ -207,9 +638,7 @@ class OllamaProcessor:
         """
 
         try:
-            response = ollama.chat(model=self.model_name, messages=[
-                {'role': 'user', 'content': prompt}
-            ])
+            response = self._chat(prompt, "associate")
 
             if not response or 'message' not in response:
                 raise ValueError("Ollama API response is empty or invalid")
@@ -251,9 +680,10 @@ class OllamaProcessor:
                 return doc_structure
 
             except json.JSONDecodeError as e:
-                print(f"Error decoding JSON from image analysis: {e}")
+                PARSE_FAILURES.inc(call="associate")
+                logger.warning("Error decoding JSON from image analysis: %s", e)
                 return doc_structure
 
         except Exception as e:
-            print(f"Error analyzing document with images: {e}")
+            logger.error("Error analyzing document with images: %s", e)
             return doc_structure
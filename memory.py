@@ -0,0 +1,184 @@
+import collections
+import ctypes
+import ctypes.util
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import fitz
+
+from instrumentation import METRICS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+MEMORY_BUCKETS = tuple(mb * MB for mb in (1, 4, 16, 64, 128, 256, 512, 1024, 2048, 4096))
+
+STAGE_MEMORY = METRICS.histogram(
+    "pdf2pptx_stage_memory_bytes", "Resident memory added by each pipeline stage (rss) and the peak of its "
+    "Python allocations (traced)", ("stage", "measure"), buckets=MEMORY_BUCKETS)
+MEMORY_ADMISSION_WAIT = METRICS.histogram(
+    "pdf2pptx_memory_admission_wait_seconds", "Time a conversion waited for room in the memory budget")
+MEMORY_REJECTIONS = METRICS.counter(
+    "pdf2pptx_memory_rejections_total", "Conversions refused by the memory budget", ("reason",))
+
+# Memory of a conversion: a fixed part (python-pptx template, model responses), pdfminer layout
+# objects, text and prompts per page, and per byte of PDF the images the deck holds until it is
+# saved. Peaks measured on the synthetic corpus with the model pipeline stay 25-50% below it.
+JOB_BASE_BYTES = 12 * MB
+JOB_PAGE_BYTES = 90 * 1024
+JOB_FILE_FACTOR = 16
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _load_malloc_trim():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c")).malloc_trim
+    except (OSError, AttributeError, TypeError):
+        # Not glibc (musl, macOS, Windows)
+        return None
+
+
+_malloc_trim = _load_malloc_trim()
+
+
+def rss_bytes():
+    """Resident set size of the process; its peak so far where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes everywhere but on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def physical_memory_bytes():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def start_tracing(frames=1):
+    """Traces Python allocations so stages also report their allocation peak; costs CPU on every allocation."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+class StageMemory:
+    """
+    Memory of one stage, from its creation to finish(): the resident memory it added and, while
+    tracemalloc traces, the peak of Python allocations above the level at its start. Both are
+    process-wide, so with concurrent jobs a stage is also charged for what the others allocated
+    meanwhile, and native memory (MuPDF, Pillow, lxml) only shows in the resident memory.
+    """
+
+    def __init__(self):
+        self.rss_before = rss_bytes()
+        self.traced_before = None
+        if tracemalloc.is_tracing():
+            self.traced_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+
+    def finish(self):
+        rss = rss_bytes()
+        sample = {"rss_bytes": rss, "rss_delta_bytes": rss - self.rss_before}
+        if self.traced_before is not None and tracemalloc.is_tracing():
+            sample["traced_peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - self.traced_before)
+        return sample
+
+
+def estimate_job_memory(file_bytes, page_count, selected_pages=None):
+    """
+    Bytes a conversion is expected to hold at its peak; `selected_pages` (a count) limits the
+    per-page and per-file parts to the share of the document that is read.
+    """
+    pages = page_count if selected_pages is None else min(selected_pages, page_count)
+    share = pages / page_count if page_count else 1.0
+    return int(JOB_BASE_BYTES + pages * JOB_PAGE_BYTES + file_bytes * share * JOB_FILE_FACTOR)
+
+
+def release_memory():
+    """
+    Hands memory a finished job freed back to the system: MuPDF's cache of decoded objects is
+    emptied and glibc's free heap is trimmed, which it otherwise keeps for later allocations.
+    """
+    fitz.TOOLS.store_shrink(100)
+    if _malloc_trim is not None:
+        _malloc_trim(0)
+
+
+class MemoryBudgetExceeded(Exception):
+    """A conversion could not be admitted: it is larger than a job may be, or no room was freed in time."""
+
+    def __init__(self, message, estimate, reason):
+        super().__init__(message)
+        self.estimate = estimate
+        self.reason = reason
+
+
+class MemoryBudget:
+    """
+    Estimated memory of the conversions a worker runs at once. A conversion reserves its estimate
+    before it starts and waits, first come first served, until the reservations of running ones
+    leave room for it; one larger than `job_limit` is refused outright. A conversion larger than
+    the whole capacity (but within the job limit) runs once nothing else does.
+    """
+
+    def __init__(self, capacity, job_limit=None):
+        self.capacity = capacity
+        self.job_limit = job_limit
+        self.reserved = 0
+        self._waiting = collections.deque()
+        self._tickets = itertools.count()
+        self._condition = threading.Condition()
+
+    def check(self, estimate):
+        """Raises MemoryBudgetExceeded when a conversion of `estimate` bytes may never run."""
+        if self.job_limit is not None and estimate > self.job_limit:
+            MEMORY_REJECTIONS.inc(reason="job_limit")
+            raise MemoryBudgetExceeded(
+                f"The document needs about {estimate // MB} MB, more than the {self.job_limit // MB} MB a "
+                f"conversion may use; select fewer pages", estimate, "job_limit")
+
+    def _fits(self, estimate):
+        return self.reserved == 0 or self.reserved + estimate <= self.capacity
+
+    @contextmanager
+    def reserve(self, estimate, timeout=None):
+        """Holds `estimate` bytes of the budget for the block; waits at most `timeout` seconds for them."""
+        self.check(estimate)
+        started = time.perf_counter()
+        ticket = next(self._tickets)
+        with self._condition:
+            self._waiting.append(ticket)
+            admitted = self._condition.wait_for(
+                lambda: self._waiting[0] == ticket and self._fits(estimate), timeout)
+            self._waiting.remove(ticket)
+            if admitted:
+                self.reserved += estimate
+            # The next in line may fit now, or was waiting behind this one
+            self._condition.notify_all()
+        MEMORY_ADMISSION_WAIT.observe(time.perf_counter() - started)
+        if not admitted:
+            MEMORY_REJECTIONS.inc(reason="timeout")
+            raise MemoryBudgetExceeded(
+                f"No memory for the conversion was freed within {timeout:g}s", estimate, "timeout")
+
+        try:
+            yield estimate
+        finally:
+            with self._condition:
+                self.reserved -= estimate
+                self._condition.notify_all()
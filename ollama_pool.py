@@ -0,0 +1,275 @@
+import collections
+import logging
+import threading
+import time
+
+import httpx
+import ollama
+
+from instrumentation import METRICS, job_id_var
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_HOST_LATENCY = METRICS.histogram(
+    "pdf2pptx_ollama_host_latency_seconds", "Duration of chat calls per Ollama host", ("host",))
+OLLAMA_HOST_RETRIES = METRICS.counter(
+    "pdf2pptx_ollama_host_retries_total", "Chat calls sent again to another host after a failure", ("host",))
+
+# Recent call durations kept per host for the percentiles of stats()
+LATENCY_WINDOW = 200
+# Documents remembered for host affinity
+AFFINITY_SIZE = 10000
+# Ollama answers 503 when its request queue is full
+RETRY_STATUS_CODES = (503,)
+
+
+def _model_names(response):
+    names = set()
+    for model in response.get("models") or []:
+        for key in ("model", "name"):
+            if model.get(key):
+                names.add(model[key])
+    return names
+
+
+def _same_model(name, names):
+    """Ollama lists "llama3:latest" for a model requested as "llama3"."""
+    return name in names or (":" not in name and f"{name}:latest" in names)
+
+
+class OllamaHost:
+    """One Ollama server: its client, the models it has loaded and available, its load and latency."""
+
+    def __init__(self, url, client=None):
+        self.url = url.rstrip("/")
+        self.client = client or ollama.Client(host=self.url)
+        self.healthy = True
+        self.loaded = set()
+        self.available = set()
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.last_error = None
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def serves(self, model):
+        return _same_model(model, self.available) or _same_model(model, self.loaded)
+
+    def stats(self):
+        ordered = sorted(self.latencies)
+
+        def at(fraction):
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 4) if ordered else None
+
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded),
+            "p50_seconds": at(0.5),
+            "p95_seconds": at(0.95),
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    """
+    Sends chat calls to several Ollama hosts. A call goes to the healthy host with the fewest calls
+    in flight among those that have the model loaded (/api/ps), then among those that have it
+    pulled (/api/tags), then among any healthy host. Hosts are probed every `probe_interval`
+    seconds by a background thread once start() is called.
+
+    Calls of the same document stay on the host that served its first call, while that host is
+    healthy and has the model, so the document's prompt prefix stays in that host's cache. The
+    document is the job id of the calling context unless an affinity key is given.
+
+    A call that cannot connect (or gets a 503) is sent to another host, up to `max_attempts`
+    hosts; the failing host is marked unhealthy until a probe reaches it again. A streamed call
+    is only retried before its first chunk.
+
+    With `slots` (a ModelSlots) and `per_host_limit`, the in-flight limit of every model is kept
+    at `per_host_limit` times the number of healthy hosts, so adding a host adds concurrency.
+
+    Has the same chat() signature as the ollama module, so it can replace it as chat backend.
+    """
+
+    def __init__(self, urls, probe_interval=15.0, max_attempts=3, clients=None, slots=None, per_host_limit=None):
+        if not urls:
+            raise ValueError("An Ollama pool needs at least one host")
+        clients = clients or {}
+        self.hosts = [OllamaHost(url, clients.get(url)) for url in urls]
+        self.probe_interval = probe_interval
+        self.max_attempts = max_attempts
+        self.slots = slots
+        self.per_host_limit = per_host_limit
+        self._affinity = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._resize_slots()
+
+    @classmethod
+    def from_env(cls, value, **options):
+        """Pool of the comma separated host URLs in `value` (e.g. OLLAMA_HOSTS), None when it is empty."""
+        urls = [url.strip() for url in (value or "").split(",") if url.strip()]
+        return cls(urls, **options) if urls else None
+
+    def probe(self, host):
+        """Reads the loaded (/api/ps) and pulled (/api/tags) models of a host; unreachable hosts become unhealthy."""
+        try:
+            loaded = _model_names(host.client.ps())
+            available = _model_names(host.client.list())
+        except (ConnectionError, httpx.HTTPError, ollama.ResponseError) as e:
+            with self._lock:
+                if host.healthy:
+                    logger.warning("Ollama host %s is unreachable: %s", host.url, e)
+                host.healthy = False
+                host.last_error = str(e)
+            self._resize_slots()
+            return False
+        with self._lock:
+            if not host.healthy:
+                logger.info("Ollama host %s is back", host.url)
+            host.healthy = True
+            host.loaded = loaded
+            host.available = available
+        self._resize_slots()
+        return True
+
+    def healthy_count(self):
+        with self._lock:
+            return sum(1 for host in self.hosts if host.healthy)
+
+    def _resize_slots(self):
+        if self.slots is not None and self.per_host_limit:
+            self.slots.set_limit(self.per_host_limit * max(1, self.healthy_count()))
+
+    def probe_all(self):
+        for host in self.hosts:
+            self.probe(host)
+
+    def _probe_loop(self):
+        while not self._stop.is_set():
+            self.probe_all()
+            self._stop.wait(self.probe_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._probe_loop, name="ollama-probe", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def choose(self, model, affinity_key=None, exclude=()):
+        """The host for the next call of `model`; None when every host is excluded."""
+        with self._lock:
+            candidates = [host for host in self.hosts if host not in exclude]
+            if not candidates:
+                return None
+            pinned = self._affinity.get(affinity_key) if affinity_key else None
+            if pinned in candidates and pinned.healthy and (pinned.serves(model) or not pinned.available):
+                self._affinity.move_to_end(affinity_key)
+                return pinned
+
+            healthy = [host for host in candidates if host.healthy] or candidates
+            tiers = ([h for h in healthy if _same_model(model, h.loaded)],
+                     [h for h in healthy if h.serves(model)],
+                     healthy)
+            pool = next(tier for tier in tiers if tier)
+            host = min(pool, key=lambda h: (h.in_flight, self._median(h)))
+
+            if affinity_key:
+                self._affinity[affinity_key] = host
+                self._affinity.move_to_end(affinity_key)
+                while len(self._affinity) > AFFINITY_SIZE:
+                    self._affinity.popitem(last=False)
+            return host
+
+    @staticmethod
+    def _median(host):
+        return sorted(host.latencies)[len(host.latencies) // 2] if host.latencies else 0.0
+
+    def _begin(self, host):
+        with self._lock:
+            host.in_flight += 1
+
+    def _end(self, host, started, error=None, unreachable=False):
+        seconds = time.perf_counter() - started
+        with self._lock:
+            host.in_flight -= 1
+            host.calls += 1
+            if error is None:
+                host.latencies.append(seconds)
+            else:
+                host.failures += 1
+                host.last_error = str(error)
+                # Until the next successful probe
+                host.healthy = host.healthy and not unreachable
+        if error is None:
+            OLLAMA_HOST_LATENCY.observe(seconds, host=host.url)
+        elif unreachable:
+            self._resize_slots()
+
+    @staticmethod
+    def _retryable(error):
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code in RETRY_STATUS_CODES
+        return isinstance(error, (ConnectionError, httpx.TransportError))
+
+    def chat(self, model, messages=None, stream=False, affinity_key=None, **kwargs):
+        if affinity_key is None:
+            job_id = job_id_var.get()
+            # "-" is the job id outside of a job
+            affinity_key = job_id if job_id != "-" else None
+        tried = []
+        while True:
+            host = self.choose(model, affinity_key if not tried else None, exclude=tried)
+            if host is None:
+                raise ConnectionError(f"No Ollama host could serve {model} (tried {len(tried)})")
+            tried.append(host)
+            self._begin(host)
+            started = time.perf_counter()
+            try:
+                response = host.client.chat(model=model, messages=messages, stream=stream, **kwargs)
+                first = next(response, None) if stream else None
+            except Exception as e:
+                retryable = self._retryable(e)
+                self._end(host, started, error=e, unreachable=retryable)
+                if not retryable or len(tried) >= min(self.max_attempts, len(self.hosts)):
+                    raise
+                logger.warning("Ollama host %s failed, sending the call to another host: %s", host.url, e)
+                OLLAMA_HOST_RETRIES.inc(host=host.url)
+                continue
+
+            if affinity_key and len(tried) > 1:
+                with self._lock:
+                    self._affinity[affinity_key] = host
+            if not stream:
+                self._end(host, started)
+                return response
+            return self._stream(host, started, first, response)
+
+    def _stream(self, host, started, first, response):
+        error = None
+        try:
+            if first is not None:
+                yield first
+            yield from response
+        except Exception as e:
+            # A host dropping the connection mid-answer counts against its health like a failed call
+            error = e
+            raise
+        finally:
+            self._end(host, started, error=error, unreachable=error is not None and self._retryable(error))
+
+    def stats(self):
+        with self._lock:
+            return [host.stats() for host in self.hosts]
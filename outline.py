@@ -0,0 +1,222 @@
+import bisect
+import logging
+import re
+from collections import Counter
+
+import fitz
+
+from instrumentation import EXTRACTOR_DURATION
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_NOT_A_HEADING = re.compile(r"^[\W\d_]*$")
+# The document's own table of contents is navigation, not a section worth a slide
+_CONTENTS_TITLE = re.compile(r"^(table of )?contents$", re.IGNORECASE)
+
+# Outline entries and heading sizes deeper than this become part of their parent section
+MAX_LEVEL = 2
+# A skeleton with fewer sections than this is not worth trusting over the model
+MIN_SECTIONS = 2
+# Lines at least this much larger than the body text are headings
+HEADING_SIZE_RATIO = 1.15
+MAX_HEADING_CHARS = 100
+# A style covering more of the text than this is body text, however large or bold it is
+MAX_HEADING_SHARE = 0.2
+BOLD_FLAG = 16
+
+
+def _clean(text):
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+class OutlineExtractor:
+    """
+    Reads the section skeleton of a PDF without a model.
+
+    The bookmark outline is used when the document has one; otherwise headings are recognized by
+    their typography, with font size and weight statistics gathered in a single pass over the
+    spans of every page. Either way the result lists the sections in document order with their
+    raw text and the pages they span ("page_start"/"page_end", 0-based, inclusive).
+    """
+
+    def __init__(self, max_level=MAX_LEVEL, min_sections=MIN_SECTIONS):
+        self.max_level = max_level
+        self.min_sections = min_sections
+
+    def extract(self, pdf_path, pages=None):
+        """
+        Sections of the whole document, or only of `pages` (0-based numbers) when given.
+
+        Returns:
+            dict: {"source": "outline"|"fonts", "title": str|None, "sections": [...]}, or None when
+            the document has neither an outline nor recognizable headings
+        """
+        with EXTRACTOR_DURATION.time(engine="pymupdf_outline"):
+            with fitz.open(pdf_path) as pdf_document:
+                skeleton = self.from_toc(pdf_document, pages) or self.from_fonts(pdf_document, pages)
+
+        if not skeleton or len(skeleton["sections"]) < self.min_sections:
+            return None
+        logger.info("Read %d sections from the %s", len(skeleton["sections"]), skeleton["source"])
+        return skeleton
+
+    def from_toc(self, pdf_document, pages=None):
+        selected = set(range(pdf_document.page_count)) if pages is None else set(pages)
+        entries = [(level, _clean(title), page - 1) for level, title, page in pdf_document.get_toc(simple=True)
+                   if level <= self.max_level and page - 1 in selected and _clean(title)]
+        if not entries:
+            return None
+
+        # Pages outside the selection count as empty, so offsets stay aligned with page numbers
+        page_texts = [pdf_document[number].get_text() if number in selected else ""
+                      for number in range(pdf_document.page_count)]
+        page_offsets = []
+        offset = 0
+        for text in page_texts:
+            page_offsets.append(offset)
+            offset += len(text)
+        full_text = "".join(page_texts)
+        lower_text = full_text.lower()
+
+        # Where each entry's text begins: right after its title on its page, never before the previous one
+        starts = []
+        cursor = 0
+        for level, title, page in entries:
+            page_start = max(page_offsets[page], cursor)
+            page_end = page_offsets[page + 1] if page + 1 < len(page_offsets) else len(full_text)
+            found = lower_text.find(title.lower(), page_start, page_end)
+            begin = page_start if found == -1 else found
+            starts.append((begin, begin if found == -1 else found + len(title)))
+            cursor = begin
+
+        sections = []
+        for i, (level, title, page) in enumerate(entries):
+            body_start = starts[i][1]
+            end = starts[i + 1][0] if i + 1 < len(entries) else len(full_text)
+            last_page = bisect.bisect_right(page_offsets, max(body_start, end - 1)) - 1
+            sections.append({
+                "title": title,
+                "level": level,
+                "text": full_text[body_start:end].strip(),
+                "page_start": page,
+                "page_end": max(page, last_page)
+            })
+
+        return {"source": "outline", "title": _clean(pdf_document.metadata.get("title")) or None,
+                "sections": self._kept(sections)}
+
+    def from_fonts(self, pdf_document, pages=None):
+        lines = []
+        characters = Counter()
+
+        selected = enumerate(pdf_document) if pages is None else \
+            ((page_number, pdf_document[page_number]) for page_number in sorted(pages))
+        for page_number, page in selected:
+            # Text blocks only: image blocks would carry the decoded image bytes
+            for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
+                block_lines = block.get("lines") or []
+                for line in block_lines:
+                    spans = [span for span in line["spans"] if span["text"].strip()]
+                    if not spans:
+                        continue
+                    text = _clean(" ".join(span["text"] for span in spans))
+                    size = round(max(span["size"] for span in spans) * 2) / 2
+                    bold = all(span["flags"] & BOLD_FLAG or "bold" in span["font"].lower() for span in spans)
+                    characters[size, bold] += len(text)
+                    lines.append((page_number, text, size, bold, len(block_lines) == 1))
+                # Paragraph break between blocks
+                lines.append((page_number, None, None, None, None))
+
+        if not characters:
+            return None
+
+        (body_size, _), _ = characters.most_common(1)[0]
+        heading_levels = self._heading_levels(characters, body_size)
+        if not heading_levels:
+            return None
+
+        title = None
+        sections = []
+        current = None
+        body = []
+        previous_style = None
+
+        def close_section():
+            if current is not None:
+                current["text"] = "\n".join(body).strip()
+                sections.append(current)
+            body.clear()
+
+        for page_number, text, size, bold, standalone in lines:
+            if text is None:
+                if body and body[-1]:
+                    body.append("")
+                previous_style = None
+                continue
+
+            style = (size, bold)
+            level = heading_levels.get(style)
+            if level is not None and not standalone and size < body_size * HEADING_SIZE_RATIO:
+                # Bold words at body size inside a paragraph are emphasis, not a heading
+                level = None
+            if level is None or len(text) > MAX_HEADING_CHARS or _NOT_A_HEADING.match(text):
+                body.append(text)
+                if current is not None:
+                    current["page_end"] = page_number
+                previous_style = None
+                continue
+
+            if style == previous_style and not body:
+                # Headings broken over several lines
+                if current is not None:
+                    current["title"] = f"{current['title']} {text}"
+                    continue
+                if title is not None and level == 0:
+                    title = f"{title} {text}"
+                    continue
+            if level == 0:
+                # The largest type, used once at the top, is the document title
+                if title is None and not sections and current is None:
+                    title = text
+                    previous_style = style
+                    continue
+                level = 1
+
+            close_section()
+            current = {"title": text, "level": level, "page_start": page_number, "page_end": page_number}
+            previous_style = style
+
+        close_section()
+        return {"source": "fonts", "title": title,
+                "sections": self._kept(sections)}
+
+    @staticmethod
+    def _kept(sections):
+        return [section for section in sections if section["text"] and not _CONTENTS_TITLE.match(section["title"])]
+
+    def _heading_levels(self, characters, body_size):
+        """
+        Maps (size, bold) styles to heading levels: 1 for the largest heading style, 2 for the next.
+        Level 0 marks a style used for a single short line, bigger than every heading (the title).
+        """
+        total = sum(characters.values())
+
+        candidates = []
+        for (size, bold), count in characters.items():
+            if count > total * MAX_HEADING_SHARE:
+                continue
+            if size >= body_size * HEADING_SIZE_RATIO or (bold and size >= body_size):
+                candidates.append((size, bold))
+        candidates.sort(key=lambda style: (style[0], style[1]), reverse=True)
+
+        levels = {}
+        if len(candidates) > self.max_level and characters[candidates[0]] <= MAX_HEADING_CHARS:
+            levels[candidates.pop(0)] = 0
+        for level, style in enumerate(candidates[:self.max_level], start=1):
+            levels[style] = level
+        return levels
+
+
+def extract_skeleton(pdf_path, pages=None):
+    return OutlineExtractor().extract(pdf_path, pages)
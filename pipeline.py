@@ -0,0 +1,961 @@
+import contextvars
+import copy
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from artifact_store import ArtifactStore
+from instrumentation import STAGE_DURATION, EXTRACTOR_DURATION, CACHE_HITS, FALLBACKS, JOBS, JOB_DURATION
+from image_assignment import assign_images
+from image_association import TfidfImageAssociator
+from manageData import MODEL_SLOTS, OUTPUT_RATES, OllamaProcessor, deadline_var, is_unparsed_structure, \
+    scheduling_context
+from memory import STAGE_MEMORY, StageMemory, estimate_job_memory, release_memory
+from outline import extract_skeleton
+from ppt_generator import PdfToPptxConverter
+from readPDF import PdfExtractor
+from segmenter import condense_text, segment_document
+
+logger = logging.getLogger(__name__)
+
+# Model id of the LLM-free mode: PyMuPDF text, heuristic sections, local image association
+FAST_MODE = "fast"
+
+
+def parse_pages(value):
+    """
+    Page selection from a "pages" form value: 1-based ranges such as "1-10,15,40-" or "sampled".
+
+    Returns:
+        None for every page, "sampled", or a list of 0-based ranges; a ValueError names a bad range
+    """
+    value = (value or "").strip().lower()
+    if value in ("", "all"):
+        return None
+    if value == "sampled":
+        return value
+    ranges = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, dash, last = part.partition("-")
+        try:
+            start = int(first)
+            end = (int(last) if last.strip() else sys.maxsize) if dash else start
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part}")
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range: {part}")
+        ranges.append(range(start - 1, end))
+    return ranges or None
+
+
+def select_pages(selection, page_count, sample_size):
+    """
+    0-based pages a selection of parse_pages covers in a document of `page_count` pages, None for all.
+    The sample is the first half of `sample_size` pages (title, contents, introduction) and the
+    other half spread evenly over the rest of the document.
+    """
+    if selection is None:
+        return None
+    if selection == "sampled":
+        if page_count <= sample_size:
+            return None
+        head = sample_size // 2
+        step = (page_count - head) / (sample_size - head)
+        return sorted(set(range(head)) | {head + int(i * step) for i in range(sample_size - head)})
+    pages = sorted({number for pages in selection for number in range(pages.start, min(pages.stop, page_count))})
+    if not pages:
+        raise ValueError(f"No selected page is in the document ({page_count} pages)")
+    return pages
+
+
+def conversion_memory(pdf_path, pages=None):
+    """
+    Estimated memory of converting a spooled PDF with a page selection of parse_pages. Raises
+    ValueError when the selection has no page in the document.
+    """
+    file_bytes = os.path.getsize(pdf_path)
+    try:
+        page_count = PdfExtractor.page_count(pdf_path)
+    except Exception as e:
+        # The conversion fails on it before it holds much
+        logger.warning("Error reading the page count, estimating the memory from the file size: %s", e)
+        return estimate_job_memory(file_bytes, 0)
+    selected = select_pages(pages, page_count, ConversionPipeline.SAMPLE_PAGES)
+    return estimate_job_memory(file_bytes, page_count, None if selected is None else len(selected))
+
+
+class ConversionPipeline:
+    """
+    Runs the PDF to PPTX conversion as explicit stages:
+    extract_text -> extract_images -> outline -> clean -> analyze -> associate -> assign_images -> render.
+
+    When an ArtifactStore is given, the output of every successful stage is persisted under a
+    key derived from the PDF content, so re-running a failed or re-themed job resumes from the
+    last good stage. A failing stage only falls back for itself; the output of earlier stages is kept.
+
+    With model_name FAST_MODE no model is called: text comes from PyMuPDF, cleaning is skipped and
+    the structure comes from the heuristic segmenter.
+
+    When the PDF has a bookmark outline or recognizable heading typography, the section titles and
+    page spans are taken from it: cleaning is skipped and the model only condenses each section.
+
+    Under a Deadline (given or taken from the scheduling context) model calls are cancelled
+    RENDER_RESERVE_SECONDS before it, and stages that are not expected to finish in time degrade
+    instead: cleaning is skipped, the structure comes from the heuristic segmenter, images are
+    matched locally or dropped. Each degradation is listed in `degradations` and emitted as a
+    "stage_degraded" event.
+
+    With `speculative`, the heuristic deck (the fast mode structure, locally matched images) is
+    rendered in the background from the moment the text is extracted. It is served as soon as the
+    model pipeline raises or ends without any model output, e.g. at its deadline, and discarded
+    otherwise; the failure then costs no extra segmentation and rendering time.
+
+    `pages` (see parse_pages) limits every stage to some pages of the PDF: text, images and
+    outline are only read from them, so the prompts only carry their text.
+
+    The memory every stage added (see StageMemory) is kept in `stage_memory` and sent with its
+    "stage_finished" event; the text is dropped once consumed, before the slides are built.
+    """
+
+    # Pages read in "sampled" mode
+    SAMPLE_PAGES = 20
+
+    # Budget kept for association and rendering after the model calls
+    RENDER_RESERVE_SECONDS = 3.0
+    # Characters the model writes for a document structure, the bullets of one section, an image match
+    ANALYZE_OUTPUT_CHARS = 3000
+    CONDENSE_OUTPUT_CHARS = 500
+    ASSOCIATE_OUTPUT_CHARS = 1000
+
+    # Images stored before captions and context were recorded are extracted again
+    IMAGE_PARAMS = {"context": True}
+
+    STAGES = ("extract_text", "extract_images", "outline", "clean", "analyze", "associate", "assign_images",
+              "render")
+
+    def __init__(self, model_name="llama3", theme="default", artifact_store=None, progress_callback=None,
+                 image_association="local", render_executor=None, deadline=None, speculative=False, pages=None):
+        self.model_name = model_name
+        # A list of themes renders a zip with one deck per theme from the same analysis
+        self.theme = theme
+        self.render_executor = render_executor
+        self.image_association = image_association
+        self.fast = model_name == FAST_MODE
+        self.speculative = speculative and not self.fast
+        self.page_texts = None
+        self.artifact_store = artifact_store
+        self.progress_callback = progress_callback
+        self.ollama_processor = OllamaProcessor(model_name=model_name, progress_callback=progress_callback)
+        self.document_key = None
+        # Content hash of every page, for reusing the pages a revision of the document did not change
+        self.page_hashes = None
+        self.pages = pages
+        # 0-based pages the stages read, None for all
+        self.selected_pages = None
+        self.stage_timings = {}
+        self.stage_sources = {}
+        self.stage_intervals = {}
+        # Resident memory (and traced allocation peak) of every stage, see StageMemory
+        self.stage_memory = {}
+        self.image_overlap = 0.0
+        self.deadline = deadline if deadline is not None else deadline_var.get()
+        self.llm_deadline = self.deadline.shortened(self.RENDER_RESERVE_SECONDS) if self.deadline else None
+        self.degradations = []
+        # Sections of an outline condensed by the model
+        self.model_sections = 0
+
+    def _run_stage(self, stage, compute, params=None, cacheable=None, load_check=None):
+        """
+        Returns the stage output from the artifact store if present, otherwise computes and stores it.
+
+        Args:
+            stage (str): Stage name
+            compute (callable): Produces the stage output
+            params (dict): Parameters that change the output of the stage (model, ...)
+            cacheable (callable): Predicate deciding whether a computed value is a good result
+            load_check (callable): Predicate validating a stored value before reusing it
+        """
+        started = time.perf_counter()
+        memory = StageMemory()
+        store = self.artifact_store if self.document_key else None
+        self._emit("stage_started", {"stage": stage})
+
+        if store:
+            value = store.load(self.document_key, stage, params)
+            if value is not None and (load_check is None or load_check(value)):
+                self._record_timing(stage, started, memory)
+                self.stage_sources[stage] = "cache"
+                logger.info("Stage '%s' resumed from stored artifact", stage)
+                self._emit_stage_finished(stage)
+                return value
+
+        # compute() may mark the stage as "fallback" when it had to degrade
+        self.stage_sources[stage] = "computed"
+        value = compute()
+        self._record_timing(stage, started, memory)
+        self._emit_stage_finished(stage)
+
+        if store and value is not None and (cacheable is None or cacheable(value)):
+            store.save(self.document_key, stage, value, params)
+        return value
+
+    def _emit(self, event, data=None):
+        if self.progress_callback:
+            try:
+                self.progress_callback(event, data or {})
+            except Exception as e:
+                logger.warning("Error reporting progress: %s", e)
+
+    def _emit_stage_finished(self, stage, **extra):
+        seconds = self.stage_timings.get(stage, 0.0)
+        source = self.stage_sources.get(stage)
+        STAGE_DURATION.observe(seconds, stage=stage, source=source)
+        if source == "cache":
+            CACHE_HITS.inc(stage=stage)
+        elif source == "fallback":
+            FALLBACKS.inc(stage=stage)
+        memory = self.stage_memory.get(stage)
+        if memory:
+            STAGE_MEMORY.observe(max(0, memory["rss_delta_bytes"]), stage=stage, measure="rss")
+            if "traced_peak_bytes" in memory:
+                STAGE_MEMORY.observe(memory["traced_peak_bytes"], stage=stage, measure="traced")
+        logger.info("Stage '%s' finished", stage,
+                    extra={"stage": stage, "seconds": round(seconds, 3), "source": source, "memory": memory})
+
+        self._emit("stage_finished", dict({
+            "stage": stage,
+            "seconds": round(self.stage_timings.get(stage, 0.0), 3),
+            "source": self.stage_sources.get(stage),
+            "memory": memory
+        }, **extra))
+
+    def _fits(self, output_chars):
+        """Whether the model is expected to write `output_chars` characters before its calls are cut off."""
+        if self.llm_deadline is None:
+            return True
+        remaining = self.llm_deadline.remaining()
+        # Under the default budget an unmeasured model is not ruled out by the guessed rate, only by
+        # the budget running out; its calls are still cancelled at the deadline
+        if not self.llm_deadline.requested and not OUTPUT_RATES.measured(self.model_name):
+            return remaining > 0
+        return OUTPUT_RATES.seconds(self.model_name, output_chars) <= remaining
+
+    def _degrade(self, stage, action, reason):
+        entry = {"stage": stage, "action": action, "reason": reason}
+        self.degradations.append(entry)
+        # Degraded output is never stored as the stage's result
+        self.stage_sources[stage] = "fallback"
+        logger.warning("Stage '%s' degraded (%s): %s", stage, action, reason)
+        self._emit("stage_degraded", entry)
+
+    def _cancelled_since(self, count):
+        return self.llm_deadline is not None and len(self.llm_deadline.cancelled) > count
+
+    def _cancelled_count(self):
+        return len(self.llm_deadline.cancelled) if self.llm_deadline else 0
+
+    def _record_timing(self, stage, started, memory=None):
+        ended = time.perf_counter()
+        self.stage_timings[stage] = ended - started
+        self.stage_intervals[stage] = (started, ended)
+        if memory is not None:
+            self.stage_memory[stage] = memory.finish()
+
+    def stage_overlap(self, first, second):
+        """Seconds during which two stages were running at the same time."""
+        if first not in self.stage_intervals or second not in self.stage_intervals:
+            return 0.0
+        first_start, first_end = self.stage_intervals[first]
+        second_start, second_end = self.stage_intervals[second]
+        return max(0.0, min(first_end, second_end) - max(first_start, second_start))
+
+    def set_document(self, pdf_path=None, pdf_text=None):
+        """Derives the page selection and the artifact key of the document, so stages can also be run one by one."""
+        if pdf_path and not pdf_text and self.pages is not None:
+            self.selected_pages = select_pages(self.pages, PdfExtractor.page_count(pdf_path), self.SAMPLE_PAGES)
+        if not self.artifact_store:
+            return None
+        if pdf_path and not pdf_text:
+            self.document_key = ArtifactStore.hash_file(pdf_path)
+            if self.selected_pages is not None:
+                # Stages of another selection of the same file have other results
+                self.document_key = ArtifactStore.hash_bytes(f"{self.document_key}:{self.selected_pages}")
+            try:
+                self.page_hashes = list(PdfExtractor.page_hashes(pdf_path, self.selected_pages))
+            except Exception as e:
+                logger.warning("Error hashing pages, the document is processed as a whole: %s", e)
+        elif pdf_text:
+            self.document_key = ArtifactStore.hash_bytes(pdf_text)
+        return self.document_key
+
+    def extract_text(self, pdf_path):
+        def compute():
+            try:
+                if self.fast:
+                    self.page_texts = PdfExtractor().extract_page_texts(pdf_path, **self._selection())
+                    # Pages are separated by form feeds, like pdfminer's text, for the running header check
+                    return "\f".join(self.page_texts[number] for number in self._page_numbers())
+                if self.page_hashes:
+                    return self._extract_text_by_page(pdf_path)
+                return PdfExtractor().extract_text(pdf_path, **self._selection())
+            except Exception as e:
+                logger.error("Error extracting text from PDF: %s", e)
+                raise ValueError(f"Failure to extract text or images: {str(e)}")
+
+        text = self._run_stage("extract_text", compute, params={"engine": "pymupdf"} if self.fast else None)
+        self._emit("text_extracted", {"characters": len(text or "")})
+        return text
+
+    def extract_images(self, pdf_path):
+        from image_extractor import ImageExtractor
+
+        output_folder = None
+        if self.artifact_store and self.document_key:
+            output_folder = self.artifact_store.stage_dir(self.document_key, "extract_images")
+
+        def images_exist(images):
+            return all(os.path.exists(img['path']) for img in images if isinstance(img, dict))
+
+        def compute():
+            if self.page_hashes:
+                return self._extract_images_by_page(pdf_path, output_folder)
+            with EXTRACTOR_DURATION.time(engine="pymupdf_images"):
+                images = ImageExtractor.extract_images_from_pdf(pdf_path, output_folder, **self._selection())
+            return ImageExtractor.optimize_images(images)
+
+        image_data = self._run_stage("extract_images", compute, params=self.IMAGE_PARAMS, load_check=images_exist)
+        logger.info("Found %d images in the PDF", len(image_data))
+        self._emit("images_extracted", {"count": len(image_data)})
+        return image_data
+
+    def _selection(self):
+        """Keyword arguments limiting an extractor to the selected pages."""
+        return {} if self.selected_pages is None else {"pages": self.selected_pages}
+
+    def _page_numbers(self):
+        if self.selected_pages is not None:
+            return self.selected_pages
+        return range(len(self.page_texts if self.page_hashes is None else self.page_hashes))
+
+    def _pieces_reused(self, kind, reused, total):
+        if reused:
+            CACHE_HITS.inc(reused, stage=kind)
+        logger.info("Reused %d of %d %s pieces", reused, total, kind)
+        self._emit("pieces_reused", {"kind": kind, "reused": reused, "total": total})
+
+    def _piece(self, kind, content, params, compute, cacheable=None):
+        """
+        compute(), or the value stored for the same `content` by an earlier conversion, e.g. of
+        another revision of the document. Computed values are stored when `cacheable` accepts them.
+        """
+        store = self.artifact_store
+        if store is None:
+            return compute()
+        key = ArtifactStore.hash_bytes(content)
+        value = store.load_piece(kind, key, params)
+        if value is not None:
+            self._pieces_reused(kind, 1, 1)
+            return value
+        value = compute()
+        if value is not None and (cacheable is None or cacheable(value)):
+            store.save_piece(kind, key, value, params)
+        return value
+
+    def _extract_text_by_page(self, pdf_path):
+        """Document text put together page by page: only pages with a hash not seen before are read."""
+        store = self.artifact_store
+        pages = {number: store.load_piece("page_text", self.page_hashes[number]) for number in self._page_numbers()}
+        missing = [number for number, page in pages.items() if page is None]
+        for number, page in PdfExtractor.extract_pages(pdf_path, missing).items():
+            pages[number] = page
+            # A page an engine failed on is read again next time
+            if None not in page.values():
+                store.save_piece("page_text", self.page_hashes[number], page)
+        self._pieces_reused("page_text", len(pages) - len(missing), len(pages))
+        return PdfExtractor.extract_text_from_pages(list(pages.values()))
+
+    def _extract_images_by_page(self, pdf_path, output_folder):
+        """Images of the document, extracted only from pages with a hash not seen before."""
+        from image_extractor import ImageExtractor
+
+        store = self.artifact_store
+        stored = {number: store.load_piece("page_images", self.page_hashes[number]) for number in self._page_numbers()}
+        # The files of a stored page live with the revision it was read from
+        missing = [number for number, images in stored.items()
+                   if images is None or not all(os.path.exists(image['path']) for image in images)]
+        extracted = {number: [] for number in missing}
+        if missing:
+            with EXTRACTOR_DURATION.time(engine="pymupdf_images"):
+                images = ImageExtractor.extract_images_from_pdf(pdf_path, output_folder, pages=missing)
+            for image in ImageExtractor.optimize_images(images):
+                extracted[image["page_num"]].append(image)
+            for number in missing:
+                store.save_piece("page_images", self.page_hashes[number], extracted[number])
+
+        image_data = []
+        for number, images in stored.items():
+            # Unchanged pages may have moved in the new revision
+            image_data.extend(dict(image, page_num=number) for image in extracted.get(number, images))
+        image_data.sort(key=lambda image: image["size"], reverse=True)
+        self._pieces_reused("page_images", len(stored) - len(missing), len(stored))
+        return image_data
+
+    def extract_outline(self, pdf_path):
+        """Section skeleton from the PDF outline or its heading typography, None when there is neither."""
+        def compute():
+            try:
+                return extract_skeleton(pdf_path, **self._selection())
+            except Exception as e:
+                logger.warning("Error reading the document outline, the model will find the sections: %s", e)
+                return None
+
+        return self._run_stage("outline", compute, params={"engine": "pymupdf"})
+
+    def clean(self, text):
+        if self.fast:
+            return text
+
+        def clean_text():
+            # Cleaning writes the whole text again, and the analysis still has to follow
+            if not self._fits(len(text) + self.ANALYZE_OUTPUT_CHARS):
+                self._degrade("clean", "skipped", "not enough time left to clean the text")
+                return text
+            cancelled = self._cancelled_count()
+            cleaned = self.ollama_processor.clean_and_structure_text(text)
+            if self._cancelled_since(cancelled):
+                self._degrade("clean", "cancelled", "the deadline was reached while cleaning")
+            return cleaned
+
+        def compute():
+            # The same text in another revision of the document is not cleaned again
+            return self._piece("cleaned_text", text, {"model": self.model_name}, clean_text,
+                               cacheable=lambda cleaned: cleaned != text and
+                               self.stage_sources.get("clean") != "fallback")
+
+        return self._run_stage(
+            "clean",
+            compute,
+            params={"model": self.model_name},
+            # The processor returns the raw text when the model call fails
+            cacheable=lambda cleaned: cleaned != text
+        )
+
+    def analyze(self, cleaned_text, document_name, text):
+        if self.fast:
+            return self._run_stage("analyze", lambda: segment_document(text, document_name),
+                                   params={"model": FAST_MODE})
+
+        def analyze_text():
+            if not self._fits(self.ANALYZE_OUTPUT_CHARS):
+                self._degrade("analyze", "heuristic", "not enough time left for the model analysis")
+                return create_fallback_structure(text, document_name)
+            cancelled = self._cancelled_count()
+            try:
+                structure = self.ollama_processor.analyze_document_structure(cleaned_text)
+            except Exception as e:
+                logger.error("Error analyzing document structure: %s", e)
+                structure = None
+            if self._cancelled_since(cancelled):
+                self._degrade("analyze", "heuristic", "the deadline was reached during the model analysis")
+                return create_fallback_structure(text, document_name)
+            if is_unparsed_structure(structure):
+                logger.warning("Using heuristic structure instead of the model output")
+                self.stage_sources["analyze"] = "fallback"
+                return create_fallback_structure(text, document_name)
+            return normalize_document_structure(structure, document_name, text)
+
+        def compute():
+            return self._piece("document_structure", cleaned_text, {"model": self.model_name, "name": document_name},
+                               analyze_text, cacheable=lambda _: self.stage_sources.get("analyze") != "fallback")
+
+        return self._run_stage(
+            "analyze",
+            compute,
+            params={"model": self.model_name},
+            cacheable=lambda _: self.stage_sources.get("analyze") != "fallback"
+        )
+
+    def _condense_sections(self, sections):
+        """
+        Model bullets of every section, in section order. The prompts are sent concurrently, at most
+        as many at a time as the model has in-flight slots, so the stage lasts about as long as the
+        slowest section.
+        """
+        if self.fast or not sections:
+            return [[] for _ in sections]
+
+        # Sections with the same title and text in an earlier revision keep their bullets
+        store = self.artifact_store
+        params = {"model": self.model_name}
+        keys = [ArtifactStore.hash_bytes(f"{section['title']}\n{section['text']}") for section in sections]
+        contents = [(store.load_piece("section_bullets", key, params) if store else None) or [] for key in keys]
+        todo = [index for index, content in enumerate(contents) if not content]
+        if store:
+            self._pieces_reused("section_bullets", len(sections) - len(todo), len(sections))
+        if not todo:
+            return contents
+
+        workers = min(len(todo), MODEL_SLOTS.limit(self.model_name))
+        rounds = -(-len(todo) // workers)
+        if not self._fits(rounds * self.CONDENSE_OUTPUT_CHARS):
+            self._degrade("analyze", "heuristic", "not enough time left to condense the sections")
+            return contents
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="condense") as executor:
+            # One context copy per call, so every section logs with the job id
+            futures = {index: executor.submit(contextvars.copy_context().run, self.ollama_processor.condense_section,
+                                              sections[index]["title"], sections[index]["text"]) for index in todo}
+            for index, future in futures.items():
+                try:
+                    contents[index] = future.result()
+                except Exception as e:
+                    logger.error("Error condensing section '%s': %s", sections[index]["title"], e)
+                if contents[index] and store:
+                    store.save_piece("section_bullets", keys[index], contents[index], params)
+        return contents
+
+    def condense(self, skeleton, document_name):
+        """Structure built on a skeleton: titles and page spans are kept, each section's text is condensed."""
+        def compute():
+            sections = skeleton["sections"]
+            cancelled = self._cancelled_count()
+            contents = self._condense_sections(sections)
+            if self._cancelled_since(cancelled):
+                self._degrade("analyze", "heuristic", "the deadline was reached while condensing some sections")
+            missing = [section["title"] for section, content in zip(sections, contents) if not content]
+            if missing and not self.fast and self.stage_sources.get("analyze") != "fallback":
+                logger.warning("Using heuristic bullets for section '%s'", missing[0])
+                self.stage_sources["analyze"] = "fallback"
+            self.model_sections = len(sections) - len(missing)
+            return skeleton_structure(skeleton, document_name, contents)
+
+        return self._run_stage(
+            "analyze",
+            compute,
+            params={"model": self.model_name, "skeleton": ArtifactStore.params_hash(skeleton)},
+            cacheable=lambda _: self.stage_sources.get("analyze") != "fallback"
+        )
+
+    def structure(self, text, document_name, skeleton=None):
+        """
+        Returns:
+            tuple: (cleaned_text, document_structure), condensed from the skeleton when there is one,
+            otherwise cleaned and analyzed as a whole
+        """
+        # The model calls of this job wait behind those of smaller jobs, see ModelSlots
+        with scheduling_context(cost=len(text), deadline=self.llm_deadline):
+            if skeleton:
+                return text, self.condense(skeleton, document_name)
+            cleaned_text = self.clean(text)
+            return cleaned_text, self.analyze(cleaned_text, document_name, text)
+
+    def associate(self, document_structure, cleaned_text, image_data):
+        if not image_data:
+            return document_structure
+
+        use_llm = self.image_association == "llm" and not self.fast
+        if use_llm and not self._fits(self.ASSOCIATE_OUTPUT_CHARS):
+            self._degrade("associate", "local", "not enough time left to ask the model, matching images locally")
+            use_llm = False
+        if use_llm:
+            associator = self.ollama_processor
+            params = {"engine": "llm", "model": self.model_name, "images": len(image_data)}
+        else:
+            associator = TfidfImageAssociator()
+            # Keyed on the analyzed structure, which is all the local engine depends on besides the images
+            params = {"engine": "local", "images": len(image_data),
+                      "structure": ArtifactStore.params_hash(document_structure)}
+
+        def compute():
+            try:
+                with scheduling_context(cost=len(cleaned_text or ""), deadline=self.llm_deadline):
+                    structure = associator.associate_images(copy.deepcopy(document_structure), cleaned_text,
+                                                            image_data)
+            except Exception as e:
+                logger.error("Error associating images, keeping the structure without them: %s", e)
+                structure = document_structure
+            # A successful association marks every section with "has_images"
+            if not any("has_images" in section for section in structure.get("sections", [])):
+                self.stage_sources["associate"] = "fallback"
+            return structure
+
+        return self._run_stage(
+            "associate",
+            compute,
+            params=params,
+            cacheable=lambda _: self.stage_sources.get("associate") != "fallback"
+        )
+
+    def assign(self, document_structure, image_data, pdf_path=None):
+        """Gives each section at most one image, using the model picks and the pages the section spans."""
+        if not image_data:
+            return document_structure
+
+        def compute():
+            page_texts = self.page_texts
+            located = all(section.get("page_start") is not None for section in document_structure.get("sections", []))
+            if pdf_path and page_texts is None and not located:
+                try:
+                    page_texts = PdfExtractor().extract_page_texts(pdf_path, **self._selection())
+                except Exception as e:
+                    logger.warning("Error reading page texts, using only the model picks: %s", e)
+            return assign_images(copy.deepcopy(document_structure), image_data, page_texts)
+
+        # Cheap and derived from the associate output, so it is always recomputed
+        return self._run_stage("assign_images", compute, cacheable=lambda _: False)
+
+    def model_failed(self):
+        """Whether the structure came from the heuristics alone: the model errored, answered garbage or ran out of time."""
+        return self.stage_sources.get("analyze") == "fallback" and not self.model_sections
+
+    def speculate(self, text, document_name, skeleton=None, image_future=None, abandoned=None):
+        """
+        Renders the deck the pipeline would produce without the model, into memory. Stops before
+        rendering once `abandoned` (an Event) is set.
+
+        Returns:
+            BytesIO: The deck (or zip of decks), None when it was abandoned
+        """
+        started = time.perf_counter()
+        structure = heuristic_structure(text, document_name, skeleton)
+        image_data = []
+        if image_future:
+            try:
+                image_data = image_future.result(timeout=self.llm_deadline.remaining() if self.llm_deadline else None)
+            except FutureTimeoutError:
+                logger.warning("Rendering the heuristic deck without images, their extraction did not finish in time")
+        if abandoned is not None and abandoned.is_set():
+            return None
+        if image_data:
+            structure = TfidfImageAssociator().associate_images(copy.deepcopy(structure), text, image_data)
+            structure = assign_images(structure, image_data, self.page_texts)
+        deck = io.BytesIO()
+        PdfToPptxConverter(deck, theme=self.theme, executor=self.render_executor).create_presentation(
+            structure, image_data)
+        logger.info("Heuristic deck ready after %.2fs", time.perf_counter() - started)
+        return deck
+
+    def _serve_speculative(self, speculative, output_file, reason):
+        deck = speculative.result()
+        self._degrade("render", "speculative", reason)
+        if hasattr(output_file, "write"):
+            output_file.write(deck.getvalue())
+        else:
+            with open(output_file, "wb") as f:
+                f.write(deck.getvalue())
+        return output_file
+
+    def render(self, document_structure, image_data, output_file):
+        started = time.perf_counter()
+        memory = StageMemory()
+        self._emit("stage_started", {"stage": "render"})
+        converter = PdfToPptxConverter(output_file, self.ollama_processor, theme=self.theme,
+                                       progress_callback=self.progress_callback, executor=self.render_executor)
+        try:
+            converter.create_presentation(document_structure, image_data)
+            self.stage_sources["render"] = "computed"
+        except Exception as e:
+            if not image_data:
+                raise
+            logger.error("Error rendering presentation, retrying without images: %s", e)
+            if hasattr(output_file, "write"):
+                # Discard whatever the failed attempt wrote to the file object
+                output_file.seek(0)
+                output_file.truncate()
+            converter = PdfToPptxConverter(output_file, self.ollama_processor, theme=self.theme,
+                                           progress_callback=self.progress_callback,
+                                           executor=self.render_executor)
+            converter.create_presentation(document_structure, [])
+            self.stage_sources["render"] = "fallback"
+        self._record_timing("render", started, memory)
+        self._emit_stage_finished("render")
+        return output_file
+
+    def run(self, pdf_path=None, pdf_text=None, output_file=None):
+        logger.info("Starting processing with model: %s", self.model_name)
+
+        # Output file configuration
+        if not output_file:
+            extension = ".pptx" if isinstance(self.theme, str) or len(set(self.theme)) == 1 else ".zip"
+            if pdf_path:
+                base_name = os.path.splitext(os.path.basename(pdf_path))[0]
+                output_file = f"{base_name}{extension}"
+            else:
+                output_file = f"presentation{extension}"
+
+        text = pdf_text
+        document_name = "Document"
+        image_data = []
+        image_future = None
+        images_dropped = False
+        skeleton = None
+
+        self.set_document(pdf_path=pdf_path, pdf_text=text)
+
+        # Image extraction is CPU/disk work only needed by the association stage,
+        # so it runs in the background while the model cleans and analyzes the text
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="extract-images")
+        speculation = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-deck") \
+            if self.speculative else None
+        speculative = None
+        abandoned = threading.Event()
+        try:
+            # Text and image extraction from PDF
+            if not text and pdf_path:
+                logger.info("Extracting text from PDF: %s", pdf_path)
+                text = self.extract_text(pdf_path)
+                document_name = os.path.splitext(os.path.basename(pdf_path))[0]
+
+                if len(text.strip()) >= 10:
+                    logger.info("Extracting images from PDF in the background...")
+                    # Copy the context so the background stage logs with the same job id
+                    image_future = executor.submit(contextvars.copy_context().run, self.extract_images, pdf_path)
+                    skeleton = self.extract_outline(pdf_path)
+
+            if not text or len(text.strip()) < 10:
+                raise ValueError("Insufficient text for processing")
+
+            if speculation:
+                speculative = speculation.submit(contextvars.copy_context().run, self.speculate, text,
+                                                 document_name, skeleton, image_future, abandoned)
+
+            logger.info("Analyzing the structure of the document...")
+            try:
+                cleaned_text, document_structure = self.structure(text, document_name, skeleton)
+            except Exception as e:
+                if speculative is None:
+                    raise
+                logger.error("Error in the model pipeline, serving the heuristic deck: %s", e)
+                try:
+                    return self._serve_speculative(speculative, output_file, f"the model pipeline failed: {e}")
+                except Exception as speculative_error:
+                    logger.error("Error rendering the heuristic deck: %s", speculative_error)
+                    raise e
+            if speculative is not None and self.model_failed():
+                logger.warning("No model output, serving the heuristic deck")
+                return self._serve_speculative(speculative, output_file, "the model gave no usable structure")
+
+            if image_future:
+                try:
+                    # Association and rendering still fit when the extraction ends before the model calls would be cut off
+                    image_data = image_future.result(timeout=self.llm_deadline.remaining() if self.llm_deadline else None)
+                except FutureTimeoutError:
+                    images_dropped = True
+                    self._degrade("extract_images", "dropped", "image extraction did not finish in time")
+            if image_future and not images_dropped:
+                self.image_overlap = self.stage_overlap("extract_images", "clean") + \
+                    self.stage_overlap("extract_images", "analyze")
+                logger.info("Image extraction overlapped the LLM stages for %.2fs of %.2fs",
+                            self.image_overlap, self.stage_timings.get('extract_images', 0.0))
+                self._emit("stage_overlap", {"stage": "extract_images",
+                                             "overlap_seconds": round(self.image_overlap, 3)})
+
+            logger.info("Associating images with sections...")
+            document_structure = self.associate(document_structure, cleaned_text, image_data)
+            document_structure = self.assign(document_structure, image_data, pdf_path)
+            # The text is consumed, the deck only needs the structure; freed before the slide tree is built
+            text = cleaned_text = None
+            self.page_texts = None
+
+            logger.info("Generating presentation with theme '%s'...", self.theme)
+            self.render(document_structure, image_data, output_file)
+
+            logger.info("Presentation successfully generated: %s", output_file,
+                        extra={"stage_seconds": {stage: round(seconds, 3)
+                                                 for stage, seconds in self.stage_timings.items()},
+                               "stage_memory": self.stage_memory})
+            return output_file
+
+        finally:
+            rendering = None
+            if speculation:
+                # A served heuristic deck was waited for already; any other is abandoned, not waited for
+                abandoned.set()
+                speculation.shutdown(wait=False, cancel_futures=True)
+                if speculative is not None and not speculative.done():
+                    rendering = speculative
+
+            def images_stored():
+                # Only images of a stored stage are found again; the others are removed like without a store
+                return self.artifact_store and self.document_key and \
+                    self.artifact_store.has(self.document_key, "extract_images", self.IMAGE_PARAMS)
+
+            if images_dropped:
+                # Not waited for: the files are removed whenever the extraction ends
+                image_future.add_done_callback(
+                    lambda future: None if future.exception() or images_stored()
+                    else cleanup_image_files(future.result()))
+                executor.shutdown(wait=False)
+            else:
+                if image_future and not image_data:
+                    try:
+                        image_data = image_future.result()
+                    except Exception as e:
+                        logger.error("Error extracting images from PDF: %s", e)
+                executor.shutdown(wait=True)
+
+                # Images kept in the artifact store are reused by later runs
+                if not images_stored():
+                    if rendering:
+                        # The abandoned heuristic deck may still be reading them
+                        rendering.add_done_callback(lambda future, images=image_data: cleanup_image_files(images))
+                    else:
+                        cleanup_image_files(image_data)
+            release_memory()
+
+
+def cleanup_image_files(image_data):
+    """Removes temporary image files and their directory if it ends up empty."""
+    for img in image_data:
+        try:
+            img_path = img['path'] if isinstance(img, dict) else img
+            if os.path.exists(img_path):
+                os.remove(img_path)
+        except Exception as e:
+            logger.warning("Error cleaning temporary file: %s", e)
+
+    if image_data:
+        try:
+            img_path = image_data[0]['path'] if isinstance(image_data[0], dict) else image_data[0]
+            img_dir = os.path.dirname(img_path)
+            if os.path.exists(img_dir) and not os.listdir(img_dir):
+                os.rmdir(img_dir)
+        except Exception as e:
+            logger.warning("Error removing temporary directory: %s", e)
+
+
+def pdf_to_pptx_with_ollama(pdf_path=None, pdf_text=None, output_file=None, model_name="llama3", theme="default",
+                            artifact_store=None, progress_callback=None, image_association="local",
+                            render_executor=None, speculative=False, pages=None):
+    """
+    Converts a PDF into a PowerPoint presentation using text and image processing.
+    output_file may be a path or a writable binary file object.
+    theme may be a list of themes, the output is then a zip with one deck per theme.
+    progress_callback(event, data) receives the pipeline's stage, LLM and slide events.
+    speculative renders a heuristic deck alongside, served if the model fails (see ConversionPipeline).
+    pages limits the conversion to some pages, see parse_pages.
+    """
+    pipeline = ConversionPipeline(model_name=model_name, theme=theme, artifact_store=artifact_store,
+                                  progress_callback=progress_callback, image_association=image_association,
+                                  render_executor=render_executor, speculative=speculative, pages=pages)
+    started = time.perf_counter()
+    status = "failed"
+    try:
+        result = pipeline.run(pdf_path=pdf_path, pdf_text=pdf_text, output_file=output_file)
+        status = "succeeded"
+        return result
+    except ValueError:
+        raise
+    except Exception as e:
+        logger.error("Total processing failure: %s", e)
+        raise ValueError(f"The presentation could not be generated: {str(e)}")
+    finally:
+        JOBS.inc(status=status)
+        JOB_DURATION.observe(time.perf_counter() - started, status=status)
+
+
+def normalize_document_structure(structure, document_name, original_text):
+    if isinstance(structure, str):
+        try:
+            import json
+            structure = json.loads(structure)
+        except json.JSONDecodeError:
+            return create_fallback_structure(original_text, document_name)
+
+    if not isinstance(structure, dict):
+        return create_fallback_structure(original_text, document_name)
+
+    normalized = {
+        "title": structure.get("title", document_name),
+        "subtitle": structure.get("subtitle", ""),
+        "version": structure.get("version", ""),
+        "date": structure.get("date", ""),
+        "sections": []
+    }
+
+    sections = structure.get("sections", [])
+    if not sections:
+        paragraphs = [p for p in original_text.split('\n\n') if p.strip()]
+        if paragraphs:
+            normalized["sections"] = [{
+                "title": "Main Content",
+                "content": paragraphs[:10],  # First 10 paragraphs
+                "importance": "high",
+                "type": "overview"
+            }]
+    else:
+        for section in sections:
+            if not isinstance(section, dict):
+                continue
+
+            normalized_section = {
+                "title": section.get("title", "Untitled Section"),
+                "content": section.get("content", []),
+                "importance": section.get("importance", "medium"),
+                "type": section.get("type", "overview")
+            }
+
+            # Keep page spans read from the PDF outline
+            if "page_start" in section:
+                normalized_section["page_start"] = section["page_start"]
+                normalized_section["page_end"] = section.get("page_end", section["page_start"])
+
+            # Keep image association done before normalization
+            if "image_info" in section:
+                normalized_section["image_info"] = section["image_info"]
+                normalized_section["has_images"] = section.get("has_images", True)
+
+            if isinstance(normalized_section["content"], str):
+                normalized_section["content"] = [normalized_section["content"]]
+
+            normalized_section["content"] = [item for item in normalized_section["content"] if
+                                             item and isinstance(item, str)]
+
+            if normalized_section["content"]:
+                normalized["sections"].append(normalized_section)
+
+    return normalized
+
+
+def create_fallback_structure(text, document_name):
+    """Heuristic structure used when the model output cannot be parsed, and by the fast mode."""
+    return segment_document(text, document_name)
+
+
+def skeleton_structure(skeleton, document_name, contents=None):
+    """
+    Structure of the sections of a PDF outline: titles and page spans from the skeleton, bullets
+    from `contents` (one list per section, e.g. the model's) or condensed from the section text.
+    """
+    structure = {
+        "title": skeleton.get("title") or document_name,
+        "sections": []
+    }
+    sections = skeleton["sections"]
+    for section, content in zip(sections, contents or [[]] * len(sections)):
+        content = content or condense_text(section["text"])
+        if content:
+            structure["sections"].append({
+                "title": section["title"],
+                "content": content,
+                "importance": "high" if section.get("level") == 1 else "medium",
+                "type": "overview",
+                "page_start": section["page_start"],
+                "page_end": section["page_end"]
+            })
+    return normalize_document_structure(structure, document_name,
+                                        "\n\n".join(section["text"] for section in sections))
+
+
+def heuristic_structure(text, document_name, skeleton=None):
+    """The structure the fast mode builds: the outline with condensed section text, else the segmented text."""
+    if skeleton:
+        return skeleton_structure(skeleton, document_name)
+    return create_fallback_structure(text, document_name)
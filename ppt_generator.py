@@ -1,202 +1,202 @@
+import io
+import logging
 import os
 import re
+import time
+import zipfile
 
-from pptx import Presentation
-from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN
+from pptx.opc.package import OpcPackage, Part
 from pptx.util import Inches, Pt
 
+from instrumentation import RENDER_DURATION
+from text_layout import TextArea
+from themes import BULLET_INDENT, CONTENT_BODY_GEOMETRY, CONTENT_BODY_INSETS, CONTENT_LAYOUT, SECTION_LAYOUT, \
+    TEXT_IMAGE_BODY_GEOMETRY, TEXT_IMAGE_BODY_INSETS, TEXT_IMAGE_LAYOUT, THEME_TEMPLATES, TITLE_LAYOUT, \
+    TITLE_ONLY_LAYOUT, get_theme, inherited_styles, text_area_size
+
+logger = logging.getLogger(__name__)
+
+# Writing the parts directly needs these internals of python-pptx (1.0); without them the package
+# written by Presentation.save is repacked, which deflates and inflates every image once more
+try:
+    from pptx.opc.oxml import serialize_part_xml
+    from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+    from pptx.opc.serialized import _ContentTypesItem
+    PACKAGE_INTERNALS = hasattr(OpcPackage, "_rels") and hasattr(Part, "_rels")
+except ImportError:
+    PACKAGE_INTERNALS = False
+
+# Parts that are already compressed gain nothing from deflate, so they are stored as-is
+STORED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".tif", ".tiff", ".wdp", ".mp3", ".mp4", ".m4a", ".m4v"}
+
+
+def _write_package(prs, zf):
+    """Writes the parts of the package straight into `zf`, with python-pptx internals (PACKAGE_INTERNALS)."""
+    package = prs.part.package
+    parts = tuple(package.iter_parts())
+
+    def write(pack_uri, blob):
+        extension = os.path.splitext(pack_uri.membername)[1].lower()
+        compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        zf.writestr(pack_uri.membername, blob, compress_type=compress_type)
+
+    write(CONTENT_TYPES_URI, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+    write(PACKAGE_URI.rels_uri, package._rels.xml)
+    for part in parts:
+        write(part.partname, part.blob)
+        if part._rels:
+            write(part.partname.rels_uri, part.rels.xml)
+
+
+def _repack_package(prs, zf):
+    """Copies what the public Presentation.save writes into `zf` member by member; images are deflated once more."""
+    package = io.BytesIO()
+    prs.save(package)
+    with zipfile.ZipFile(package) as source:
+        for member in source.infolist():
+            extension = os.path.splitext(member.filename)[1].lower()
+            compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            zf.writestr(member.filename, source.read(member), compress_type=compress_type)
+
+
+def save_presentation(prs, target, compresslevel=6):
+    """
+    Writes a presentation to a path or a writable binary file object (seekable or not).
+    XML parts are deflated with `compresslevel`; images and media are stored uncompressed.
+    """
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel,
+                         strict_timestamps=False) as zf:
+        (_write_package if PACKAGE_INTERNALS else _repack_package)(prs, zf)
+
+
+def render_theme(document_structure, image_data, theme, lean=True, compresslevel=6, paginate=True):
+    """Renders one theme in memory and returns the .pptx bytes. Also the entry point of render worker processes."""
+    buffer = io.BytesIO()
+    converter = PdfToPptxConverter(buffer, theme=theme, lean=lean, compresslevel=compresslevel, paginate=paginate)
+    converter.create_presentation(document_structure, image_data)
+    return buffer.getvalue()
+
 
 class PdfToPptxConverter:
-    def __init__(self, output_filename="presentation.pptx", ollama_processor=None, theme="default"):
-        self.prs = Presentation()
+    def __init__(self, output_filename="presentation.pptx", ollama_processor=None, theme="default",
+                 progress_callback=None, lean=True, compresslevel=6, paginate=True, executor=None):
+        """
+        theme may also be a list of themes: create_presentation then renders the structure once per
+        theme and writes a zip with one "<theme>.pptx" per theme, using `executor` (e.g. a process
+        pool) to render them in parallel when given.
+        """
+        self.themes = [theme] if isinstance(theme, str) else list(dict.fromkeys(theme))
+        theme = self.themes[0]
+        self.executor = executor
+        # Slide size, text styles, placeholder geometry and decorations come from the theme template
+        self.prs = THEME_TEMPLATES.new_presentation(theme)
         self.output_filename = output_filename
         self.ollama_processor = ollama_processor
         self.theme = theme
-
-        self.prs.slide_width = Inches(13.33)
-        self.prs.slide_height = Inches(7.5)
+        self.progress_callback = progress_callback
+        # Lean mode writes only the formatting that differs from what the placeholders inherit
+        self.lean = lean
+        self.compresslevel = compresslevel
+        # Sections too long for one slide continue on further slides
+        self.paginate = paginate
 
         self.setup_theme_colors()
 
     def setup_theme_colors(self):
-        if self.theme == "corporate":
-            self.title_color = RGBColor(18, 52, 86)
-            self.accent_color = RGBColor(64, 119, 176)
-            self.text_color = RGBColor(50, 50, 50)
-            self.background_color = RGBColor(242, 242, 242)
-            self.title_font_size = Pt(36)
-            self.subtitle_font_size = Pt(20)
-            self.header_font_size = Pt(28)
-            self.content_font_size = Pt(16)
-        elif self.theme == "minimal":
-            self.title_color = RGBColor(0, 0, 0)
-            self.accent_color = RGBColor(204, 0, 0)
-            self.text_color = RGBColor(40, 40, 40)
-            self.background_color = RGBColor(255, 255, 255)
-            self.title_font_size = Pt(38)
-            self.subtitle_font_size = Pt(22)
-            self.header_font_size = Pt(30)
-            self.content_font_size = Pt(18)
-        else:
-            self.title_color = RGBColor(44, 86, 151)
-            self.accent_color = RGBColor(0, 129, 198)
-            self.text_color = RGBColor(68, 68, 68)
-            self.background_color = RGBColor(250, 250, 250)
-            self.title_font_size = Pt(36)
-            self.subtitle_font_size = Pt(22)
-            self.header_font_size = Pt(28)
-            self.content_font_size = Pt(18)
+        for key, value in get_theme(self.theme).items():
+            setattr(self, key, value)
+        self.inherited_styles = inherited_styles(self.theme)
+
+        # Text areas of the bulleted body and of the text beside an image, measured for pagination
+        self.content_area = TextArea(*text_area_size(CONTENT_BODY_GEOMETRY, CONTENT_BODY_INSETS),
+                                     self.content_font_size, indent=BULLET_INDENT, prefix="• ")
+        self.text_image_area = TextArea(*text_area_size(TEXT_IMAGE_BODY_GEOMETRY, TEXT_IMAGE_BODY_INSETS),
+                                        self.content_font_size)
+
+    def _format_paragraph(self, paragraph, role, **properties):
+        """
+        Applies size, bold, color, alignment, level and space_after to a paragraph. In lean mode
+        the values already inherited by the given placeholder role are skipped.
+        """
+        inherited = self.inherited_styles.get(role, {}) if self.lean else {}
+        for name, value in properties.items():
+            if name in inherited and inherited[name] == value:
+                continue
+            if name == "size":
+                paragraph.font.size = value
+            elif name == "bold":
+                paragraph.font.bold = value
+            elif name == "color":
+                paragraph.font.color.rgb = value
+            elif name == "alignment":
+                paragraph.alignment = value
+            elif name == "level":
+                paragraph.level = value
+            elif name == "space_after":
+                paragraph.space_after = value
 
     def _add_title_slide(self, title, subtitle=None):
-        slide_layout = self.prs.slide_layouts[0]
+        slide_layout = self.prs.slide_layouts[TITLE_LAYOUT]
         slide = self.prs.slides.add_slide(slide_layout)
 
         title_shape = slide.shapes.title
         title_shape.text = title
 
-        title_shape.left = Inches(0.5)
-        title_shape.top = Inches(2.5)
-        title_shape.width = Inches(12.33)
-        title_shape.height = Inches(2.0)
-
-        text_frame = title_shape.text_frame
-        text_frame.margin_left = Inches(0.2)
-        text_frame.margin_right = Inches(0.2)
-        text_frame.margin_top = Inches(0.1)
-        text_frame.margin_bottom = Inches(0.1)
-        text_frame.word_wrap = True
-
-        p = text_frame.paragraphs[0]
-        p.font.size = self.title_font_size
-        p.font.bold = True
-        p.font.color.rgb = self.title_color
-        p.alignment = PP_ALIGN.CENTER
+        p = title_shape.text_frame.paragraphs[0]
+        self._format_paragraph(p, "title", size=self.title_font_size, bold=True, color=self.title_color,
+                               alignment=PP_ALIGN.CENTER)
 
         if subtitle:
             if len(slide.placeholders) > 1:
                 subtitle_shape = slide.placeholders[1]
                 subtitle_shape.text = subtitle
 
-                subtitle_shape.left = Inches(0.5)
-                subtitle_shape.top = Inches(4.8)
-                subtitle_shape.width = Inches(12.33)
-                subtitle_shape.height = Inches(1.0)
-
-                subtitle_frame = subtitle_shape.text_frame
-                subtitle_frame.margin_left = Inches(0.2)
-                subtitle_frame.margin_right = Inches(0.2)
-                subtitle_frame.margin_top = Inches(0.1)
-                subtitle_frame.margin_bottom = Inches(0.1)
-
-                p = subtitle_frame.paragraphs[0]
-                p.font.size = self.subtitle_font_size
-                p.font.color.rgb = self.accent_color
-                p.alignment = PP_ALIGN.CENTER
-
-        if self.theme == "minimal":
-            left = Inches(3.5)
-            top = Inches(4.5)
-            width = Inches(6.33)
-            height = Inches(0.05)
-            line = slide.shapes.add_shape(1, left, top, width, height)
-            line.fill.solid()
-            line.fill.fore_color.rgb = self.accent_color
-            line.line.fill.background()
+                p = subtitle_shape.text_frame.paragraphs[0]
+                self._format_paragraph(p, "subtitle", size=self.subtitle_font_size, color=self.accent_color,
+                                       alignment=PP_ALIGN.CENTER)
 
         return slide
 
     def _add_section_slide(self, title):
-        slide_layout = self.prs.slide_layouts[2] if len(self.prs.slide_layouts) > 2 else self.prs.slide_layouts[1]
+        slide_layout = self.prs.slide_layouts[SECTION_LAYOUT]
         slide = self.prs.slides.add_slide(slide_layout)
 
         title_shape = slide.shapes.title
         title_shape.text = title
 
-        title_shape.left = Inches(0.5)
-        title_shape.top = Inches(1.0)
-        title_shape.width = Inches(12.33)
-        title_shape.height = Inches(1.5)
-
-        text_frame = title_shape.text_frame
-        text_frame.margin_left = Inches(0.2)
-        text_frame.margin_right = Inches(0.2)
-        text_frame.margin_top = Inches(0.1)
-        text_frame.margin_bottom = Inches(0.1)
-
-        p = text_frame.paragraphs[0]
-        p.font.size = self.header_font_size
-        p.font.bold = True
-        p.font.color.rgb = self.title_color
-        p.alignment = PP_ALIGN.CENTER
-
-        if self.theme == "corporate":
-            left = Inches(0)
-            top = Inches(0)
-            width = Inches(1.0)
-            height = Inches(7.5)
-            sidebar = slide.shapes.add_shape(1, left, top, width, height)
-            sidebar.fill.solid()
-            sidebar.fill.fore_color.rgb = self.accent_color
-            sidebar.line.fill.background()
-        elif self.theme == "minimal":
-            left = Inches(0.5)
-            top = Inches(2.8)
-            width = Inches(0.1)
-            height = Inches(2.5)
-            line = slide.shapes.add_shape(1, left, top, width, height)
-            line.fill.solid()
-            line.fill.fore_color.rgb = self.accent_color
-            line.line.fill.background()
+        p = title_shape.text_frame.paragraphs[0]
+        self._format_paragraph(p, "section_title", size=self.header_font_size, bold=True, color=self.title_color,
+                               alignment=PP_ALIGN.CENTER)
 
         return slide
 
     def _add_content_slide(self, title, content_points):
-        slide_layout = self.prs.slide_layouts[1]
+        slide_layout = self.prs.slide_layouts[CONTENT_LAYOUT]
         slide = self.prs.slides.add_slide(slide_layout)
 
         title_shape = slide.shapes.title
         title_shape.text = title
 
-        title_shape.left = Inches(0.5)
-        title_shape.top = Inches(0.3)
-        title_shape.width = Inches(12.33)
-        title_shape.height = Inches(1.2)
-
-        title_frame = title_shape.text_frame
-        title_frame.margin_left = Inches(0.2)
-        title_frame.margin_right = Inches(0.2)
-        title_frame.margin_top = Inches(0.1)
-        title_frame.margin_bottom = Inches(0.1)
-
-        p = title_frame.paragraphs[0]
-        p.font.size = self.header_font_size
-        p.font.bold = True
-        p.font.color.rgb = self.title_color
+        p = title_shape.text_frame.paragraphs[0]
+        self._format_paragraph(p, "slide_title", size=self.header_font_size, bold=True, color=self.title_color)
 
+        role = "bullet"
         if len(slide.placeholders) > 1:
             content = slide.placeholders[1]
         else:
+            # A plain text box inherits nothing from the theme
+            role = None
             left = Inches(0.8)
             top = Inches(1.8)
             width = Inches(11.73)
             height = Inches(5.2)
             content = slide.shapes.add_textbox(left, top, width, height)
-
-        content.left = Inches(0.8)
-        content.top = Inches(1.8)
-        content.width = Inches(11.73)
-        content.height = Inches(5.2)
+            content.text_frame.word_wrap = True
 
         text_frame = content.text_frame
         text_frame.clear()
 
-        text_frame.margin_left = Inches(0.3)
-        text_frame.margin_right = Inches(0.3)
-        text_frame.margin_top = Inches(0.2)
-        text_frame.margin_bottom = Inches(0.2)
-        text_frame.word_wrap = True
-
         for i, point in enumerate(content_points):
             if point.strip():
                 if i == 0:
@@ -205,29 +205,8 @@ class PdfToPptxConverter:
                     p = text_frame.add_paragraph()
 
                 p.text = f"• {point.strip()}"
-                p.font.size = self.content_font_size
-                p.font.color.rgb = self.text_color
-                p.level = 0
-                p.space_after = Pt(6)
-
-        if self.theme == "corporate":
-            left = Inches(0)
-            top = Inches(7.0)
-            width = Inches(13.33)
-            height = Inches(0.5)
-            footer = slide.shapes.add_shape(1, left, top, width, height)
-            footer.fill.solid()
-            footer.fill.fore_color.rgb = self.accent_color
-            footer.line.fill.background()
-        elif self.theme == "minimal":
-            left = Inches(0.8)
-            top = Inches(1.6)
-            width = Inches(11.73)
-            height = Inches(0.03)
-            line = slide.shapes.add_shape(1, left, top, width, height)
-            line.fill.solid()
-            line.fill.fore_color.rgb = self.accent_color
-            line.line.fill.background()
+                self._format_paragraph(p, role, size=self.content_font_size, color=self.text_color, level=0,
+                                       space_after=Pt(6))
 
         return slide
 
@@ -235,51 +214,33 @@ class PdfToPptxConverter:
         """
         Adds a slide with text and image side by side with automatic sizing.
         """
-        slide_layout = self.prs.slide_layouts[1]  # Layout with title and content
-        slide = self.prs.slides.add_slide(slide_layout)
-
-        # Configure title
-        title_shape = slide.shapes.title
-        title_shape.text = title
-
-        title_shape.left = Inches(0.5)
-        title_shape.top = Inches(0.3)
-        title_shape.width = Inches(12.33)
-        title_shape.height = Inches(1.0)
-
-        p = title_shape.text_frame.paragraphs[0]
-        p.font.size = self.header_font_size
-        p.font.bold = True
-        p.font.color.rgb = self.title_color
-
         # If there's no image or the image doesn't exist, create normal content slide
         if not image_path or not os.path.exists(image_path):
-            print(f"Image not found: {image_path}")
+            logger.warning("Image not found: %s", image_path)
             return self._add_content_slide(title, content_points)
 
         # Check image dimensions
         try:
             from PIL import Image
-            img = Image.open(image_path)
-            img_width, img_height = img.size
+            with Image.open(image_path) as img:
+                img_width, img_height = img.size
             aspect_ratio = img_width / img_height
-            print(f"Adding image: {image_path}, dimensions: {img_width}x{img_height}")
+            logger.debug("Adding image: %s, dimensions: %sx%s", image_path, img_width, img_height)
         except Exception as e:
-            print(f"Error analyzing image: {e}")
+            logger.warning("Error analyzing image: %s", e)
             return self._add_content_slide(title, content_points)
 
-        # Configure slide division: 60% text, 40% image
-        text_left = Inches(0.8)
-        text_top = Inches(1.5)
-        text_width = Inches(6.5)  # Reduced to give more space to the image
-        text_height = Inches(5.0)
+        # Text placeholder on the left 60% of the slide, the image goes in the remaining 40%
+        slide_layout = self.prs.slide_layouts[TEXT_IMAGE_LAYOUT]
+        slide = self.prs.slides.add_slide(slide_layout)
 
-        # Add text area
-        content = slide.shapes.add_textbox(text_left, text_top, text_width, text_height)
-        text_frame = content.text_frame
-        text_frame.word_wrap = True
-        text_frame.margin_left = Inches(0.1)
-        text_frame.margin_right = Inches(0.1)
+        title_shape = slide.shapes.title
+        title_shape.text = title
+
+        p = title_shape.text_frame.paragraphs[0]
+        self._format_paragraph(p, "slide_title", size=self.header_font_size, bold=True, color=self.title_color)
+
+        text_frame = slide.placeholders[1].text_frame
 
         # Add content with bullet points
         for i, point in enumerate(content_points):
@@ -290,10 +251,8 @@ class PdfToPptxConverter:
                     p = text_frame.add_paragraph()
 
                 p.text = point.strip()
-                p.font.size = self.content_font_size
-                p.font.color.rgb = self.text_color
-                p.level = 0  # Bullet level
-                p.space_after = Pt(6)  # Spacing after paragraph
+                self._format_paragraph(p, "text", size=self.content_font_size, color=self.text_color, level=0,
+                                       space_after=Pt(6))
 
         # Calculate ideal dimensions for the image
         img_left = Inches(7.5)  # Positioned further left to give adequate space
@@ -322,28 +281,21 @@ class PdfToPptxConverter:
         # Add the image to the slide
         try:
             slide.shapes.add_picture(image_path, img_left, img_top, width=img_width, height=img_height)
-            print(f"Image added successfully: {image_path}")
+            logger.debug("Image added successfully: %s", image_path)
         except Exception as e:
-            print(f"Error adding image to slide: {e}")
+            logger.error("Error adding image to slide: %s", e)
 
         return slide
 
     def _add_table_slide(self, title, table_data):
-        slide_layout = self.prs.slide_layouts[1]
+        slide_layout = self.prs.slide_layouts[TITLE_ONLY_LAYOUT]
         slide = self.prs.slides.add_slide(slide_layout)
 
         title_shape = slide.shapes.title
         title_shape.text = title
 
-        title_shape.left = Inches(0.5)
-        title_shape.top = Inches(0.3)
-        title_shape.width = Inches(12.33)
-        title_shape.height = Inches(1.0)
-
         p = title_shape.text_frame.paragraphs[0]
-        p.font.size = self.header_font_size
-        p.font.bold = True
-        p.font.color.rgb = self.title_color
+        self._format_paragraph(p, "slide_title", size=self.header_font_size, bold=True, color=self.title_color)
 
         if table_data and len(table_data) > 0:
             rows = len(table_data)
@@ -402,15 +354,36 @@ class PdfToPptxConverter:
 
         return table_data
 
+    def _paginate(self, points, with_image=False):
+        """
+        Splits content points into the pages of a section. With an image, the first page is the
+        narrower text beside the picture and the continuation pages are regular content slides.
+        """
+        if not self.paginate:
+            return [points]
+        if not with_image:
+            return self.content_area.paginate(points)
+        first_page = self.text_image_area.paginate(points)[0]
+        if len(first_page) == len(points):
+            return [first_page]
+        return [first_page] + self.content_area.paginate(points[len(first_page):])
+
+    def _report_slide(self, total_slides):
+        if self.progress_callback:
+            self.progress_callback("slide_rendered", {"slide": len(self.prs.slides), "total": total_slides})
+
     def create_presentation(self, document_structure, image_data=None):
         if not isinstance(document_structure, dict):
             document_structure = self._convert_to_structure(document_structure)
 
         # Initial validation of image_data
         if image_data and not isinstance(image_data, list):
-            print(f"Warning: invalid image_data, expected format: list, received: {type(image_data)}")
+            logger.warning("Invalid image_data, expected format: list, received: %s", type(image_data))
             image_data = []
 
+        if len(self.themes) > 1:
+            return self._create_theme_archive(document_structure, image_data or [])
+
         title = document_structure.get('title', 'Document')
         subtitle = document_structure.get('subtitle', '')
 
@@ -426,37 +399,35 @@ class PdfToPptxConverter:
             else:
                 subtitle = document_structure['date']
 
+        slides_started = time.perf_counter()
+
         # Create title slide
+        sections = document_structure.get('sections', [])
+        total_slides = 1 + len(sections)
         self._add_title_slide(title, subtitle)
+        self._report_slide(total_slides)
 
-        # Process sections
-        for section in document_structure.get('sections', []):
+        # Process sections; each image is placed at most once
+        used_images = set()
+        for section in sections:
             section_title = section.get('title', '')
             content = section.get('content', [])
 
-            # Check if there are images associated with this section
+            # Image assigned to this section, if any; other sections become text-only slides
             section_image = None
             if image_data and section.get('has_images'):
                 img_info = section.get('image_info', {})
                 relevant_images = img_info.get('relevant_images', [])
 
-                if relevant_images and len(relevant_images) > 0:
-                    # Get index of the first relevant image
-                    img_idx = relevant_images[0]
-                    if 0 <= img_idx < len(image_data):
+                for img_idx in relevant_images:
+                    if isinstance(img_idx, int) and 0 <= img_idx < len(image_data) and img_idx not in used_images:
                         img_path = image_data[img_idx].get('path') if isinstance(image_data[img_idx], dict) else \
-                        image_data[img_idx]
-                        if os.path.exists(img_path):
+                            image_data[img_idx]
+                        if img_path and os.path.exists(img_path):
                             section_image = img_path
-                            print(f"Associating image {img_path} with section '{section_title}'")
-
-            # For sections without explicitly associated images, search for images by page correspondence
-            if not section_image and image_data:
-                for img in image_data:
-                    if isinstance(img, dict) and 'path' in img:
-                        section_image = img['path']
-                        print(f"Associating default image {section_image} with section '{section_title}'")
-                        break
+                            used_images.add(img_idx)
+                            logger.debug("Associating image %s with section '%s'", img_path, section_title)
+                            break
 
             # Add slide according to content type
             if content and isinstance(content, list) and len(content) > 0:
@@ -464,30 +435,46 @@ class PdfToPptxConverter:
                 if len(content) == 1 and self._detect_tables(content[0]):
                     table_data = self._process_table_data([content[0]])
                     self._add_table_slide(section_title, table_data)
+                    self._report_slide(total_slides)
                 else:
-                    # Add slide with or without image
-                    if section_image:
-                        self._add_content_slide_with_image(section_title, content, section_image)
-                    else:
-                        self._add_content_slide(section_title, content)
-
-        # Save the presentation
-        self.prs.save(self.output_filename)
+                    points = [point.strip() for point in content if isinstance(point, str) and point.strip()]
+                    pages = self._paginate(points, with_image=bool(section_image))
+                    total_slides += len(pages) - 1
+                    for page_number, page in enumerate(pages):
+                        if page_number == 0 and section_image:
+                            self._add_content_slide_with_image(section_title, page, section_image)
+                        elif page_number == 0:
+                            self._add_content_slide(section_title, page)
+                        else:
+                            self._add_content_slide(f"{section_title} (cont.)", page)
+                        self._report_slide(total_slides)
+
+        RENDER_DURATION.observe(time.perf_counter() - slides_started, step="slides")
+
+        # Save the presentation, output_filename may also be a file object such as a response buffer
+        with RENDER_DURATION.time(step="save"):
+            save_presentation(self.prs, self.output_filename, self.compresslevel)
         return self.output_filename
 
-    def _is_image_relevant(self, section_content, image_path):
-        """
-        Checks if the image is relevant to the section content.
-        """
-        keywords = ["diagram", "graphic", "figure", "image", "visualization"]
-        content_text = " ".join(section_content).lower()
-
-        # Check if the content mentions keywords related to images
-        if any(keyword in content_text for keyword in keywords):
-            return True
-
-        # Add other checks, such as similarity analysis, if necessary
-        return False
+    def _create_theme_archive(self, document_structure, image_data):
+        """Renders every theme from the same structure and images into a zip of decks."""
+        options = {"lean": self.lean, "compresslevel": self.compresslevel, "paginate": self.paginate}
+        started = time.perf_counter()
+        if self.executor:
+            futures = [self.executor.submit(render_theme, document_structure, image_data, theme, **options)
+                       for theme in self.themes]
+            decks = (future.result() for future in futures)
+        else:
+            decks = (render_theme(document_structure, image_data, theme, **options) for theme in self.themes)
+
+        # Decks are zip files already, so they are stored as they are
+        with zipfile.ZipFile(self.output_filename, "w", zipfile.ZIP_STORED) as archive:
+            for done, (theme, deck) in enumerate(zip(self.themes, decks), start=1):
+                archive.writestr(f"{theme}.pptx", deck)
+                if self.progress_callback:
+                    self.progress_callback("theme_rendered", {"theme": theme, "done": done, "total": len(self.themes)})
+        logger.info("Rendered %d themes in %.2fs", len(self.themes), time.perf_counter() - started)
+        return self.output_filename
 
     def _convert_to_structure(self, text_content):
         import re
@@ -534,36 +521,3 @@ class PdfToPptxConverter:
             }]
 
         return structure
-
-    def _select_image_for_section(self, section, image_data):
-        """
-        Selects the most suitable image for a section based on analysis.
-
-        Args:
-            section (dict): The document section
-            image_data (list): List of available image data
-
-        Returns:
-            dict or None: Selected image data or None if no suitable image
-        """
-        if not image_data or not section.get("has_images", False):
-            return None
-
-        image_info = section.get("image_info", {})
-        relevant_images = image_info.get("relevant_images", [])
-
-        if not relevant_images:
-            # Alternative strategy: look for image references in text
-            content_text = " ".join(section.get("content", [])).lower()
-            if any(keyword in content_text for keyword in ["figure", "image", "graphic", "diagram", "illustration"]):
-                # If there are image references in the text, select the first available image
-                if image_data:
-                    return image_data[0]
-            return None
-
-        # Select the first relevant image that exists in image_data
-        for img_index in relevant_images:
-            if 0 <= img_index < len(image_data):
-                return image_data[img_index]
-
-        return None
@@ -1,7 +1,15 @@
+import hashlib
+import logging
+
+import fitz
 import PyPDF2
 from pdfminer.high_level import extract_text as pdfminer_extract_text
 from pdfminer.layout import LAParams
 
+from instrumentation import EXTRACTOR_DURATION
+
+logger = logging.getLogger(__name__)
+
 
 class PdfExtractor:
 
@@ -19,7 +27,7 @@ class PdfExtractor:
 
             return text
         except Exception as e:
-            print(f"Error extracting text with PyPDF2: {e}")
+            logger.warning("Error extracting text with PyPDF2: %s", e)
             return None
 
     @staticmethod
@@ -29,15 +37,104 @@ class PdfExtractor:
             text = pdfminer_extract_text(pdf_path, laparams=laparams)
             return text
         except Exception as e:
-            print(f"Error extracting text with PDFMiner: {e}")
+            logger.warning("Error extracting text with PDFMiner: %s", e)
             return None
 
     @staticmethod
-    def extract_text(pdf_path):
-        text_pypdf2 = PdfExtractor.extract_with_pypdf2(pdf_path)
+    def page_count(pdf_path):
+        with fitz.open(pdf_path) as pdf_document:
+            return pdf_document.page_count
+
+    @staticmethod
+    def extract_page_texts(pdf_path, pages=None):
+        """Plain text of every page, in page order; pages not in `pages` (0-based numbers) are left empty."""
+        with EXTRACTOR_DURATION.time(engine="pymupdf_pages"):
+            with fitz.open(pdf_path) as pdf_document:
+                if pages is None:
+                    return [page.get_text() for page in pdf_document]
+                texts = [""] * pdf_document.page_count
+                for number in pages:
+                    texts[number] = pdf_document[number].get_text()
+                return texts
+
+    @staticmethod
+    def page_hashes(pdf_path, pages=None):
+        """
+        Hash of every page's content, in page order: its drawing operators and the images, forms
+        and fonts they use. An edited page gets a new hash, an unchanged one keeps it across
+        revisions of the document even when other pages move. Pages not in `pages` (0-based
+        numbers) are not read and get None.
+        """
+        with fitz.open(pdf_path) as pdf_document:
+            hashes = [None] * pdf_document.page_count
+            for number in range(pdf_document.page_count) if pages is None else pages:
+                page = pdf_document[number]
+                contents = page.read_contents()
+                digest = hashlib.sha256(contents)
+                digest.update(repr(tuple(page.rect)).encode())
+
+                # Pages often share one resource dictionary, so only the resources this page draws count
+                def used(name):
+                    return f"/{name}".encode() in contents
+
+                for xref in sorted({image[0] for image in page.get_images(full=True) if used(image[7])} |
+                                   {form[0] for form in page.get_xobjects() if used(form[1])}):
+                    digest.update(pdf_document.xref_stream_raw(xref) or b"")
+                for font in page.get_fonts(full=True):
+                    # Type, name and encoding; the xref number changes when the file is rewritten
+                    if used(font[4]):
+                        digest.update(repr(font[2:6]).encode())
+                hashes[number] = digest.hexdigest()
+        return hashes
+
+    @staticmethod
+    def extract_pages(pdf_path, page_numbers):
+        """
+        Text of the given pages (0-based) with both engines of extract_text, for extract_text_from_pages.
 
-        text_pdfminer = PdfExtractor.extract_with_pdfminer(pdf_path)
+        Returns:
+            dict: Page number -> {"pypdf2": text or None, "pdfminer": text or None}
+        """
+        pages = {number: {"pypdf2": None, "pdfminer": None} for number in page_numbers}
+        if not pages:
+            return pages
 
+        with EXTRACTOR_DURATION.time(engine="pypdf2"):
+            try:
+                with open(pdf_path, 'rb') as file:
+                    reader = PyPDF2.PdfReader(file)
+                    for number in pages:
+                        pages[number]["pypdf2"] = reader.pages[number].extract_text()
+            except Exception as e:
+                logger.warning("Error extracting text with PyPDF2: %s", e)
+
+        with EXTRACTOR_DURATION.time(engine="pdfminer"):
+            try:
+                laparams = LAParams(line_margin=0.5, char_margin=2.0, all_texts=True)
+                text = pdfminer_extract_text(pdf_path, page_numbers=sorted(pages), laparams=laparams)
+                # pdfminer ends every page with a form feed
+                for number, page_text in zip(sorted(pages), text.split("\f")):
+                    pages[number]["pdfminer"] = page_text + "\f"
+            except Exception as e:
+                logger.warning("Error extracting text with PDFMiner: %s", e)
+        return pages
+
+    @staticmethod
+    def extract_text_from_pages(pages):
+        """
+        The document text extract_text returns, put together from extract_pages results of every
+        page in order.
+        """
+        def joined(engine, separator):
+            if not pages or any(page[engine] is None for page in pages):
+                return None
+            return "".join(page[engine] + separator for page in pages)
+
+        return PdfExtractor.choose_text(joined("pypdf2", "\n\n"), joined("pdfminer", ""))
+
+    @staticmethod
+    def choose_text(text_pypdf2, text_pdfminer):
+        """The longer of the two engines' texts."""
         if text_pypdf2 and text_pdfminer:
             if len(text_pypdf2) > len(text_pdfminer):
                 return text_pypdf2
@@ -49,3 +146,18 @@ class PdfExtractor:
             return text_pdfminer
         else:
             raise Exception("Could not extract text from PDF using any method")
+
+    @staticmethod
+    def extract_text(pdf_path, pages=None):
+        """Text of the document by the engine that reads more of it; `pages` (0-based numbers) limits it to those."""
+        if pages is not None:
+            extracted = PdfExtractor.extract_pages(pdf_path, pages)
+            return PdfExtractor.extract_text_from_pages([extracted[number] for number in sorted(pages)])
+
+        with EXTRACTOR_DURATION.time(engine="pypdf2"):
+            text_pypdf2 = PdfExtractor.extract_with_pypdf2(pdf_path)
+
+        with EXTRACTOR_DURATION.time(engine="pdfminer"):
+            text_pdfminer = PdfExtractor.extract_with_pdfminer(pdf_path)
+
+        return PdfExtractor.choose_text(text_pypdf2, text_pdfminer)
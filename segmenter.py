@@ -0,0 +1,150 @@
+import re
+
+# One pattern classifies every line; the first alternative that matches wins
+LINE_PATTERN = re.compile(r"""
+    ^[ \t]*(?:
+        (?P<blank>)$
+      | (?P<noise>(?:page[ \t]+)?\d{1,4}(?:[ \t]*(?:/|of)[ \t]*\d{1,4})?|\d{1,2}[.)]|[•\-*·▪◦►])[ \t]*$
+      | \#{1,6}[ \t]+(?P<markdown>[^\n]+?)[ \t]*$
+      | (?P<numbered>\d{1,3}(?:\.\d{1,3})*)[ \t]+(?P<numbered_title>[A-Z][^\n]{2,80}?)[ \t]*$
+      | (?:[•\-*·▪◦►]|\d{1,2}[.)])[ \t]+(?P<bullet>[^\n]+?)[ \t]*$
+      | (?P<caps>[A-Z][A-Z0-9 &/,'()\-]{6,98}[A-Z0-9)]):?[ \t]*$
+      | (?P<colon>[A-Z][^\n.]{6,98}):[ \t]*$
+      | (?P<text>[^\n]+?)[ \t]*$
+    )
+""", re.MULTILINE | re.VERBOSE)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])")
+
+MAX_BULLETS = 7
+MAX_BULLET_CHARS = 200
+MIN_PARAGRAPH_CHARS = 10
+# A line on at least this many pages, and on half of them, is a running header or footer
+RUNNING_MIN_PAGES = 3
+
+
+def running_lines(text):
+    """Lines repeated on most pages of a text whose pages are separated by form feeds."""
+    pages = text.split("\f")
+    if len(pages) < RUNNING_MIN_PAGES:
+        return set()
+    counts = {}
+    for page in pages:
+        for line in {line.strip() for line in page.splitlines()} - {""}:
+            counts[line] = counts.get(line, 0) + 1
+    threshold = max(RUNNING_MIN_PAGES, len(pages) // 2)
+    return {line for line, count in counts.items() if count >= threshold}
+
+
+def _condense(paragraph):
+    """First sentence of a paragraph, cut at a word boundary when it is still too long."""
+    sentence = SENTENCE_END.split(paragraph, 1)[0]
+    if len(sentence) <= MAX_BULLET_CHARS:
+        return sentence
+    return sentence[:MAX_BULLET_CHARS].rsplit(" ", 1)[0] + "…"
+
+
+class HeuristicSegmenter:
+    """
+    Builds a document structure from plain text without a model, in a single pass over the lines.
+
+    Headings are markdown headings, numbered headings ("4.1 Mounting"), short upper-case lines and
+    short lines ending with a colon. Bullets are kept as they are; other lines are joined into
+    paragraphs and condensed to their first sentence. Page numbers, lines repeated back to back
+    (text drawn several times by the PDF producer), bullets repeated within a section and, when
+    pages are separated by form feeds, lines on most pages (running headers and footers) are
+    skipped.
+    """
+
+    def __init__(self, max_bullets=MAX_BULLETS):
+        self.max_bullets = max_bullets
+
+    def segment(self, text, document_name):
+        sections = []
+        current = {"title": None, "content": []}
+        paragraph = []
+        previous_line = None
+        # Bullets of the current section
+        seen = set()
+        text = text or ""
+        running = running_lines(text)
+
+        def add_bullet(bullet):
+            if bullet not in seen:
+                seen.add(bullet)
+                current["content"].append(bullet)
+
+        def flush_paragraph():
+            if paragraph:
+                joined = " ".join(paragraph)
+                if len(joined) >= MIN_PARAGRAPH_CHARS:
+                    add_bullet(_condense(joined))
+                paragraph.clear()
+
+        def start_section(title):
+            nonlocal current
+            flush_paragraph()
+            if current["content"]:
+                sections.append(current)
+            current = {"title": title, "content": []}
+            seen.clear()
+
+        for match in LINE_PATTERN.finditer(text.replace("\f", "\n")):
+            line = match.group(0).strip()
+            if line and (line == previous_line or line in running):
+                continue
+            previous_line = line or previous_line
+            kind = match.lastgroup
+
+            if kind == "blank":
+                flush_paragraph()
+            elif kind == "noise":
+                continue
+            elif kind == "numbered_title":
+                start_section(f"{match.group('numbered')} {match.group('numbered_title')}")
+            elif kind in ("markdown", "caps", "colon"):
+                start_section(match.group(kind).strip())
+            elif kind == "bullet":
+                flush_paragraph()
+                add_bullet(_condense(match.group("bullet")))
+            else:
+                paragraph.append(match.group("text"))
+
+        start_section(None)
+        return self._build_structure(sections, document_name)
+
+    def _build_structure(self, sections, document_name):
+        structure = {
+            "title": document_name,
+            "subtitle": "",
+            "version": "",
+            "date": "",
+            "sections": []
+        }
+
+        part = 0
+        for section in sections:
+            content = section["content"]
+            # Long untitled runs of text become several numbered parts
+            for start in range(0, len(content), self.max_bullets if section["title"] is None else len(content)):
+                title = section["title"]
+                if title is None:
+                    part += 1
+                    title = "Document Content" if part == 1 else f"Document Content ({part})"
+                structure["sections"].append({
+                    "title": title,
+                    "content": content[start:start + self.max_bullets],
+                    "importance": "medium",
+                    "type": "overview"
+                })
+        return structure
+
+
+def segment_document(text, document_name):
+    return HeuristicSegmenter().segment(text, document_name)
+
+
+def condense_text(text, max_bullets=MAX_BULLETS):
+    """Bullets of a single section's text, ignoring any sub-headings in it."""
+    structure = HeuristicSegmenter(max_bullets=max_bullets).segment(text, "")
+    return [point for section in structure["sections"] for point in section["content"]][:max_bullets]
@@ -0,0 +1,222 @@
+import io
+import os
+import random
+
+import fitz
+from PIL import Image, ImageDraw
+
+# Bump when the generated documents change, so cached corpora are written again
+CORPUS_VERSION = 1
+
+# Size classes of the benchmark corpus: pages, figures per page and running headers/footers
+CORPUS_CLASSES = {
+    "text_10": {"pages": 10},
+    "text_100": {"pages": 100},
+    "text_1000": {"pages": 1000},
+    "images_10": {"pages": 10, "images_per_page": 2},
+    "images_100": {"pages": 100, "images_per_page": 2},
+    "headers_100": {"pages": 100, "running_headers": True},
+}
+
+WORDS = (
+    "system", "bracket", "mount", "cable", "power", "supply", "module", "sensor", "panel", "frame",
+    "install", "verify", "tighten", "connect", "remove", "replace", "check", "adjust", "operate", "clean",
+    "the", "a", "each", "every", "before", "after", "with", "without", "until", "while",
+    "safety", "voltage", "torque", "screw", "housing", "controller", "display", "network", "firmware", "valve",
+    "pressure", "temperature", "filter", "pump", "motor", "gear", "belt", "door", "lock", "switch",
+)
+TOPICS = (
+    "Overview", "Safety Instructions", "Installation", "Mounting Procedure", "Electrical Connection",
+    "Commissioning", "Operation", "Maintenance", "Troubleshooting", "Technical Data", "Spare Parts",
+    "Disposal", "Calibration", "Network Setup", "Firmware Update",
+)
+
+PAGE_MARGIN = 56
+CHAPTER_SIZE, SECTION_SIZE, BODY_SIZE = 16, 13, 10
+IMAGE_SIZE = (480, 320)
+
+
+def _sentence(rng, words=(8, 18)):
+    sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+    return sentence[0].upper() + sentence[1:] + "."
+
+
+def _paragraph(rng):
+    return " ".join(_sentence(rng) for _ in range(rng.randint(2, 5)))
+
+
+def _figure_png(rng, number):
+    """A small diagram-like picture: a gradient background with a few shapes, different for every figure."""
+    width, height = IMAGE_SIZE
+    base = [rng.randint(40, 200) for _ in range(3)]
+    image = Image.linear_gradient("L").resize(IMAGE_SIZE).convert("RGB")
+    image = Image.blend(image, Image.new("RGB", IMAGE_SIZE, tuple(base)), 0.6)
+    draw = ImageDraw.Draw(image)
+    for _ in range(4):
+        x, y = rng.randint(0, width - 80), rng.randint(0, height - 80)
+        colour = tuple(rng.randint(0, 255) for _ in range(3))
+        draw.rectangle((x, y, x + rng.randint(30, 80), y + rng.randint(30, 80)), outline=colour, width=4)
+    draw.text((10, 10), f"Fig. {number}", fill=(255, 255, 255))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _PageWriter:
+    """
+    Places lines and paragraphs top to bottom, starting a new page when one is full. Text is
+    collected in one TextWriter per page and wrapped with cached word widths, which is far
+    quicker than an insert_text or insert_textbox call per block.
+    """
+
+    def __init__(self, document, title, running_headers):
+        self.document = document
+        self.title = title
+        self.running_headers = running_headers
+        self.fonts = {False: fitz.Font("helv"), True: fitz.Font("hebo")}
+        self.space = self.fonts[False].text_length(" ", fontsize=1)
+        self.word_widths = {}
+        self.page = None
+        self.text = None
+        self.y = 0
+
+    def new_page(self):
+        self.finish_page()
+        self.page = self.document.new_page()
+        self.text = fitz.TextWriter(self.page.rect)
+        self.y = PAGE_MARGIN
+        if self.running_headers:
+            self.text.append((PAGE_MARGIN, 30), f"{self.title} - Confidential", font=self.fonts[False], fontsize=8)
+            self.text.append((PAGE_MARGIN, self.page.rect.height - 24), f"Page {self.page.number + 1}",
+                             font=self.fonts[False], fontsize=8)
+
+    def finish_page(self):
+        if self.text is not None:
+            self.text.write_text(self.page)
+            self.text = None
+
+    def space_left(self):
+        return self.page.rect.height - PAGE_MARGIN - self.y
+
+    def line(self, text, size, bold=False):
+        if self.space_left() < size * 2:
+            return False
+        self.text.append((PAGE_MARGIN, self.y + size), text, font=self.fonts[bold], fontsize=size)
+        self.y += size * 2
+        return True
+
+    def _wrap(self, text, width, size):
+        lines = []
+        for source_line in text.split("\n"):
+            line, used = [], 0.0
+            for word in source_line.split():
+                advance = self.word_widths.get(word)
+                if advance is None:
+                    advance = self.word_widths[word] = self.fonts[False].text_length(word, fontsize=1)
+                if line and (used + self.space + advance) * size > width:
+                    lines.append(" ".join(line))
+                    line, used = [], 0.0
+                used += advance + (self.space if line else 0.0)
+                line.append(word)
+            lines.append(" ".join(line))
+        return lines
+
+    def paragraph(self, text, size=BODY_SIZE, indent=0):
+        """Word-wrapped text; the lines that do not fit are dropped and the page is full then."""
+        lines = self._wrap(text, self.page.rect.width - 2 * PAGE_MARGIN - indent, size)
+        line_height = size * 1.2
+        placed = 0
+        for line in lines:
+            if self.space_left() < line_height:
+                break
+            self.text.append((PAGE_MARGIN + indent, self.y + size), line, font=self.fonts[False], fontsize=size)
+            self.y += line_height
+            placed += 1
+        self.y += size * 0.6
+        return placed == len(lines)
+
+    def image(self, png, caption):
+        width, height = IMAGE_SIZE[0] / 2, IMAGE_SIZE[1] / 2
+        if self.space_left() < height + BODY_SIZE * 3:
+            return False
+        rect = fitz.Rect(PAGE_MARGIN, self.y, PAGE_MARGIN + width, self.y + height)
+        self.page.insert_image(rect, stream=png)
+        self.y = rect.y1 + BODY_SIZE
+        return self.line(caption, BODY_SIZE - 1)
+
+
+def write_synthetic_pdf(path, pages, images_per_page=0, running_headers=False, seed=0):
+    """
+    Writes a manual-like PDF of exactly `pages` pages: numbered chapters and sections in larger
+    fonts, paragraphs and bullet lists in body text, `images_per_page` captioned figures on
+    every page and, with `running_headers`, the same header and a page number on every page.
+    The same arguments always produce the same text and pictures.
+    """
+    rng = random.Random(seed)
+    document = fitz.open()
+    title = "Synthetic Equipment Manual"
+    writer = _PageWriter(document, title, running_headers)
+    chapter = section = figure = 0
+
+    def new_page():
+        nonlocal figure
+        writer.new_page()
+        if len(document) == 1:
+            writer.line(title, 24, bold=True)
+        # Figures go at the top of the page, so every page gets the same number of them
+        for _ in range(images_per_page):
+            figure += 1
+            writer.image(_figure_png(rng, figure), f"Figure {figure}: {rng.choice(TOPICS)} of the {rng.choice(WORDS)}")
+
+    new_page()
+    while True:
+        if rng.random() < 0.25 or chapter == 0:
+            chapter += 1
+            section = 0
+            placed = writer.line(f"{chapter} {rng.choice(TOPICS)}", CHAPTER_SIZE, bold=True)
+        elif rng.random() < 0.4:
+            section += 1
+            placed = writer.line(f"{chapter}.{section} {rng.choice(TOPICS)}", SECTION_SIZE, bold=True)
+        elif rng.random() < 0.3:
+            bullets = "\n".join(f"• {_sentence(rng, (4, 10))}" for _ in range(rng.randint(3, 6)))
+            placed = writer.paragraph(bullets, indent=12)
+        else:
+            placed = writer.paragraph(_paragraph(rng))
+
+        if not placed or writer.space_left() < BODY_SIZE * 4:
+            if len(document) == pages:
+                break
+            new_page()
+
+    writer.finish_page()
+    document.set_metadata({"title": title, "producer": "synthetic_pdfs"})
+    document.save(path, garbage=3, deflate=True)
+    document.close()
+    return path
+
+
+def build_corpus(directory, classes=None, seed=0):
+    """
+    Writes the PDFs of the given size classes (all of them by default) into `directory`, reusing
+    files written before by the same corpus version and seed.
+
+    Returns:
+        dict: Class name -> PDF path, in the order of CORPUS_CLASSES
+    """
+    names = list(CORPUS_CLASSES) if classes is None else list(classes)
+    unknown = [name for name in names if name not in CORPUS_CLASSES]
+    if unknown:
+        raise ValueError(f"Unknown corpus classes: {', '.join(unknown)}")
+
+    os.makedirs(directory, exist_ok=True)
+    corpus = {}
+    for name in CORPUS_CLASSES:
+        if name not in names:
+            continue
+        path = os.path.join(directory, f"{name}-v{CORPUS_VERSION}-s{seed}.pdf")
+        if not os.path.exists(path):
+            partial = path + ".part"
+            write_synthetic_pdf(partial, seed=seed, **CORPUS_CLASSES[name])
+            os.replace(partial, path)
+        corpus[name] = path
+    return corpus
@@ -0,0 +1,72 @@
+# tests/test_artifact_store.py
+import os
+
+from artifact_store import ArtifactStore
+
+
+class TestArtifactStore:
+
+    def test_save_and_load(self, temp_dir):
+        store = ArtifactStore(temp_dir)
+        store.save("doc", "clean", "Cleaned text", {"model": "llama3"})
+
+        assert store.has("doc", "clean", {"model": "llama3"})
+        assert store.load("doc", "clean", {"model": "llama3"}) == "Cleaned text"
+        # Different parameters are stored under a different key
+        assert store.load("doc", "clean", {"model": "gemma3"}) is None
+
+    def test_content_keys(self, temp_dir):
+        pdf_path = os.path.join(temp_dir, "doc.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(b"same content")
+
+        assert ArtifactStore.hash_file(pdf_path) == ArtifactStore.hash_bytes(b"same content")
+        assert ArtifactStore.hash_bytes("a") != ArtifactStore.hash_bytes("b")
+
+    def test_invalidate(self, temp_dir):
+        store = ArtifactStore(temp_dir)
+        store.save("doc", "clean", "text")
+        store.save("doc", "analyze", {"title": "Doc"})
+
+        store.invalidate("doc", "clean")
+        assert store.load("doc", "clean") is None
+        assert store.load("doc", "analyze") == {"title": "Doc"}
+
+        store.invalidate("doc")
+        assert not os.path.exists(store.document_dir("doc"))
+
+    def test_corrupted_artifact_is_ignored(self, temp_dir):
+        store = ArtifactStore(temp_dir)
+        path = store.save("doc", "clean", "text")
+        with open(path, "w") as f:
+            f.write("{not json")
+
+        assert store.load("doc", "clean") is None
+
+    def test_pieces_are_shared_between_documents(self, temp_dir):
+        store = ArtifactStore(temp_dir)
+        page_hash = ArtifactStore.hash_bytes("page content")
+        store.save_piece("page_text", page_hash, {"pypdf2": "Text", "pdfminer": "Text\f"})
+
+        assert store.load_piece("page_text", page_hash) == {"pypdf2": "Text", "pdfminer": "Text\f"}
+        assert store.load_piece("page_text", ArtifactStore.hash_bytes("other page")) is None
+        assert store.load_piece("section_bullets", page_hash, {"model": "llama3"}) is None
+
+    def test_least_recently_used_artifacts_are_evicted(self, temp_dir):
+        store = ArtifactStore(temp_dir, max_bytes=0, min_age=60)
+        old_path = store.save("old", "clean", "x" * 1000)
+        used_path = store.save("used", "clean", "y" * 1000)
+        piece_path = store.save_piece("page_text", ArtifactStore.hash_bytes("page"), "z" * 1000)
+        for path in (old_path, used_path, piece_path):
+            os.utime(path, (0, 0))
+        # Reading an artifact marks it as used
+        assert store.load("used", "clean") == "y" * 1000
+
+        store.evict(max_bytes=1500)
+        assert not os.path.exists(store.document_dir("old"))
+        assert not os.path.exists(piece_path)
+        assert store.load("used", "clean") == "y" * 1000
+
+        # Recently used artifacts stay even over the limit
+        assert store.evict() == 0
+        assert os.path.exists(used_path)
@@ -0,0 +1,120 @@
+# tests/test_batch.py
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import fitz
+
+from batch import BatchConverter, main as batch_main
+from memory import MB, MemoryBudget
+
+
+def _write_pdf(path, title):
+    document = fitz.open()
+    page = document.new_page()
+    page.insert_text((72, 72), f"{title.upper()} OVERVIEW")
+    page.insert_text((72, 100), "This paragraph describes the procedure used in the document.")
+    document.save(path)
+    document.close()
+
+
+def _fake_chat(model, messages, **kwargs):
+    prompt = messages[0]['content']
+    if 'Return a JSON object' in prompt:
+        content = json.dumps({"title": "Doc", "sections": [{"title": "Overview", "content": ["Point 1"]}]})
+    else:
+        content = "Cleaned text of the document"
+    return {'message': {'content': content}}
+
+
+class TestBatchConverter:
+
+    def test_find_pdfs(self, temp_dir):
+        os.makedirs(os.path.join(temp_dir, "sub"))
+        for name in ("b.pdf", "a.PDF", "notes.txt", os.path.join("sub", "c.pdf")):
+            open(os.path.join(temp_dir, name), "wb").close()
+
+        found = [os.path.relpath(p, temp_dir) for p in BatchConverter.find_pdfs(temp_dir)]
+        assert found == ["a.PDF", "b.pdf", os.path.join("sub", "c.pdf")]
+        assert len(BatchConverter.find_pdfs(temp_dir, recursive=False)) == 2
+
+    @patch('manageData.ollama.chat', side_effect=_fake_chat)
+    def test_convert_directory_and_resume(self, mock_chat, temp_dir):
+        input_dir = os.path.join(temp_dir, "in")
+        output_dir = os.path.join(temp_dir, "out")
+        os.makedirs(input_dir)
+        _write_pdf(os.path.join(input_dir, "first.pdf"), "first")
+        _write_pdf(os.path.join(input_dir, "second.pdf"), "second")
+
+        events = []
+        converter = BatchConverter(workers=2, artifact_root=os.path.join(temp_dir, "artifacts"),
+                                   progress_callback=lambda event, data: events.append(event))
+        summary = converter.convert_directory(input_dir, output_dir)
+
+        assert summary["converted"] == 2
+        assert summary["failed"] == 0
+        assert summary["pages"] == 2
+        assert os.path.exists(os.path.join(output_dir, "first.pptx"))
+        assert os.path.exists(os.path.join(output_dir, "second.pptx"))
+        assert events.count("document_finished") == 2
+        assert "render" in summary["stage_seconds"]
+
+        # A second run skips the documents that were already converted
+        summary = converter.convert_directory(input_dir, output_dir)
+        assert summary["skipped"] == 2
+        assert summary["converted"] == 0
+
+    @patch('manageData.ollama.chat', side_effect=_fake_chat)
+    def test_batches_share_the_given_worker_pool(self, mock_chat, temp_dir):
+        input_dir = os.path.join(temp_dir, "in")
+        os.makedirs(input_dir)
+        _write_pdf(os.path.join(input_dir, "first.pdf"), "first")
+
+        with ThreadPoolExecutor(max_workers=1) as shared:
+            for output in ("out1", "out2"):
+                converter = BatchConverter(artifact_root=os.path.join(temp_dir, "artifacts"), cpu_pool=shared)
+                summary = converter.convert_directory(input_dir, os.path.join(temp_dir, output))
+                assert summary["converted"] == 1
+            # Still running for the next batch
+            assert shared.submit(lambda: "alive").result() == "alive"
+
+    @patch('manageData.ollama.chat')
+    def test_documents_reserve_memory_while_they_convert(self, mock_chat, temp_dir):
+        input_dir = os.path.join(temp_dir, "in")
+        os.makedirs(input_dir)
+        _write_pdf(os.path.join(input_dir, "first.pdf"), "first")
+        budget = MemoryBudget(capacity=1024 * MB, job_limit=512 * MB)
+        reserved = []
+
+        def chat(model, messages, **kwargs):
+            reserved.append(budget.reserved)
+            return _fake_chat(model, messages, **kwargs)
+
+        mock_chat.side_effect = chat
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            converter = BatchConverter(artifact_root=os.path.join(temp_dir, "artifacts"), cpu_pool=pool,
+                                       memory_budget=budget)
+            assert converter.convert_directory(input_dir, os.path.join(temp_dir, "out"))["converted"] == 1
+            assert reserved and all(amount > 0 for amount in reserved)
+            assert budget.reserved == 0
+
+            # A document that may never fit fails without being read
+            budget.job_limit = 1
+            summary = converter.convert_directory(input_dir, os.path.join(temp_dir, "out2"))
+        assert summary["failed"] == 1
+        assert "select fewer pages" in summary["documents"][0]["error"]
+
+    @patch('batch.BatchConverter.convert_directory')
+    def test_cli(self, mock_convert, temp_dir, capsys):
+        mock_convert.return_value = {
+            "documents": [], "converted": 3, "skipped": 1, "failed": 0, "pages": 30,
+            "elapsed_seconds": 60.0, "documents_per_minute": 3.0, "pages_per_minute": 30.0,
+            "stage_seconds": {"clean": 12.0}
+        }
+
+        exit_code = batch_main([temp_dir, "--workers", "2", "--llm-concurrency", "2"])
+
+        assert exit_code == 0
+        mock_convert.assert_called_once_with(temp_dir, temp_dir, recursive=True)
+        assert "3.00 documents/min" in capsys.readouterr().out
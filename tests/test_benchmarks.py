@@ -0,0 +1,73 @@
+# tests/test_benchmarks.py
+import json
+import os
+
+import fitz
+
+from benchmarks import benchmark_document, compare_results, main as benchmarks_main
+from synthetic_pdfs import build_corpus, write_synthetic_pdf
+
+
+class TestSyntheticPdfs:
+
+    def test_documents_have_the_requested_pages_figures_and_headers(self, tmp_path):
+        path = write_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=3, images_per_page=2, running_headers=True)
+
+        with fitz.open(path) as document:
+            assert document.page_count == 3
+            assert [len(page.get_images()) for page in document] == [2, 2, 2]
+            assert all(page.get_text().startswith("Synthetic Equipment Manual - Confidential") for page in document)
+
+    def test_corpus_is_deterministic_and_reused(self, tmp_path):
+        first = build_corpus(str(tmp_path / "a"), ["text_10"])["text_10"]
+        second = build_corpus(str(tmp_path / "b"), ["text_10"])["text_10"]
+        with open(first, "rb") as a, open(second, "rb") as b:
+            assert fitz.open(stream=a.read()).get_page_text(4) == fitz.open(stream=b.read()).get_page_text(4)
+
+        mtime = os.path.getmtime(first)
+        assert build_corpus(str(tmp_path / "a"), ["text_10"])["text_10"] == first
+        assert os.path.getmtime(first) == mtime
+
+
+class TestBenchmarks:
+
+    def test_every_stage_is_timed_on_its_own(self, tmp_path):
+        path = write_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=2, images_per_page=1)
+
+        results = benchmark_document("tiny", path, repeat=2, work_dir=str(tmp_path))
+
+        assert [r["stage"] for r in results] == [
+            "extract.pypdf2", "extract.pdfminer", "extract.pymupdf_pages", "outline", "images.extract",
+            "images.optimize", "heuristics.segment", "heuristics.normalize", "associate.local",
+            "assign_images", "render", "fast_mode"]
+        assert all(len(r["runs"]) == 2 and r["min"] <= r["median"] and r["pages"] == 2 for r in results)
+
+    def test_compare_flags_only_slowdowns_above_threshold_and_noise(self):
+        previous = {"results": [{"corpus": "c", "stage": "render", "median": 1.0},
+                                {"corpus": "c", "stage": "outline", "median": 0.001},
+                                {"corpus": "c", "stage": "segment", "median": 1.0}]}
+        current = {"results": [{"corpus": "c", "stage": "render", "median": 1.5},
+                               {"corpus": "c", "stage": "outline", "median": 0.003},
+                               {"corpus": "c", "stage": "segment", "median": 1.1},
+                               {"corpus": "c", "stage": "new", "median": 9.0}]}
+
+        regressions = compare_results(previous, current, threshold=0.2)
+
+        assert [(r["stage"], r["change"]) for r in regressions] == [("render", 0.5)]
+
+    def test_cli_writes_json_and_fails_on_regression(self, tmp_path, capsys):
+        output = tmp_path / "results.json"
+        args = ["--classes", "text_10", "--repeat", "1", "--corpus-dir", str(tmp_path / "corpus"), "-o", str(output)]
+        assert benchmarks_main(args) == 0
+
+        report = json.loads(output.read_text())
+        assert report["meta"]["repeat"] == 1
+        assert {r["corpus"] for r in report["results"]} == {"text_10"}
+
+        # An earlier run that was much faster makes the comparison fail
+        for result in report["results"]:
+            result["median"] = 0.0
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps(report))
+        assert benchmarks_main(args + ["--compare", str(baseline)]) == 1
+        assert "REGRESSION" in capsys.readouterr().out
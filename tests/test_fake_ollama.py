@@ -0,0 +1,78 @@
+# tests/test_fake_ollama.py
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import ollama
+import pytest
+
+from fake_ollama import FakeOllamaServer, LatencyModel, schema_instance
+from pipeline import ConversionPipeline
+
+FAST = LatencyModel(tokens_per_second=0, prompt_tokens_per_second=0)
+
+
+@pytest.fixture
+def server():
+    with FakeOllamaServer(latency=FAST) as running:
+        yield running
+
+
+class TestFakeOllama:
+
+    def test_chat_streamed_and_not(self, server):
+        client = ollama.Client(host=server.url)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        response = client.chat(model="llama3", messages=messages)
+        chunks = list(client.chat(model="llama3", messages=messages, stream=True))
+
+        assert response.done and response.eval_count > 1
+        assert "".join(chunk.message.content for chunk in chunks) == response.message.content
+        assert chunks[-1].done and not chunks[0].done
+        assert [model.model for model in client.list().models][0] == "llama3"
+
+    def test_unknown_model_is_an_error(self, server):
+        with pytest.raises(ollama.ResponseError):
+            ollama.Client(host=server.url).chat(model="missing", messages=[{"role": "user", "content": "x"}])
+
+    def test_structured_output_follows_schema(self, server):
+        schema = {"type": "object", "required": ["title", "points", "level"], "properties": {
+            "title": {"type": "string"},
+            "points": {"type": "array", "items": {"type": "string"}},
+            "level": {"enum": ["high", "low"]},
+        }}
+        response = ollama.Client(host=server.url).chat(
+            model="llama3", messages=[{"role": "user", "content": "x"}], format=schema)
+
+        assert json.loads(response.message.content) == schema_instance(schema) == \
+            {"title": "example", "points": ["example"], "level": "high"}
+
+    def test_pipeline_runs_against_the_stand_in(self, server):
+        client = ollama.Client(host=server.url)
+        text = "INTRODUCTION\nThe system moves containers around the yard.\n\n" \
+               "INSTALLATION\nMount the bracket on the frame before wiring."
+        with patch("manageData.ollama.chat", client.chat):
+            pipeline = ConversionPipeline()
+            cleaned = pipeline.clean(text)
+            structure = pipeline.analyze(cleaned, "Doc", text)
+
+        assert cleaned == text
+        assert [section["title"] for section in structure["sections"]] == ["INTRODUCTION", "INSTALLATION"]
+        assert pipeline.stage_sources["analyze"] == "computed"
+
+    def test_latency_model_and_parallel_limit(self):
+        latency = LatencyModel(tokens_per_second=100, prompt_tokens_per_second=1000, load_seconds=0.05, jitter=0.2)
+        assert latency.prompt_seconds("same prompt", 100) == latency.prompt_seconds("same prompt", 100)
+        assert 0.05 + 0.1 * 0.8 <= latency.prompt_seconds("same prompt", 100) <= 0.05 + 0.1 * 1.2
+
+        slow = LatencyModel(tokens_per_second=0, prompt_tokens_per_second=0, load_seconds=0.2)
+        with FakeOllamaServer(latency=slow, num_parallel=1) as server:
+            client = ollama.Client(host=server.url)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                list(executor.map(lambda _: client.chat(model="llama3", messages=[{"role": "user", "content": "x"}]),
+                                  range(2)))
+            # The second request waits for the only slot
+            assert time.perf_counter() - started >= 0.4
@@ -0,0 +1,96 @@
+# tests/test_image_assignment.py
+from image_assignment import PageImageIndex, assign_images, locate_section_pages
+
+
+class TestLocateSectionPages:
+
+    def test_spans_follow_document_order(self):
+        pages = [
+            "Introduction\nThis report covers the quarterly results.",
+            "More introduction text.\nMethods\nWe measured throughput on every node.",
+            "Results\nThroughput doubled after the change.",
+            "Appendix material.",
+        ]
+        sections = [
+            {"title": "Introduction", "content": ["This report covers the quarterly results"]},
+            {"title": "Our approach", "content": ["We measured throughput on every node"]},
+            {"title": "Results", "content": []},
+        ]
+
+        locate_section_pages(sections, pages)
+
+        assert [(s["page_start"], s["page_end"]) for s in sections] == [(0, 1), (1, 2), (2, 3)]
+
+    def test_unknown_section_shares_previous_start(self):
+        sections = [{"title": "Alpha", "content": []}, {"title": "Not in the text", "content": []}]
+        locate_section_pages(sections, ["Alpha begins here", "Other text"])
+        assert sections[1]["page_start"] == 0
+
+    def test_known_spans_are_kept_and_anchor_the_search(self):
+        pages = ["Summary of the report", "Details follow", "Summary table of costs", "Costs in detail"]
+        sections = [
+            {"title": "Overview", "content": [], "page_start": 1, "page_end": 1},
+            {"title": "Summary", "content": []},
+            {"title": "Costs", "content": [], "page_start": 3, "page_end": 3},
+        ]
+
+        locate_section_pages(sections, pages)
+
+        # Searched after the outline section, so the title on page 0 is not taken
+        assert [(s["page_start"], s["page_end"]) for s in sections] == [(1, 1), (2, 3), (3, 3)]
+
+    def test_missing_sections_only_search_a_window_of_pages(self):
+        pages = ["Start here"] + ["filler text"] * 40 + ["Late chapter"]
+        sections = [{"title": "Start", "content": []}] + \
+            [{"title": f"Missing {i}", "content": []} for i in range(18)] + [{"title": "Late chapter", "content": []}]
+
+        locate_section_pages(sections, pages)
+        # 40 pages after the last start found is beyond the window of 10 pages
+        assert sections[-1]["page_start"] == 0
+
+        late = [{"title": "Late chapter", "content": []}]
+        locate_section_pages(late, pages)
+        assert late[0]["page_start"] == 41
+
+
+class TestAssignImages:
+
+    def test_each_image_used_once_and_largest_first(self):
+        image_data = [
+            {"path": "small.png", "page_num": 0, "width": 10, "height": 10},
+            {"path": "large.png", "page_num": 0, "width": 500, "height": 400},
+            {"path": "other.png", "page_num": 2, "width": 100, "height": 100},
+        ]
+        structure = {"sections": [
+            {"title": "One", "content": [], "page_start": 0, "page_end": 0},
+            {"title": "Two", "content": [], "page_start": 0, "page_end": 1},
+            {"title": "Three", "content": [], "page_start": 1, "page_end": 1},
+            {"title": "Four", "content": [], "page_start": 2, "page_end": 3},
+        ]}
+
+        result = assign_images(structure, image_data)
+        picks = [s["image_info"]["relevant_images"] for s in result["sections"]]
+
+        assert picks == [[1], [0], [], [2]]
+        assert [s["has_images"] for s in result["sections"]] == [True, True, False, True]
+
+    def test_model_picks_are_kept_and_not_reused(self):
+        image_data = [{"path": "a.png", "page_num": 0}, {"path": "b.png", "page_num": 0}]
+        structure = {"sections": [
+            {"title": "One", "page_start": 0, "page_end": 0},
+            {"title": "Two", "page_start": 0, "page_end": 0, "image_info": {"relevant_images": [0]}},
+            {"title": "Three", "page_start": 0, "page_end": 0, "image_info": {"relevant_images": [0, 7]}},
+        ]}
+
+        result = assign_images(structure, image_data)
+        picks = [s["image_info"]["relevant_images"] for s in result["sections"]]
+
+        # Section two keeps its pick, section one gets the remaining image, section three gets nothing
+        assert picks == [[1], [0], []]
+
+    def test_page_index_skips_used_images(self):
+        index = PageImageIndex([{"page_num": 3}, {"page_num": 3}])
+        assert index.take(0)
+        assert not index.take(0)
+        assert index.take_from_pages(0, 5) == 1
+        assert index.take_from_pages(0, 5) is None
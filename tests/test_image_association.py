@@ -0,0 +1,63 @@
+# tests/test_image_association.py
+import numpy as np
+
+from image_association import TfidfImageAssociator, greedy_assignment, tfidf_similarity, tokenize
+
+
+class TestTokenize:
+
+    def test_figure_references_become_tokens(self):
+        tokens = tokenize("As shown in Fig. 3 and Figure 3.1, the table 2 results")
+        assert "fig_3" in tokens
+        assert "fig_3.1" in tokens
+        assert "table_2" in tokens
+        assert "the" not in tokens
+
+
+class TestSimilarity:
+
+    def test_matching_documents_score_highest(self):
+        similarity = tfidf_similarity(
+            [tokenize("network latency measurements"), tokenize("quarterly revenue growth")],
+            [tokenize("revenue by quarter growth chart"), tokenize("latency of the network")])
+
+        assert similarity.shape == (2, 2)
+        assert similarity[0, 1] > similarity[0, 0]
+        assert similarity[1, 0] > similarity[1, 1]
+        assert np.all(similarity <= 1.0 + 1e-9)
+
+    def test_no_shared_terms(self):
+        similarity = tfidf_similarity([tokenize("alpha")], [tokenize("beta"), []])
+        assert similarity.shape == (1, 2)
+        assert not similarity.any()
+
+    def test_greedy_assignment_uses_each_column_once(self):
+        similarity = np.array([[0.9, 0.8], [0.85, 0.1], [0.05, 0.02]])
+        assert greedy_assignment(similarity, min_score=0.08) == {0: (0, 0.9), 1: (1, 0.1)}
+
+
+class TestTfidfImageAssociator:
+
+    def test_associates_by_caption_reference(self):
+        structure = {"sections": [
+            {"title": "Introduction", "content": ["Overview of the project goals"]},
+            {"title": "Deployment", "content": ["The cluster topology appears in Figure 3"]},
+            {"title": "Monitoring", "content": ["Dashboards track error rates over time"]},
+        ]}
+        image_data = [
+            {"path": "topology.png", "caption": "Figure 3: Cluster topology", "context": "Nodes and racks"},
+            {"path": "dashboard.png", "caption": "", "context": "Error rates dashboard over time"},
+            {"path": "logo.png", "caption": "", "context": ""},
+        ]
+
+        result = TfidfImageAssociator().associate_images(structure, "", image_data)
+        sections = result["sections"]
+
+        assert sections[0]["has_images"] is False
+        assert sections[1]["image_info"]["relevant_images"] == [0]
+        assert sections[1]["image_info"]["image_references"] == ["Figure 3: Cluster topology"]
+        assert sections[2]["image_info"]["relevant_images"] == [1]
+
+    def test_without_images_returns_structure_unchanged(self):
+        structure = {"sections": [{"title": "A", "content": []}]}
+        assert TfidfImageAssociator().associate_images(structure, "", []) == {"sections": [{"title": "A", "content": []}]}
@@ -115,6 +115,41 @@ class TestImageExtractor:
             # If an error occurs, the method should return an empty list
             assert result == []
 
+    def test_optimize_images_downscales_large_images(self, temp_dir):
+        """Tests that oversized images are downscaled and small ones left untouched."""
+        from PIL import Image
+
+        large_path = os.path.join(temp_dir, "large.png")
+        small_path = os.path.join(temp_dir, "small.png")
+        Image.new("RGB", (3200, 1600)).save(large_path)
+        Image.new("RGB", (400, 300)).save(small_path)
+
+        image_data = [
+            {"path": large_path, "page_num": 0, "width": 3200, "height": 1600, "size": 3200 * 1600},
+            {"path": small_path, "page_num": 1, "width": 400, "height": 300, "size": 400 * 300},
+        ]
+        result = ImageExtractor.optimize_images(image_data, max_dimension=1600)
+
+        assert (result[0]["width"], result[0]["height"]) == (1600, 800)
+        assert Image.open(large_path).size == (1600, 800)
+        assert (result[1]["width"], result[1]["height"]) == (400, 300)
+
+    def test_image_context_prefers_nearest_caption(self):
+        """Tests that the caption closest to the image is picked and nearby text is kept."""
+        blocks = [
+            (50, 20, 500, 60, "Chapter 2 Results\n", 0, 0),
+            (50, 420, 500, 440, "Figure 4: Throughput per node\n", 1, 0),
+            (50, 700, 500, 720, "Figure 5: Unrelated chart\n", 2, 0),
+            (50, 100, 500, 400, "<image>", 3, 1),
+        ]
+
+        caption, context = ImageExtractor.image_context(blocks, [(50, 100, 500, 400)])
+
+        assert caption == "Figure 4: Throughput per node"
+        assert context.startswith("Figure 4: Throughput per node")
+        assert "Chapter 2 Results" in context
+        assert ImageExtractor.image_context([], [(0, 0, 1, 1)]) == ("", "")
+
     @pytest.fixture
     def mock_pdf_with_image(self):
         """Fixture that creates a PDF mock with an image."""
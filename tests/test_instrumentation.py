@@ -0,0 +1,52 @@
+# tests/test_instrumentation.py
+import json
+import logging
+
+from instrumentation import MetricsRegistry, JsonFormatter, JobIdFilter, job_context, job_id_var
+
+
+class TestInstrumentation:
+
+    def test_counter_render(self):
+        registry = MetricsRegistry()
+        fallbacks = registry.counter("test_fallbacks_total", "Fallbacks", ("stage",))
+        fallbacks.inc(stage="analyze")
+        fallbacks.inc(2, stage="analyze")
+
+        output = registry.render()
+        assert "# TYPE test_fallbacks_total counter" in output
+        assert 'test_fallbacks_total{stage="analyze"} 3' in output
+
+    def test_histogram_buckets(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_seconds", "Latency", ("call",), buckets=(0.1, 1.0))
+        latency.observe(0.05, call="clean")
+        latency.observe(0.5, call="clean")
+        latency.observe(5.0, call="clean")
+
+        output = registry.render()
+        assert 'test_seconds_bucket{call="clean",le="0.1"} 1' in output
+        assert 'test_seconds_bucket{call="clean",le="1.0"} 2' in output
+        assert 'test_seconds_bucket{call="clean",le="+Inf"} 3' in output
+        assert 'test_seconds_count{call="clean"} 3' in output
+        assert latency.count(call="clean") == 3
+
+    def test_histogram_timer(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("test_timer_seconds", "Latency", ("step",))
+        with latency.time(step="save"):
+            pass
+        assert latency.count(step="save") == 1
+
+    def test_json_log_records_carry_job_id(self):
+        record = logging.LogRecord("pipeline", logging.INFO, __file__, 1, "Stage '%s' finished", ("clean",), None)
+        record.stage = "clean"
+
+        with job_context("job-123"):
+            JobIdFilter().filter(record)
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["job_id"] == "job-123"
+        assert entry["message"] == "Stage 'clean' finished"
+        assert entry["stage"] == "clean"
+        assert job_id_var.get() == "-"
@@ -0,0 +1,57 @@
+# tests/test_jobs.py
+import json
+import threading
+
+from jobs import JobManager, JobProgress, format_sse
+
+
+class TestJobs:
+
+    def test_progress_follow_replays_and_waits(self):
+        progress = JobProgress()
+        progress.emit("stage_started", {"stage": "clean"})
+
+        def producer():
+            progress.emit("stage_finished", {"stage": "clean", "seconds": 0.1})
+            progress.emit("job_finished")
+
+        threading.Timer(0.05, producer).start()
+        events = [event for event in progress.follow(heartbeat=1.0) if event]
+
+        assert [event["event"] for event in events] == ["stage_started", "stage_finished", "job_finished"]
+        assert [event["id"] for event in events] == [0, 1, 2]
+
+    def test_follow_from_last_event_id(self):
+        progress = JobProgress()
+        progress.emit("stage_started", {"stage": "clean"})
+        progress.emit("job_finished")
+
+        events = list(progress.follow(start=1))
+        assert [event["event"] for event in events] == ["job_finished"]
+
+    def test_format_sse(self):
+        message = format_sse({"id": 3, "event": "llm_progress", "data": {"tokens": 32}})
+        assert message.startswith("id: 3\nevent: llm_progress\n")
+        assert json.loads(message.split("data: ")[1]) == {"tokens": 32}
+        assert format_sse(None) == ": keep-alive\n\n"
+
+    def test_manager_runs_job(self):
+        manager = JobManager()
+        job = manager.create("doc.pdf")
+        manager.start(job, lambda j: b"pptx bytes").join()
+
+        assert manager.get(job.id) is job
+        assert job.status == "finished"
+        assert job.result == b"pptx bytes"
+        assert job.progress.events[-1]["event"] == "job_finished"
+
+    def test_manager_records_failure(self):
+        def failing(job):
+            raise ValueError("model unavailable")
+
+        manager = JobManager()
+        job = manager.create("doc.pdf")
+        manager.start(job, failing).join()
+
+        assert job.status == "failed"
+        assert job.progress.events[-1]["data"]["error"] == "model unavailable"
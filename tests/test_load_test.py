@@ -0,0 +1,85 @@
+# tests/test_load_test.py
+import threading
+from unittest.mock import patch
+
+from werkzeug.serving import make_server
+
+from load_test import LoadTester, iter_sse, parse_server_timing, percentile, summarize
+from main import app
+
+
+def _fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+    assert use_cache is False
+    progress_callback("stage_finished", {"stage": "extract_text", "seconds": 0.25, "source": "computed"})
+    progress_callback("stage_finished", {"stage": "render", "seconds": 0.5, "source": "computed"})
+    output_file.write(b"pptx bytes")
+    return output_file
+
+
+class _Server:
+    def __enter__(self):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.thread.join()
+
+
+class TestLoadTest:
+
+    def test_percentiles_interpolate_between_ranks(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 0.5) == 50.5
+        assert round(percentile(values, 0.99), 2) == 99.01
+        assert percentile([3.0], 0.95) == 3.0
+        assert percentile([], 0.5) is None
+
+    def test_server_timing_and_event_stream_are_parsed(self):
+        assert parse_server_timing("clean;dur=1250.0, render;desc=x;dur=80, bad;dur=x") == \
+            {"clean": 1.25, "render": 0.08}
+        lines = ["id: 0", "event: stage_finished", 'data: {"stage": "clean"}', "", ": heartbeat", "",
+                 "event: job_finished", "data: {}", ""]
+        assert list(iter_sse(lines)) == [("stage_finished", '{"stage": "clean"}'), ("job_finished", "{}")]
+
+    def test_summary_separates_errors_from_throttling(self):
+        def result(index, status, latency, error=None):
+            return {"index": index, "job_id": str(index), "document": "d.pdf", "status": status, "error": error,
+                    "latency": latency, "client_wait": 0.0, "stages": {"render": latency / 2} if not error else {}}
+
+        results = [result(0, 200, 1.0), result(1, 200, 3.0), result(2, 429, 0.1, "busy"),
+                   result(3, 500, 0.2, "boom")]
+        summary = summarize(results, elapsed=2.0, slowest=1)
+
+        assert (summary["succeeded"], summary["failed"], summary["throttled"]) == (2, 1, 1)
+        assert summary["error_rate"] == 0.25 and summary["throttled_rate"] == 0.25
+        assert summary["throughput_per_second"] == 1.0
+        assert summary["latency_seconds"]["p50"] == 2.0
+        assert summary["stages_seconds"]["render"]["max"] == 1.5
+        assert summary["slowest"] == [{"index": 1, "job_id": "1", "document": "d.pdf", "latency": 3.0,
+                                       "stages": {"render": 1.5}}]
+
+    @patch('main.pdf_file_to_pptx', side_effect=_fake_convert)
+    def test_convert_requests_record_status_and_stage_timings(self, mock_convert):
+        with _Server() as url:
+            tester = LoadTester(url, [("doc.pdf", b"%PDF-1.5\n%%EOF", 1)], api="convert")
+            results, elapsed = tester.run(concurrency=2, requests=4)
+            tester.close()
+
+        assert [r["index"] for r in results] == [0, 1, 2, 3]
+        assert all(r["status"] == 200 and r["error"] is None and len(r["job_id"]) == 32 for r in results)
+        assert results[0]["stages"] == {"extract_text": 0.25, "render": 0.5}
+        assert summarize(results, elapsed)["succeeded"] == 4
+
+    @patch('main.pdf_file_to_pptx', side_effect=_fake_convert)
+    def test_job_requests_follow_events_at_an_arrival_rate(self, mock_convert):
+        with _Server() as url:
+            tester = LoadTester(url, [("doc.pdf", b"%PDF-1.5\n%%EOF", 1)], api="jobs")
+            results, _ = tester.run(concurrency=2, rate=50.0, requests=3)
+            tester.close()
+
+        assert len(results) == 3
+        assert all(r["status"] == 200 and r["bytes"] == len(b"pptx bytes") for r in results)
+        assert results[2]["stages"] == {"extract_text": 0.25, "render": 0.5}
@@ -1,74 +1,294 @@
 # tests/test_main.py
+import io
 import os
-from unittest.mock import patch, MagicMock
+import zipfile
+from unittest.mock import patch
 
-from main import pdf_to_pptx_with_ollama, normalize_document_structure, create_fallback_structure
+from manageData import deadline_var, tenant_var
+from main import app, artifact_store
 
 
 class TestMainFunctions:
 
-    @patch('main.OllamaProcessor')
-    @patch('main.PdfExtractor')
-    @patch('main.PdfToPptxConverter')
-    @patch('image_extractor.ImageExtractor.extract_images_from_pdf')
-    def test_pdf_to_pptx_with_ollama(self, mock_extract_images, mock_converter_class,
-                                     mock_extractor_class, mock_processor_class, sample_pdf_path, temp_dir):
-        # Configure mocks
-        mock_extractor = MagicMock()
-        mock_extractor.extract_text.return_value = "Extracted text from PDF"
-        mock_extractor_class.return_value = mock_extractor
-
-        mock_processor = MagicMock()
-        mock_processor.clean_and_structure_text.return_value = "Cleaned text"
-        mock_processor.analyze_document_with_images.return_value = {
-            "title": "Document",
-            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
-        }
-        mock_processor_class.return_value = mock_processor
-
-        mock_converter = MagicMock()
-        mock_converter_class.return_value = mock_converter
-
-        mock_extract_images.return_value = [{"path": "image1.jpg", "page_num": 0}]
-
-        # Execute the function
-        output_file = os.path.join(temp_dir, "output.pptx")
-        result = pdf_to_pptx_with_ollama(pdf_path=sample_pdf_path, output_file=output_file)
-
-        # Assertions
-        assert result == output_file
-        mock_extractor.extract_text.assert_called_once_with(sample_pdf_path)
-        mock_processor.clean_and_structure_text.assert_called_once()
-        mock_processor.analyze_document_with_images.assert_called_once()
-        mock_converter.create_presentation.assert_called_once()
-
-    def test_normalize_document_structure(self):
-        # Case 1: Structure is already a valid dictionary
-        valid_structure = {
-            "title": "Document",
-            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
-        }
-        result = normalize_document_structure(valid_structure, "Document Name", "Original text")
-        assert result["title"] == "Document"
-        assert len(result["sections"]) == 1
-
-        # Case 2: Structure is a valid JSON string
-        json_structure = '{"title": "JSON Document", "sections": [{"title": "JSON Section", "content": ["Item 1"]}]}'
-        result = normalize_document_structure(json_structure, "Document Name", "Original text")
-        assert result["title"] == "JSON Document"
-
-        # Case 3: Invalid structure, fallback created
-        with patch('main.create_fallback_structure') as mock_fallback:
-            mock_fallback.return_value = {"title": "Fallback", "sections": []}
-            result = normalize_document_structure(None, "Document Name", "Original text")
-            mock_fallback.assert_called_once()
-            assert result["title"] == "Fallback"
-
-    def test_create_fallback_structure(self):
-        text = "# Title 1\nContent of title 1\n\n# Title 2\nContent of title 2"
-        document_name = "Test Document"
-
-        result = create_fallback_structure(text, document_name)
-
-        assert result["title"] == document_name
-        assert len(result["sections"]) > 0
\ No newline at end of file
+    @patch('main.pdf_file_to_pptx')
+    def test_job_endpoints_stream_progress(self, mock_convert):
+        def fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+            progress_callback("stage_started", {"stage": "clean"})
+            progress_callback("stage_finished", {"stage": "clean", "seconds": 0.5, "source": "computed"})
+            output_file.write(b"pptx bytes")
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+
+        response = client.post('/jobs', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'doc.pdf')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202
+        job = response.get_json()
+
+        events = client.get(job['events_url']).get_data(as_text=True)
+        assert "event: stage_started" in events
+        assert "event: stage_finished" in events
+        assert events.rstrip().split("\n\n")[-1].startswith("id: 3\nevent: job_finished")
+
+        result = client.get(job['result_url'])
+        assert result.status_code == 200
+        assert result.data == b"pptx bytes"
+
+    @patch('main.BatchConverter.convert_directory')
+    def test_batch_endpoint_accepts_zip(self, mock_convert_directory):
+        def fake_convert_directory(input_dir, output_dir):
+            assert sorted(os.listdir(input_dir)) == ["a.pdf", "b.pdf"]
+            os.makedirs(output_dir)
+            documents = []
+            for name in ("a", "b"):
+                output = os.path.join(output_dir, f"{name}.pptx")
+                with open(output, "wb") as f:
+                    f.write(b"pptx " + name.encode())
+                documents.append({"status": "converted", "output": output})
+            return {"documents": documents, "converted": 2}
+
+        mock_convert_directory.side_effect = fake_convert_directory
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("docs/a.pdf", b"%PDF-1.5")
+            zf.writestr("../b.pdf", b"%PDF-1.5")
+            zf.writestr("readme.txt", b"ignored")
+        archive.seek(0)
+
+        client = app.test_client()
+        response = client.post('/convert/batch', data={'archive': (archive, 'docs.zip')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202
+        job = response.get_json()
+        assert job['documents'] == 2
+
+        client.get(job['events_url']).get_data()
+        result = client.get(job['result_url'])
+        assert result.mimetype == 'application/zip'
+        with zipfile.ZipFile(io.BytesIO(result.data)) as zf:
+            assert sorted(zf.namelist()) == ["a.pptx", "b.pptx"]
+
+    @patch('main.BatchConverter.convert_directory')
+    def test_batch_endpoint_limits_and_names_its_documents(self, mock_convert_directory):
+        received = []
+
+        def fake_convert_directory(input_dir, output_dir):
+            received.append(sorted(os.listdir(input_dir)))
+            return {"documents": [], "converted": 0}
+
+        mock_convert_directory.side_effect = fake_convert_directory
+
+        def upload(members, **form):
+            archive = io.BytesIO()
+            with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+                for name, data in members:
+                    zf.writestr(name, data)
+            archive.seek(0)
+            return client.post('/convert/batch', data={'archive': (archive, 'docs.zip'), **form},
+                               content_type='multipart/form-data')
+
+        client = app.test_client()
+        response = upload([("a/report.pdf", b"%PDF-1.5 a"), ("b/report.pdf", b"%PDF-1.5 b"),
+                           ("c/Report.pdf", b"%PDF-1.5 c")])
+        assert response.status_code == 202 and response.get_json()['documents'] == 3
+        client.get(response.get_json()['events_url']).get_data()
+        assert received == [["Report-3.pdf", "report-2.pdf", "report.pdf"]]
+
+        assert upload([("a.pdf", b"%PDF-1.5")], theme="neon").status_code == 400
+        with patch.dict(app.config, {'BATCH_MAX_FILES': 2}):
+            assert upload([(f"{n}.pdf", b"%PDF-1.5") for n in range(3)]).status_code == 413
+        with patch.dict(app.config, {'BATCH_MAX_BYTES': 1024}):
+            # Highly compressible, like a zip bomb: the declared size counts, not the upload size
+            assert upload([("big.pdf", b"0" * 4096)]).status_code == 413
+        assert len(received) == 1
+
+    @patch('main.pdf_file_to_pptx')
+    def test_convert_reports_stage_timings_and_metrics(self, mock_convert):
+        def fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+            progress_callback("stage_finished", {"stage": "clean", "seconds": 1.25, "source": "computed"})
+            output_file.write(b"pptx bytes")
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+        uploads_before = sorted(os.listdir(app.config['UPLOAD_FOLDER']))
+
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'timed.pdf')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.headers['Server-Timing'] == "clean;dur=1250.0"
+        assert len(response.headers['X-Job-Id']) == 32
+        assert response.is_streamed
+        assert response.data == b"pptx bytes"
+        assert response.headers['Content-Length'] == str(len(b"pptx bytes"))
+        assert sorted(os.listdir(app.config['UPLOAD_FOLDER'])) == uploads_before
+        response.close()
+
+        metrics = client.get('/metrics')
+        assert metrics.mimetype == 'text/plain'
+        assert "# TYPE pdf2pptx_stage_duration_seconds histogram" in metrics.get_data(as_text=True)
+
+    @patch('main.pdf_file_to_pptx')
+    def test_conversions_are_scheduled_for_the_requesting_tenant(self, mock_convert):
+        tenants = []
+
+        def fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+            tenants.append(tenant_var.get())
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'a.pdf'), 'tenant': 'acme'},
+                    content_type='multipart/form-data').close()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'b.pdf')},
+                    headers={'X-Tenant': 'globex'}, content_type='multipart/form-data').close()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'c.pdf')},
+                    content_type='multipart/form-data').close()
+
+        assert tenants == ["acme", "globex", "default"]
+
+    @patch('main.pdf_file_to_pptx')
+    def test_convert_applies_the_budget_and_reports_degradations(self, mock_convert):
+        budgets = []
+
+        def fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+            budgets.append((deadline_var.get().seconds, deadline_var.get().requested))
+            progress_callback("stage_degraded", {"stage": "clean", "action": "skipped", "reason": "late"})
+            progress_callback("stage_degraded", {"stage": "analyze", "action": "heuristic", "reason": "late"})
+            output_file.write(b"pptx bytes")
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'a.pdf'), 'budget': '30'},
+                               content_type='multipart/form-data')
+        assert response.headers['X-Degraded'] == "clean=skipped, analyze=heuristic"
+        response.close()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'b.pdf')},
+                    headers={'X-Request-Budget': '12.5'}, content_type='multipart/form-data').close()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'c.pdf')},
+                    content_type='multipart/form-data').close()
+        assert budgets == [(30.0, True), (12.5, True), (app.config['REQUEST_BUDGET_SECONDS'], False)]
+
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'd.pdf'), 'budget': '-1'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+
+    @patch('main.pdf_to_pptx_with_ollama')
+    def test_requests_can_skip_the_artifact_store(self, mock_convert):
+        stores = []
+
+        def fake_convert(pdf_path, output_file, artifact_store, **kwargs):
+            stores.append(artifact_store)
+            output_file.write(b"pptx bytes")
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'a.pdf')},
+                    content_type='multipart/form-data').close()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'b.pdf'), 'cache': '0'},
+                    content_type='multipart/form-data').close()
+        client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'c.pdf')},
+                    headers={'Cache-Control': 'no-cache'}, content_type='multipart/form-data').close()
+        assert stores == [artifact_store, None, None]
+
+    @patch('main.pdf_file_to_pptx')
+    def test_uploads_are_spooled_to_disk_with_their_page_selection(self, mock_convert):
+        received = []
+
+        def fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+            received.append((os.path.getsize(pdf_path), pages))
+            output_file.write(b"pptx bytes")
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+        # Over the former 16 MB limit
+        large = b"%PDF-1.5\n" + b"0" * (20 * 1024 * 1024)
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(large), 'big.pdf'), 'pages': '1-5'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        response.close()
+        assert received == [(len(large), [range(0, 5)])]
+        assert not [name for name in os.listdir(app.config['UPLOAD_FOLDER']) if name.startswith("temp_pdf_")]
+
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'a.pdf'), 'pages': '4-2'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+
+    @patch('main.pdf_file_to_pptx')
+    def test_selection_outside_the_document_is_a_client_error(self, mock_convert, temp_dir):
+        from synthetic_pdfs import write_synthetic_pdf
+
+        with open(write_synthetic_pdf(os.path.join(temp_dir, "one.pdf"), pages=1), "rb") as f:
+            pdf_bytes = f.read()
+        client = app.test_client()
+        for url in ('/convert', '/jobs'):
+            response = client.post(url, data={'pdf_file': (io.BytesIO(pdf_bytes), 'one.pdf'), 'pages': '50-60'},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 400
+            assert "No selected page is in the document (1 pages)" in response.get_json()['error']
+        mock_convert.assert_not_called()
+        assert not [name for name in os.listdir(app.config['UPLOAD_FOLDER']) if name.startswith("temp_pdf_")]
+
+    @patch('main.pdf_file_to_pptx')
+    def test_convert_accepts_a_list_of_themes(self, mock_convert):
+        def fake_convert(pdf_path, output_file, model_name, theme, progress_callback, pages=None, use_cache=True):
+            output_file.write(b"zip bytes")
+            return output_file
+
+        mock_convert.side_effect = fake_convert
+        client = app.test_client()
+
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'report.pdf'),
+                                                  'theme': 'default,minimal'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.mimetype == 'application/zip'
+        assert 'report-themes.zip' in response.headers['Content-Disposition']
+        assert mock_convert.call_args.kwargs['theme'] == ["default", "minimal"]
+        response.close()
+
+        response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'report.pdf'),
+                                                  'theme': 'default,neon'},
+                               content_type='multipart/form-data')
+        assert response.status_code == 400
+        assert "neon" in response.get_json()['error']
+
+    @patch('main.pdf_file_to_pptx')
+    def test_conversions_are_admitted_within_the_memory_budget(self, mock_convert):
+        from memory import MB, MemoryBudget
+
+        mock_convert.side_effect = lambda pdf_path, output_file, *args, **kwargs: output_file.write(b"pptx")
+        client = app.test_client()
+        budget = MemoryBudget(capacity=100 * MB, job_limit=50 * MB)
+        large = b"%PDF-1.5\n" + b"0" * (4 * MB)
+
+        with patch('main.memory_budget', budget), patch.dict(app.config, {'MEMORY_ADMISSION_TIMEOUT': 0.05}):
+            for url in ('/convert', '/jobs'):
+                response = client.post(url, data={'pdf_file': (io.BytesIO(large), 'big.pdf')},
+                                       content_type='multipart/form-data')
+                assert response.status_code == 413
+                assert "select fewer pages" in response.get_json()['error']
+
+            with budget.reserve(45 * MB), budget.reserve(45 * MB):
+                response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'a.pdf')},
+                                       content_type='multipart/form-data')
+                assert response.status_code == 429
+                assert response.headers['Retry-After'] == "1"
+
+            response = client.post('/convert', data={'pdf_file': (io.BytesIO(b"%PDF-1.5"), 'a.pdf')},
+                                   content_type='multipart/form-data')
+            assert response.status_code == 200
+            response.close()
+
+        mock_convert.assert_called_once()
+        assert budget.reserved == 0
+        assert not [name for name in os.listdir(app.config['UPLOAD_FOLDER']) if name.startswith("temp_pdf_")]
+
+    def test_models_lists_fast_mode(self):
+        models = app.test_client().get('/models').get_json()
+        assert {"id": "fast", "name": "Fast preview (no AI)"} in models
@@ -0,0 +1,86 @@
+# tests/test_memory.py
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from memory import MB, MemoryBudget, MemoryBudgetExceeded, StageMemory, estimate_job_memory, rss_bytes
+
+
+class TestMemory:
+
+    def test_stage_memory_reports_resident_and_traced_memory(self):
+        assert rss_bytes() > 0
+        assert "traced_peak_bytes" not in StageMemory().finish()
+
+        tracemalloc.start()
+        try:
+            memory = StageMemory()
+            block = bytearray(8 * MB)
+            del block
+            sample = memory.finish()
+        finally:
+            tracemalloc.stop()
+        assert sample["rss_bytes"] > 0
+        assert sample["traced_peak_bytes"] >= 8 * MB
+
+    def test_estimate_covers_only_the_selected_pages(self):
+        whole = estimate_job_memory(10 * MB, 1000)
+        selected = estimate_job_memory(10 * MB, 1000, selected_pages=20)
+
+        assert whole > estimate_job_memory(10 * MB, 100) > estimate_job_memory(1 * MB, 100)
+        assert selected < whole / 10
+        # A file that could not be read is estimated from its size
+        assert estimate_job_memory(10 * MB, 0) > estimate_job_memory(1 * MB, 0)
+
+    def test_budget_refuses_jobs_over_the_job_limit(self):
+        budget = MemoryBudget(capacity=100 * MB, job_limit=50 * MB)
+
+        with pytest.raises(MemoryBudgetExceeded) as error:
+            with budget.reserve(60 * MB):
+                pass
+        assert error.value.reason == "job_limit"
+        assert budget.reserved == 0
+
+    def test_budget_waits_for_room_and_times_out(self):
+        budget = MemoryBudget(capacity=100 * MB)
+
+        with budget.reserve(70 * MB):
+            with budget.reserve(30 * MB):
+                assert budget.reserved == 100 * MB
+            with pytest.raises(MemoryBudgetExceeded) as error:
+                with budget.reserve(40 * MB, timeout=0.05):
+                    pass
+            assert error.value.reason == "timeout"
+        assert budget.reserved == 0
+
+        # Larger than the whole budget: runs once nothing else does
+        with budget.reserve(150 * MB, timeout=0.05):
+            assert budget.reserved == 150 * MB
+
+    def test_budget_admits_waiting_jobs_in_arrival_order(self):
+        budget = MemoryBudget(capacity=100 * MB)
+        admitted = []
+        first = budget.reserve(80 * MB)
+        first.__enter__()
+
+        def convert(name, estimate):
+            with budget.reserve(estimate):
+                admitted.append(name)
+                time.sleep(0.01)
+
+        large = threading.Thread(target=convert, args=("large", 90 * MB))
+        large.start()
+        time.sleep(0.05)
+        # Fits next to the first job, but arrived after the large one
+        small = threading.Thread(target=convert, args=("small", 10 * MB))
+        small.start()
+        time.sleep(0.05)
+        assert admitted == []
+
+        first.__exit__(None, None, None)
+        large.join(timeout=5)
+        small.join(timeout=5)
+        assert admitted == ["large", "small"]
+        assert budget.reserved == 0
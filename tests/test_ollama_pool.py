@@ -0,0 +1,118 @@
+# tests/test_ollama_pool.py
+import socket
+
+import pytest
+
+from fake_ollama import FakeOllamaServer, LatencyModel
+from instrumentation import job_context
+from manageData import ModelSlots, OllamaProcessor, set_chat_backend
+from ollama_pool import OllamaPool
+
+FAST = LatencyModel(tokens_per_second=0, prompt_tokens_per_second=0)
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+def _dead_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.fixture
+def servers():
+    with FakeOllamaServer(latency=FAST, models=("llama3",)) as first, \
+            FakeOllamaServer(latency=FAST, models=("gemma3:12b",)) as second:
+        yield first, second
+
+
+class TestOllamaPool:
+
+    def test_probes_route_to_the_least_loaded_host_with_the_model(self, servers):
+        first, second = servers
+        pool = OllamaPool([first.url, second.url])
+        pool.probe_all()
+        pool.chat("gemma3:12b", MESSAGES, affinity_key="warmup")
+        pool.probe_all()
+        by_url = {host.url: host for host in pool.hosts}
+
+        assert by_url[second.url].loaded == {"gemma3:12b"}
+        # Only the first host has llama3 pulled, the second has gemma3 loaded since the warmup call
+        assert pool.choose("llama3") is by_url[first.url]
+        assert pool.choose("gemma3:12b") is by_url[second.url]
+
+        by_url[second.url].in_flight = 3
+        assert pool.choose("gemma3:12b") is by_url[second.url]
+        by_url[second.url].loaded = set()
+        by_url[first.url].available.add("gemma3:12b")
+        assert pool.choose("gemma3:12b") is by_url[first.url]
+
+    def test_connection_failure_is_retried_on_another_host(self, servers):
+        first, _ = servers
+        dead = _dead_url()
+        pool = OllamaPool([dead, first.url])
+        pool.hosts[1].in_flight = 5  # the dead host looks like the better pick
+
+        response = pool.chat("llama3", MESSAGES)
+
+        assert response["message"]["content"]
+        stats = {entry["url"]: entry for entry in pool.stats()}
+        assert stats[dead]["healthy"] is False and stats[dead]["failures"] == 1
+        assert stats[first.url]["calls"] == 1 and stats[first.url]["p50_seconds"] is not None
+        assert pool.choose("llama3").url == first.url
+
+        pool.hosts[1].healthy = False
+        with pytest.raises(ConnectionError):
+            OllamaPool([dead], max_attempts=2).chat("llama3", MESSAGES)
+
+    def test_stream_dropped_mid_answer_counts_as_a_failure(self):
+        class DroppingClient:
+            def chat(self, **kwargs):
+                yield {"message": {"content": "Partial"}}
+                raise ConnectionError("connection reset")
+
+        pool = OllamaPool(["http://gpu1:11434"], clients={"http://gpu1:11434": DroppingClient()})
+        with pytest.raises(ConnectionError):
+            list(pool.chat("llama3", MESSAGES, stream=True))
+
+        stats = pool.stats()[0]
+        assert stats["failures"] == 1 and stats["in_flight"] == 0
+        assert stats["healthy"] is False and stats["p50_seconds"] is None
+
+    def test_in_flight_limit_scales_with_healthy_hosts(self, servers):
+        first, _ = servers
+        slots = ModelSlots(default_limit=4)
+        pool = OllamaPool([first.url, _dead_url()], slots=slots, per_host_limit=4)
+        assert slots.limit("llama3") == 8
+
+        pool.probe_all()
+        assert slots.limit("llama3") == 4
+
+    def test_calls_of_one_document_stay_on_one_host(self, servers):
+        first, second = servers
+        pool = OllamaPool([first.url, second.url])
+        hosts = []
+        with job_context("document-a"):
+            for _ in range(3):
+                host = pool.choose("llama3", "document-a")
+                hosts.append(host)
+                host.in_flight += 1  # busier than the other host, but warm
+
+        assert len(set(hosts)) == 1
+        assert pool.choose("llama3", "document-b") is not hosts[0]
+
+    def test_processor_streams_through_the_pool(self, servers):
+        first, second = servers
+        pool = OllamaPool([first.url, second.url])
+        events = []
+        set_chat_backend(pool)
+        try:
+            with job_context("streamed"):
+                result = OllamaProcessor(progress_callback=lambda event, data: events.append(event)) \
+                    .clean_and_structure_text("Mount the bracket.")
+        finally:
+            set_chat_backend(None)
+
+        assert "Mount the bracket." in result
+        assert events[-1] == "llm_finished"
+        assert sum(entry["calls"] for entry in pool.stats()) == 1
+        assert all(entry["in_flight"] == 0 for entry in pool.stats())
@@ -1,7 +1,15 @@
 # tests/test_ollama_processor.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, MagicMock
 
-from manageData import OllamaProcessor
+import ollama
+import pytest
+
+from fake_ollama import FakeOllamaServer, LatencyModel
+from manageData import MODEL_SLOTS, Deadline, DeadlineExceeded, ModelSlots, OllamaProcessor, scheduling_context, \
+    set_chat_backend
 
 
 class TestOllamaProcessor:
@@ -63,4 +71,199 @@ class TestOllamaProcessor:
         assert "sections" in result
         assert result["sections"][0]["has_images"] is True
         assert "image_info" in result["sections"][0]
-        assert result["sections"][0]["image_info"]["relevant_images"] == [0]
\ No newline at end of file
+        assert result["sections"][0]["image_info"]["relevant_images"] == [0]
+
+    @patch('manageData.ollama.chat')
+    def test_progress_callback_streams_tokens(self, mock_ollama_chat):
+        chunks = [{'message': {'content': 'word '}, 'done': False} for _ in range(40)]
+        chunks.append({'message': {'content': ''}, 'done': True, 'eval_count': 41})
+        mock_ollama_chat.return_value = iter(chunks)
+
+        events = []
+        processor = OllamaProcessor(progress_callback=lambda event, data: events.append((event, data)))
+        result = processor.clean_and_structure_text("Original text")
+
+        assert mock_ollama_chat.call_args[1]['stream'] is True
+        assert result == 'word ' * 40
+        names = [event for event, _ in events]
+        assert names[0] == "llm_started"
+        assert names.count("llm_progress") == 2
+        assert events[-1] == ("llm_finished", {"call": "clean", "tokens": 41, "seconds": events[-1][1]["seconds"]})
+
+    @patch('manageData.ollama.chat')
+    def test_condense_section_sends_only_the_section(self, mock_ollama_chat):
+        mock_ollama_chat.return_value = {'message': {'content': 'Points:\n["Mount the bracket", "Tighten the bolts",]'}}
+
+        processor = OllamaProcessor()
+        result = processor.condense_section("4 Mounting", "Mount the bracket. Then tighten the bolts.")
+
+        prompt = mock_ollama_chat.call_args[1]['messages'][0]['content']
+        assert "4 Mounting" in prompt and "tighten the bolts" in prompt
+        assert result == ["Mount the bracket", "Tighten the bolts"]
+
+    @patch('manageData.ollama.chat')
+    def test_condense_section_reads_plain_bullets_and_survives_errors(self, mock_ollama_chat):
+        mock_ollama_chat.return_value = {'message': {'content': '- First step\n2. Second step\nThanks!'}}
+        assert OllamaProcessor().condense_section("Steps", "text") == ["First step", "Second step"]
+
+        mock_ollama_chat.side_effect = RuntimeError("connection refused")
+        assert OllamaProcessor().condense_section("Steps", "text") == []
+
+    @patch('manageData.ollama.chat')
+    def test_stuck_call_is_cancelled_at_the_deadline(self, mock_ollama_chat):
+        release = threading.Event()
+        closed = threading.Event()
+
+        def stuck_stream(**kwargs):
+            try:
+                yield {'message': {'content': 'Partial'}, 'done': False}
+                release.wait(5)
+                yield {'message': {'content': ' text'}, 'done': False}
+            finally:
+                closed.set()
+
+        mock_ollama_chat.side_effect = stuck_stream
+        deadline = Deadline(0.2)
+        with scheduling_context(deadline=deadline):
+            result = OllamaProcessor().clean_and_structure_text("Raw text")
+
+        # The raw text comes back while the stream is still stuck instead of after its answer
+        assert result == "Raw text"
+        assert not closed.is_set()
+        assert deadline.cancelled == ["clean"]
+        release.set()
+        assert closed.wait(2)
+
+    @patch('manageData.ollama.chat')
+    def test_cancelled_call_keeps_its_slot_until_the_stream_closes(self, mock_ollama_chat):
+        release = threading.Event()
+        closed = threading.Event()
+
+        def stuck_stream(**kwargs):
+            try:
+                yield {'message': {'content': 'Partial'}, 'done': False}
+                release.wait(5)
+                yield {'message': {'content': ' text'}, 'done': False}
+            finally:
+                closed.set()
+
+        mock_ollama_chat.side_effect = stuck_stream
+        MODEL_SLOTS.set_limit(1, model="stuck")
+        with scheduling_context(deadline=Deadline(0.1)):
+            assert OllamaProcessor(model_name="stuck").clean_and_structure_text("Raw text") == "Raw text"
+
+        # Ollama is still generating the cancelled answer
+        with pytest.raises(DeadlineExceeded):
+            with MODEL_SLOTS.slot("stuck", timeout=0.1):
+                pass
+        release.set()
+        assert closed.wait(2)
+        with MODEL_SLOTS.slot("stuck", timeout=2):
+            pass
+
+    def test_call_hung_before_its_first_chunk_gives_its_slot_back(self):
+        # The stand-in sends nothing, not even the headers, for longer than the test runs
+        hung = LatencyModel(tokens_per_second=0, prompt_tokens_per_second=0, load_seconds=30)
+        MODEL_SLOTS.set_limit(1, model="llama3.2:1b")
+        with FakeOllamaServer(latency=hung, models=("llama3.2:1b",)) as server, \
+                patch.object(OllamaProcessor, "CANCEL_GRACE_SECONDS", 0.2):
+            set_chat_backend(ollama.Client(host=server.url))
+            try:
+                with scheduling_context(deadline=Deadline(0.1)):
+                    assert OllamaProcessor(model_name="llama3.2:1b").clean_and_structure_text("Raw") == "Raw"
+                with MODEL_SLOTS.slot("llama3.2:1b", timeout=5):
+                    pass
+            finally:
+                set_chat_backend(None)
+
+    @patch('manageData.ollama.chat')
+    def test_no_call_is_sent_after_the_deadline(self, mock_ollama_chat):
+        deadline = Deadline(0)
+        with scheduling_context(deadline=deadline):
+            assert OllamaProcessor().condense_section("Steps", "text") == []
+        mock_ollama_chat.assert_not_called()
+        assert deadline.cancelled == ["condense"]
+
+
+class TestModelSlots:
+
+    def test_limits_calls_in_flight_per_model(self):
+        slots = ModelSlots(default_limit=2)
+        slots.set_limit(1, model="small")
+        in_flight = {"big": 0, "small": 0}
+        peak = {"big": 0, "small": 0}
+        lock = threading.Lock()
+
+        def call(model):
+            with slots.slot(model):
+                with lock:
+                    in_flight[model] += 1
+                    peak[model] = max(peak[model], in_flight[model])
+                time.sleep(0.02)
+                with lock:
+                    in_flight[model] -= 1
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(call, ["big"] * 6 + ["small"] * 4))
+
+        assert peak == {"big": 2, "small": 1}
+        assert slots.limit("big") == 2 and slots.limit("small") == 1
+
+    def test_waiting_for_a_slot_gives_up_at_the_timeout(self):
+        slots = ModelSlots(default_limit=1)
+        with slots.slot("m"):
+            with pytest.raises(DeadlineExceeded):
+                with slots.slot("m", timeout=0.05):
+                    pass
+            assert slots._queues["m"].waiting == []
+        # The slot is free again once its holder leaves
+        with slots.slot("m", timeout=0.05):
+            pass
+
+    def _serve_in_order(self, slots, calls, gap=0.0):
+        """Holds the only slot while `calls` (model, cost, tenant) queue up in order, then returns the grant order."""
+        order = []
+        threads = []
+        with slots.slot("m"):
+            for name, cost, tenant in calls:
+                def call(name=name, cost=cost, tenant=tenant):
+                    with slots.slot("m", cost=cost, tenant=tenant):
+                        order.append(name)
+
+                threads.append(threading.Thread(target=call))
+                threads[-1].start()
+                while len(slots._queues["m"].waiting) < len(threads):
+                    time.sleep(0.001)
+                time.sleep(gap)
+        for thread in threads:
+            thread.join()
+        return order
+
+    def test_freed_slot_goes_to_the_smallest_job(self):
+        slots = ModelSlots(default_limit=1, aging_rate=0)
+        order = self._serve_in_order(slots, [("manual", 900_000, None), ("memo", 4_000, None),
+                                             ("report", 60_000, None)])
+        assert order == ["memo", "report", "manual"]
+
+    def test_waiting_ages_large_jobs_ahead_of_new_small_ones(self):
+        slots = ModelSlots(default_limit=1, aging_rate=1e9)
+        # At a billion characters per second, 10 ms of waiting outweighs the size difference
+        order = self._serve_in_order(slots, [("manual", 900_000, None), ("memo", 4_000, None)], gap=0.01)
+        assert order == ["manual", "memo"]
+
+    def test_tenant_weights_scale_job_size(self):
+        slots = ModelSlots(default_limit=1, aging_rate=0)
+        slots.set_weight("premium", 10)
+        order = self._serve_in_order(slots, [("free", 50_000, "free"), ("paid", 200_000, "premium")])
+        assert order == ["paid", "free"]
+
+    @patch('manageData.ollama.chat', return_value={'message': {'content': 'text'}})
+    def test_calls_are_scheduled_by_job_size_or_prompt_size(self, mock_ollama_chat):
+        with patch.object(MODEL_SLOTS, 'slot', wraps=MODEL_SLOTS.slot) as slot:
+            OllamaProcessor().clean_and_structure_text("short text")
+            with scheduling_context(cost=123_456, tenant="acme"):
+                OllamaProcessor().clean_and_structure_text("short text")
+
+        prompt_cost = slot.call_args_list[0][1]["cost"]
+        assert 0 < prompt_cost < 10_000
+        assert slot.call_args_list[1][1]["cost"] == 123_456
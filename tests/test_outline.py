@@ -0,0 +1,61 @@
+# tests/test_outline.py
+import fitz
+
+from outline import OutlineExtractor, extract_skeleton
+
+
+def write_pdf(path, pages, toc=None):
+    """pages: list of pages, each a list of (text, size, bold) lines."""
+    document = fitz.open()
+    for lines in pages:
+        page = document.new_page()
+        y = 72
+        for text, size, bold in lines:
+            page.insert_text((72, y), text, fontsize=size, fontname="hebo" if bold else "helv")
+            y += size * 2
+    if toc:
+        document.set_toc(toc)
+    document.save(path)
+    document.close()
+    return str(path)
+
+
+class TestOutlineExtractor:
+
+    def test_outline_gives_titles_text_and_page_spans(self, tmp_path):
+        pdf_path = write_pdf(tmp_path / "outline.pdf", [
+            [("Introduction", 11, False), ("The system moves containers.", 11, False)],
+            [("Installation", 11, False), ("Mount the bracket first.", 11, False)],
+            [("Tighten every bolt afterwards.", 11, False)],
+        ], toc=[[1, "Introduction", 1], [2, "Hidden detail", 1], [1, "Installation", 2]])
+
+        skeleton = OutlineExtractor(max_level=1).extract(pdf_path)
+
+        assert skeleton["source"] == "outline"
+        assert [section["title"] for section in skeleton["sections"]] == ["Introduction", "Installation"]
+        assert skeleton["sections"][0]["text"] == "The system moves containers."
+        assert "Tighten every bolt" in skeleton["sections"][1]["text"]
+        assert [(s["page_start"], s["page_end"]) for s in skeleton["sections"]] == [(0, 0), (1, 2)]
+
+    def test_font_sizes_give_title_levels_and_sections(self, tmp_path):
+        body = [("Body text of the paragraph goes on for a while here.", 10, False)] * 4
+        pdf_path = write_pdf(tmp_path / "fonts.pdf", [
+            [("Installation Manual", 24, False), ("1 Overview", 16, False)] + body +
+            [("1.1 Scope", 13, False)] + body,
+            [("Table of Contents", 16, False)] + body[:1] +
+            [("2 Mounting", 16, False), ("Note:", 10, True)] + body,
+        ])
+
+        skeleton = extract_skeleton(pdf_path)
+
+        assert skeleton["source"] == "fonts"
+        assert skeleton["title"] == "Installation Manual"
+        titles = [(section["title"], section["level"]) for section in skeleton["sections"]]
+        # Bold words at body size inside the text are not headings, the document's contents list is dropped
+        assert titles == [("1 Overview", 1), ("1.1 Scope", 2), ("2 Mounting", 1)]
+        assert skeleton["sections"][2]["page_start"] == 1
+        assert "Note:" in skeleton["sections"][2]["text"]
+
+    def test_uniform_text_has_no_skeleton(self, tmp_path):
+        pdf_path = write_pdf(tmp_path / "plain.pdf", [[("Just one size of text on this page.", 11, False)] * 5])
+        assert extract_skeleton(pdf_path) is None
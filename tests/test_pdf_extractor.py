@@ -4,6 +4,7 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 from readPDF import PdfExtractor
+from synthetic_pdfs import write_synthetic_pdf
 
 
 class TestPdfExtractor:
@@ -91,4 +92,27 @@ class TestPdfExtractor:
         with patch('readPDF.PdfExtractor.extract_with_pypdf2', return_value="Extracted text"):
             with patch('readPDF.PdfExtractor.extract_with_pdfminer', return_value=None):
                 result = PdfExtractor.extract_text(sample_pdf_path)
-                assert result == "Extracted text"
\ No newline at end of file
+                assert result == "Extracted text"
+
+    def test_page_hashes_change_only_for_edited_pages(self, tmp_path):
+        import fitz
+
+        original = write_synthetic_pdf(str(tmp_path / "a.pdf"), pages=4)
+        with fitz.open(original) as document:
+            document[2].insert_text((60, 760), "Revision B")
+            document.save(str(tmp_path / "b.pdf"))
+
+        before = PdfExtractor.page_hashes(original)
+        after = PdfExtractor.page_hashes(str(tmp_path / "b.pdf"))
+        assert len(set(before)) == 4
+        assert [old == new for old, new in zip(before, after)] == [True, True, False, True]
+        # Only the selected pages are read
+        assert PdfExtractor.page_hashes(original, pages=[1, 3]) == [None, before[1], None, before[3]]
+
+    def test_text_from_pages_matches_whole_document_extraction(self, tmp_path):
+        pdf_path = write_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=3)
+        # Pages can be read in any order and in several calls
+        pages = {**PdfExtractor.extract_pages(pdf_path, [2]), **PdfExtractor.extract_pages(pdf_path, [0, 1])}
+
+        assert PdfExtractor.extract_text_from_pages([pages[0], pages[1], pages[2]]) == \
+            PdfExtractor.extract_text(pdf_path)
@@ -0,0 +1,509 @@
+# tests/test_pipeline.py
+import io
+import os
+import threading
+import zipfile
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+from artifact_store import ArtifactStore
+from readPDF import PdfExtractor
+from manageData import MODEL_SLOTS, Deadline, job_cost_var
+from pipeline import cleanup_image_files, pdf_to_pptx_with_ollama, normalize_document_structure, \
+    create_fallback_structure, ConversionPipeline, parse_pages, select_pages
+
+
+class TestConversionPipeline:
+
+    @patch('pipeline.OllamaProcessor')
+    @patch('pipeline.PdfExtractor')
+    @patch('pipeline.PdfToPptxConverter')
+    @patch('image_extractor.ImageExtractor.extract_images_from_pdf')
+    def test_pdf_to_pptx_with_ollama(self, mock_extract_images, mock_converter_class,
+                                     mock_extractor_class, mock_processor_class, sample_pdf_path, temp_dir):
+        # Configure mocks
+        mock_extractor = MagicMock()
+        mock_extractor.extract_text.return_value = "Extracted text from PDF"
+        mock_extractor.extract_page_texts.return_value = ["Section 1\nContent 1"]
+        mock_extractor_class.return_value = mock_extractor
+
+        mock_processor = MagicMock()
+        mock_processor.clean_and_structure_text.return_value = "Cleaned text"
+        mock_processor.analyze_document_structure.return_value = {
+            "title": "Document",
+            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
+        }
+        mock_processor.associate_images.side_effect = lambda structure, text, images: structure
+        mock_processor_class.return_value = mock_processor
+
+        mock_converter = MagicMock()
+        mock_converter_class.return_value = mock_converter
+
+        mock_extract_images.return_value = [{"path": "image1.jpg", "page_num": 0}]
+
+        # Execute the function
+        output_file = os.path.join(temp_dir, "output.pptx")
+        result = pdf_to_pptx_with_ollama(pdf_path=sample_pdf_path, output_file=output_file)
+
+        # Assertions
+        assert result == output_file
+        mock_extractor.extract_text.assert_called_once_with(sample_pdf_path)
+        mock_processor.clean_and_structure_text.assert_called_once()
+        mock_processor.analyze_document_structure.assert_called_once()
+        # Images are associated locally by default, without a model call
+        mock_processor.associate_images.assert_not_called()
+        mock_converter.create_presentation.assert_called_once()
+
+        # The image on the section's page was assigned to it
+        rendered_structure = mock_converter.create_presentation.call_args[0][0]
+        assert rendered_structure["sections"][0]["image_info"]["relevant_images"] == [0]
+
+    @patch('pipeline.OllamaProcessor')
+    def test_associate_engine_selection(self, mock_processor_class):
+        structure = {"title": "Document", "sections": [
+            {"title": "Architecture", "content": ["The system layout is shown in Figure 2"]},
+            {"title": "Costs", "content": ["Budget and spending"]},
+        ]}
+        image_data = [{"path": "a.png", "page_num": 0, "caption": "Figure 2: System architecture",
+                       "context": "Figure 2: System architecture overview"}]
+
+        local = ConversionPipeline().associate(structure, "text", image_data)
+        assert local["sections"][0]["image_info"]["relevant_images"] == [0]
+        assert local["sections"][1]["has_images"] is False
+        mock_processor_class.return_value.associate_images.assert_not_called()
+
+        mock_processor_class.return_value.associate_images.side_effect = lambda s, text, images: s
+        ConversionPipeline(image_association="llm").associate(structure, "text", image_data)
+        mock_processor_class.return_value.associate_images.assert_called_once()
+
+    @patch('pipeline.OllamaProcessor')
+    @patch('pipeline.PdfExtractor')
+    @patch('pipeline.PdfToPptxConverter')
+    @patch('image_extractor.ImageExtractor.extract_images_from_pdf')
+    def test_pipeline_resumes_from_artifact_store(self, mock_extract_images, mock_converter_class,
+                                                  mock_extractor_class, mock_processor_class, temp_dir):
+        pdf_path = os.path.join(temp_dir, "doc.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(b"%PDF-1.5 fake content")
+
+        mock_extractor_class.return_value.extract_text.return_value = "Extracted text from PDF"
+        mock_extract_images.return_value = []
+
+        mock_processor = MagicMock()
+        mock_processor.clean_and_structure_text.return_value = "Cleaned text"
+        mock_processor.analyze_document_structure.return_value = {
+            "title": "Document",
+            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
+        }
+        mock_processor_class.return_value = mock_processor
+
+        # First run fails while rendering, after every LLM stage succeeded
+        mock_converter_class.return_value.create_presentation.side_effect = RuntimeError("disk full")
+        store = ArtifactStore(os.path.join(temp_dir, "artifacts"))
+        with pytest.raises(ValueError):
+            pdf_to_pptx_with_ollama(pdf_path=pdf_path, output_file=os.path.join(temp_dir, "out.pptx"),
+                                    artifact_store=store)
+
+        # Re-run with another theme resumes from the stored stages
+        mock_converter_class.return_value.create_presentation.side_effect = None
+        pipeline = ConversionPipeline(theme="minimal", artifact_store=store)
+        pipeline.run(pdf_path=pdf_path, output_file=os.path.join(temp_dir, "out.pptx"))
+
+        assert mock_extractor_class.return_value.extract_text.call_count == 1
+        assert mock_processor.clean_and_structure_text.call_count == 1
+        assert mock_processor.analyze_document_structure.call_count == 1
+        assert pipeline.stage_sources["clean"] == "cache"
+        assert pipeline.stage_sources["analyze"] == "cache"
+        assert pipeline.stage_sources["render"] == "computed"
+
+    @patch('pipeline.OllamaProcessor')
+    @patch('pipeline.PdfExtractor')
+    @patch('pipeline.PdfToPptxConverter')
+    @patch('image_extractor.ImageExtractor.extract_images_from_pdf')
+    def test_pipeline_overlaps_image_extraction_with_cleaning(self, mock_extract_images, mock_converter_class,
+                                                             mock_extractor_class, mock_processor_class,
+                                                             temp_dir):
+        # Each side waits for the other to be running; without the overlap the barrier breaks
+        together = threading.Barrier(2, timeout=5)
+        met = []
+
+        def slow_images(pdf_path, output_folder=None):
+            together.wait()
+            met.append("extract_images")
+            return []
+
+        def slow_clean(text):
+            together.wait()
+            met.append("clean")
+            return "Cleaned text"
+
+        mock_extractor_class.return_value.extract_text.return_value = "Extracted text from PDF"
+        mock_extract_images.side_effect = slow_images
+        mock_processor = MagicMock()
+        mock_processor.clean_and_structure_text.side_effect = slow_clean
+        mock_processor.analyze_document_structure.return_value = {
+            "title": "Document",
+            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
+        }
+        mock_processor_class.return_value = mock_processor
+
+        pipeline = ConversionPipeline()
+        pipeline.run(pdf_path="doc.pdf", output_file=os.path.join(temp_dir, "out.pptx"))
+
+        assert sorted(met) == ["clean", "extract_images"]
+        assert pipeline.image_overlap > 0
+
+    @patch('pipeline.OllamaProcessor')
+    def test_pipeline_analyze_falls_back_without_discarding_cleaned_text(self, mock_processor_class):
+        mock_processor = MagicMock()
+        mock_processor.analyze_document_structure.side_effect = RuntimeError("model crashed")
+        mock_processor_class.return_value = mock_processor
+
+        pipeline = ConversionPipeline()
+        text = "INTRODUCTION TO THE SYSTEM\nThis paragraph explains the system in detail."
+        structure = pipeline.analyze("Cleaned text", "Doc", text)
+
+        assert pipeline.stage_sources["analyze"] == "fallback"
+        assert structure["title"] == "Doc"
+
+    @patch('pipeline.OllamaProcessor')
+    @patch('pipeline.PdfExtractor')
+    @patch('pipeline.PdfToPptxConverter')
+    @patch('image_extractor.ImageExtractor.extract_images_from_pdf')
+    @patch('pipeline.extract_skeleton')
+    def test_pipeline_condenses_sections_of_the_outline(self, mock_skeleton, mock_extract_images,
+                                                        mock_converter_class, mock_extractor_class,
+                                                        mock_processor_class, temp_dir):
+        mock_extractor_class.return_value.extract_text.return_value = "Extracted text from PDF"
+        mock_extract_images.return_value = [{"path": "a.png", "page_num": 3, "width": 10, "height": 10}]
+        mock_skeleton.return_value = {"source": "outline", "title": "Manual", "sections": [
+            {"title": "Overview", "level": 1, "text": "The system moves containers.", "page_start": 0, "page_end": 2},
+            {"title": "Mounting", "level": 1, "text": "Mount the bracket. Tighten the bolts.",
+             "page_start": 3, "page_end": 4},
+        ]}
+        mock_processor = MagicMock()
+        mock_processor.condense_section.side_effect = \
+            lambda title, text: ["Moves containers"] if title == "Overview" else []
+        mock_processor_class.return_value = mock_processor
+
+        pipeline = ConversionPipeline()
+        pipeline.run(pdf_path="doc.pdf", output_file=os.path.join(temp_dir, "out.pptx"))
+
+        mock_processor.clean_and_structure_text.assert_not_called()
+        mock_processor.analyze_document_structure.assert_not_called()
+        assert sorted(c.args[0] for c in mock_processor.condense_section.call_args_list) == ["Mounting", "Overview"]
+
+        structure = mock_converter_class.return_value.create_presentation.call_args[0][0]
+        assert structure["title"] == "Manual"
+        assert structure["sections"][0]["content"] == ["Moves containers"]
+        # An empty model answer falls back to the heuristic bullets of that section only
+        assert structure["sections"][1]["content"] == ["Mount the bracket."]
+        assert pipeline.stage_sources["analyze"] == "fallback"
+        # The outline's page spans place the image without looking the sections up in the text
+        assert structure["sections"][1]["image_info"]["relevant_images"] == [0]
+        mock_extractor_class.return_value.extract_page_texts.assert_not_called()
+
+    @patch('pipeline.OllamaProcessor')
+    def test_condense_sends_sections_concurrently_within_model_limit(self, mock_processor_class):
+        # Every section has to be in flight at once to get past the barrier
+        all_in_flight = threading.Barrier(4, timeout=5)
+
+        def condense_section(title, text):
+            all_in_flight.wait()
+            return [f"{title} point"]
+
+        mock_processor_class.return_value.condense_section.side_effect = condense_section
+        skeleton = {"source": "fonts", "title": None, "sections": [
+            {"title": f"Section {i}", "level": 1, "text": "Some text.", "page_start": i, "page_end": i}
+            for i in range(4)]}
+
+        pipeline = ConversionPipeline(model_name="parallel-model")
+        with patch.object(MODEL_SLOTS, "limit", return_value=4):
+            structure = pipeline.condense(skeleton, "Doc")
+
+        assert not all_in_flight.broken
+        assert structure["title"] == "Doc"
+        assert [section["content"] for section in structure["sections"]] == \
+            [[f"Section {i} point"] for i in range(4)]
+        assert [section["page_start"] for section in structure["sections"]] == [0, 1, 2, 3]
+
+    def test_normalize_document_structure(self):
+        # Case 1: Structure is already a valid dictionary
+        valid_structure = {
+            "title": "Document",
+            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
+        }
+        result = normalize_document_structure(valid_structure, "Document Name", "Original text")
+        assert result["title"] == "Document"
+        assert len(result["sections"]) == 1
+
+        # Case 2: Structure is a valid JSON string
+        json_structure = '{"title": "JSON Document", "sections": [{"title": "JSON Section", "content": ["Item 1"]}]}'
+        result = normalize_document_structure(json_structure, "Document Name", "Original text")
+        assert result["title"] == "JSON Document"
+
+        # Case 3: Invalid structure, fallback created
+        with patch('pipeline.create_fallback_structure') as mock_fallback:
+            mock_fallback.return_value = {"title": "Fallback", "sections": []}
+            result = normalize_document_structure(None, "Document Name", "Original text")
+            mock_fallback.assert_called_once()
+            assert result["title"] == "Fallback"
+
+    def test_create_fallback_structure(self):
+        text = "# Title 1\nContent of title 1\n\n# Title 2\nContent of title 2"
+        document_name = "Test Document"
+
+        result = create_fallback_structure(text, document_name)
+
+        assert result["title"] == document_name
+        assert len(result["sections"]) > 0
+
+    @patch('pipeline.OllamaProcessor')
+    def test_pipeline_degrades_when_the_budget_runs_low(self, mock_processor_class):
+        text = "INTRODUCTION TO THE SYSTEM\nThis paragraph explains the system in detail."
+        events = []
+        # Less than the time kept for rendering: no model call is worth starting
+        pipeline = ConversionPipeline(deadline=Deadline(1.0), progress_callback=lambda e, d: events.append((e, d)))
+
+        cleaned_text, structure = pipeline.structure(text, "Doc")
+
+        assert cleaned_text == text
+        assert structure["title"] == "Doc"
+        assert [(d["stage"], d["action"]) for d in pipeline.degradations] == [("clean", "skipped"),
+                                                                             ("analyze", "heuristic")]
+        assert pipeline.stage_sources == {"clean": "fallback", "analyze": "fallback"}
+        assert [d for e, d in events if e == "stage_degraded"] == pipeline.degradations
+        mock_processor_class.return_value.clean_and_structure_text.assert_not_called()
+        mock_processor_class.return_value.analyze_document_structure.assert_not_called()
+
+        # Without a deadline the model does the work
+        pipeline = ConversionPipeline()
+        mock_processor_class.return_value.clean_and_structure_text.return_value = text
+        mock_processor_class.return_value.analyze_document_structure.return_value = {
+            "title": "Doc", "sections": [{"title": "A", "content": ["Point"]}]}
+        pipeline.structure(text, "Doc")
+        assert pipeline.degradations == []
+
+    @patch('pipeline.OllamaProcessor')
+    def test_default_budget_does_not_skip_cleaning_on_a_guessed_rate(self, mock_processor_class):
+        # At the default rate of 100 chars/s this text takes longer than the budget
+        text = "The system explains latency in detail. " * 2000
+        mock_processor_class.return_value.clean_and_structure_text.return_value = text
+        mock_processor_class.return_value.analyze_document_structure.return_value = {
+            "title": "Doc", "sections": [{"title": "A", "content": ["Point"]}]}
+
+        pipeline = ConversionPipeline(model_name="unmeasured", deadline=Deadline(600, requested=False))
+        pipeline.structure(text, "Doc")
+        assert pipeline.degradations == []
+
+        # A budget the client asked for is held to the estimate
+        pipeline = ConversionPipeline(model_name="unmeasured", deadline=Deadline(600))
+        pipeline.structure(text, "Doc")
+        assert ("clean", "skipped") in [(d["stage"], d["action"]) for d in pipeline.degradations]
+
+    @patch('pipeline.OllamaProcessor')
+    def test_speculative_deck_is_served_when_the_model_fails(self, mock_processor_class):
+        text = "INTRODUCTION TO THE SYSTEM\nThis paragraph explains the system in detail.\n\n" \
+               "INSTALLATION\nMount the bracket and tighten every screw before connecting power."
+        mock_processor = mock_processor_class.return_value
+        mock_processor.clean_and_structure_text.side_effect = lambda cleaned: cleaned
+        mock_processor.analyze_document_structure.side_effect = RuntimeError("model crashed")
+
+        pipeline = ConversionPipeline(speculative=True)
+        output = io.BytesIO()
+        with patch.object(ConversionPipeline, 'render') as mock_render:
+            pipeline.run(pdf_text=text, output_file=output)
+
+        # The heuristic deck rendered alongside is served, nothing is rendered after the failure
+        mock_render.assert_not_called()
+        assert output.getvalue().startswith(b"PK")
+        assert [(d["stage"], d["action"]) for d in pipeline.degradations] == [("render", "speculative")]
+
+        # A structure from the model discards the heuristic deck
+        mock_processor.analyze_document_structure.side_effect = None
+        mock_processor.analyze_document_structure.return_value = {
+            "title": "Doc", "sections": [{"title": "A", "content": ["Point"]}]}
+        pipeline = ConversionPipeline(speculative=True)
+        with patch.object(ConversionPipeline, 'speculate', return_value=io.BytesIO(b"heuristic")), \
+                patch.object(ConversionPipeline, 'render') as mock_render:
+            pipeline.run(pdf_text=text, output_file=io.BytesIO())
+        mock_render.assert_called_once()
+        assert pipeline.degradations == []
+
+    @patch('pipeline.OllamaProcessor')
+    def test_model_deck_does_not_wait_for_the_speculative_one(self, mock_processor_class):
+        text = "INTRODUCTION TO THE SYSTEM\nThis paragraph explains the system in detail."
+        speculating, release, finished = threading.Event(), threading.Event(), threading.Event()
+        events = []
+
+        def slow_speculate(pipeline, text, document_name, skeleton, image_future, abandoned):
+            speculating.set()
+            release.wait(5)
+            events.append(("speculative deck", abandoned.is_set()))
+            finished.set()
+            return io.BytesIO(b"heuristic")
+
+        mock_processor = mock_processor_class.return_value
+        # The model answers while the heuristic deck is being rendered
+        mock_processor.clean_and_structure_text.side_effect = lambda cleaned: speculating.wait(5) and cleaned
+        mock_processor.analyze_document_structure.return_value = {
+            "title": "Doc", "sections": [{"title": "A", "content": ["Point"]}]}
+        with patch.object(ConversionPipeline, 'speculate', slow_speculate), \
+                patch.object(ConversionPipeline, 'render', side_effect=lambda *args: events.append("model deck")):
+            pipeline = ConversionPipeline(speculative=True)
+            pipeline.run(pdf_text=text, output_file=io.BytesIO())
+            events.append("returned")
+            release.set()
+            assert finished.wait(5)
+
+        assert events == ["model deck", "returned", ("speculative deck", True)]
+        assert pipeline.degradations == []
+
+    @patch('pipeline.OllamaProcessor')
+    def test_speculative_deck_replaces_a_crashed_pipeline(self, mock_processor_class):
+        text = "INTRODUCTION TO THE SYSTEM\nThis paragraph explains the system in detail."
+        output = io.BytesIO()
+        with patch.object(ConversionPipeline, 'structure', side_effect=RuntimeError("connection reset")), \
+                patch.object(ConversionPipeline, 'speculate', return_value=io.BytesIO(b"heuristic deck")):
+            pipeline = ConversionPipeline(speculative=True)
+            pipeline.run(pdf_text=text, output_file=output)
+        assert output.getvalue() == b"heuristic deck"
+        assert "connection reset" in pipeline.degradations[0]["reason"]
+
+        with patch.object(ConversionPipeline, 'structure', side_effect=RuntimeError("connection reset")):
+            with pytest.raises(RuntimeError):
+                ConversionPipeline().run(pdf_text=text, output_file=io.BytesIO())
+
+    @patch('pipeline.OllamaProcessor')
+    def test_revision_reuses_unchanged_pages_and_sections(self, mock_processor_class, temp_dir):
+        import fitz
+        from synthetic_pdfs import write_synthetic_pdf
+
+        mock_processor = mock_processor_class.return_value
+        mock_processor.condense_section.side_effect = lambda title, text: [f"Summary of {title}"]
+        first = write_synthetic_pdf(os.path.join(temp_dir, "rev_a.pdf"), pages=6, seed=3)
+        second = os.path.join(temp_dir, "rev_b.pdf")
+        with fitz.open(first) as document:
+            document[4].insert_text((60, 770), "Revision B: tighten to 12 Nm")
+            document.save(second)
+
+        store = ArtifactStore(os.path.join(temp_dir, "artifacts"))
+        ConversionPipeline(artifact_store=store).run(pdf_path=first, output_file=os.path.join(temp_dir, "a.pptx"))
+        sections = mock_processor.condense_section.call_count
+        mock_processor.condense_section.reset_mock()
+
+        reused = {}
+        pipeline = ConversionPipeline(artifact_store=store,
+                                      progress_callback=lambda event, data: reused.update(
+                                          {data["kind"]: data["reused"]}) if event == "pieces_reused" else None)
+        with patch('pipeline.PdfExtractor.extract_pages', wraps=PdfExtractor.extract_pages) as extract_pages:
+            pipeline.run(pdf_path=second, output_file=os.path.join(temp_dir, "b.pptx"))
+
+        extract_pages.assert_called_once_with(second, [4])
+        assert reused["page_text"] == 5
+        # Only the sections on the edited page are condensed again
+        assert 0 < mock_processor.condense_section.call_count < sections
+        assert reused["section_bullets"] == sections - mock_processor.condense_section.call_count
+        assert os.path.exists(os.path.join(temp_dir, "b.pptx"))
+
+    def test_page_selection(self):
+        assert parse_pages("") is None and parse_pages("all") is None
+        assert parse_pages(" Sampled ") == "sampled"
+        assert select_pages(parse_pages("2-3, 7,40-"), 42, 20) == [1, 2, 6, 39, 40, 41]
+        for value in ("0-2", "5-3", "x", "1-y"):
+            with pytest.raises(ValueError):
+                parse_pages(value)
+        with pytest.raises(ValueError):
+            select_pages(parse_pages("50-60"), 42, 20)
+
+        sample = select_pages("sampled", 1000, 20)
+        assert len(sample) == 20
+        assert sample[:10] == list(range(10)) and sample[-1] > 900
+        # Short documents are read whole
+        assert select_pages("sampled", 12, 20) is None
+
+    def test_pipeline_reads_only_the_selected_pages(self, temp_dir):
+        from synthetic_pdfs import write_synthetic_pdf
+
+        pdf_path = write_synthetic_pdf(os.path.join(temp_dir, "manual.pdf"), pages=8, images_per_page=1)
+        pipeline = ConversionPipeline(model_name="fast", pages=parse_pages("3-4"))
+        pipeline.set_document(pdf_path=pdf_path)
+
+        text = pipeline.extract_text(pdf_path)
+        page_texts = PdfExtractor.extract_page_texts(pdf_path)
+        assert pipeline.selected_pages == [2, 3]
+        assert text == page_texts[2] + "\f" + page_texts[3]
+        images = pipeline.extract_images(pdf_path)
+        assert sorted(image["page_num"] for image in images) == [2, 3]
+        cleanup_image_files(images)
+
+    def test_model_calls_carry_the_size_of_their_job(self):
+        pipeline = ConversionPipeline()
+        costs = []
+        pipeline.ollama_processor = MagicMock()
+        pipeline.ollama_processor.clean_and_structure_text.side_effect = lambda text: costs.append(
+            job_cost_var.get()) or text
+        pipeline.ollama_processor.analyze_document_structure.return_value = {
+            "title": "Doc", "sections": [{"title": "A", "content": ["Point"]}]}
+
+        pipeline.structure("x" * 5000, "Doc")
+
+        assert costs == [5000]
+        assert job_cost_var.get() is None
+
+    @patch('pipeline.OllamaProcessor')
+    def test_several_themes_share_one_analysis(self, mock_processor_class):
+        mock_processor = mock_processor_class.return_value
+        mock_processor.clean_and_structure_text.return_value = "Cleaned text"
+        mock_processor.analyze_document_structure.return_value = {
+            "title": "Document",
+            "sections": [{"title": "Section 1", "content": ["Content 1"]}]
+        }
+
+        output = io.BytesIO()
+        pdf_to_pptx_with_ollama(pdf_text="Some document text long enough", output_file=output,
+                                theme=["default", "corporate", "minimal"])
+
+        mock_processor.analyze_document_structure.assert_called_once()
+        with zipfile.ZipFile(output) as archive:
+            assert archive.namelist() == ["default.pptx", "corporate.pptx", "minimal.pptx"]
+
+    def test_pipeline_records_the_memory_of_every_stage(self, temp_dir):
+        from synthetic_pdfs import write_synthetic_pdf
+
+        pdf_path = write_synthetic_pdf(os.path.join(temp_dir, "manual.pdf"), pages=4, images_per_page=1)
+        finished = []
+        pipeline = ConversionPipeline(model_name="fast",
+                                      progress_callback=lambda event, data: finished.append(data)
+                                      if event == "stage_finished" else None)
+        pipeline.run(pdf_path=pdf_path, output_file=io.BytesIO())
+
+        assert set(pipeline.stage_memory) >= {"extract_text", "extract_images", "render"}
+        assert all(data["memory"]["rss_bytes"] > 0 for data in finished)
+        # Consumed before rendering
+        assert pipeline.page_texts is None
+
+    @patch('manageData.ollama.chat')
+    def test_fast_mode_converts_100_pages_without_the_model(self, mock_chat, temp_dir):
+        import fitz
+        from pptx import Presentation
+
+        pdf_path = os.path.join(temp_dir, "long.pdf")
+        with fitz.open() as document:
+            for page_number in range(100):
+                page = document.new_page()
+                page.insert_text((72, 72), f"{page_number + 1} Chapter {page_number + 1}", fontsize=18)
+                for line in range(12):
+                    page.insert_text((72, 110 + line * 14),
+                                     f"Line {line} of page {page_number} covers latency and throughput.")
+            document.save(pdf_path)
+
+        output = io.BytesIO()
+        with patch('pipeline.PdfExtractor.extract_text', wraps=PdfExtractor.extract_text) as extract_text:
+            pdf_to_pptx_with_ollama(pdf_path=pdf_path, output_file=output, model_name="fast")
+
+        mock_chat.assert_not_called()
+        extract_text.assert_not_called()
+        output.seek(0)
+        assert len(Presentation(output).slides) == 101
@@ -1,7 +1,14 @@
 # tests/test_ppt_generator.py
+import io
+import zipfile
 from unittest.mock import patch, MagicMock
 
-from ppt_generator import PdfToPptxConverter
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches, Pt
+
+from ppt_generator import PACKAGE_INTERNALS, PdfToPptxConverter, save_presentation
 
 
 class TestPdfToPptxConverter:
@@ -40,4 +47,132 @@ class TestPdfToPptxConverter:
 
         # Verify if the method was called correctly
         mock_slides.add_slide.assert_called_once()
-        assert mock_title_shape.text == "Test Title"
\ No newline at end of file
+        assert mock_title_shape.text == "Test Title"
+
+    def test_lean_mode_skips_inherited_formatting(self):
+        lean = PdfToPptxConverter("test.pptx", theme="corporate")
+        full = PdfToPptxConverter("test.pptx", theme="corporate", lean=False)
+
+        lean_slide = lean._add_content_slide("Title", ["First point", "Second point"])
+        full_slide = full._add_content_slide("Title", ["First point", "Second point"])
+
+        lean_paragraph = lean_slide.placeholders[1].text_frame.paragraphs[0]
+        full_paragraph = full_slide.placeholders[1].text_frame.paragraphs[0]
+        assert lean_paragraph.font.size is None
+        assert full_paragraph.font.size == full.content_font_size
+        assert lean_slide.placeholders[1].text_frame.text == full_slide.placeholders[1].text_frame.text
+
+    def test_lean_mode_writes_values_that_differ_from_theme(self):
+        converter = PdfToPptxConverter("test.pptx")
+        slide = converter._add_content_slide("Title", ["Point"])
+        paragraph = slide.placeholders[1].text_frame.paragraphs[0]
+
+        converter._format_paragraph(paragraph, "bullet", size=Pt(40), color=converter.text_color)
+
+        assert paragraph.font.size == Pt(40)
+        assert paragraph.font.color.type is None
+
+    def test_content_slide_with_image_uses_text_placeholder(self, tmp_path):
+        image_path = tmp_path / "image.png"
+        Image.new("RGB", (200, 100), "white").save(image_path)
+
+        converter = PdfToPptxConverter("test.pptx")
+        slide = converter._add_content_slide_with_image("Title", ["First", "Second"], str(image_path))
+
+        assert len(converter.prs.slides) == 1
+        assert slide.placeholders[1].text_frame.text == "First\nSecond"
+        assert slide.placeholders[1].width == Inches(6.5)
+        assert len([shape for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]) == 1
+
+    def test_save_presentation_stores_images_uncompressed(self, tmp_path):
+        image_path = tmp_path / "image.png"
+        Image.new("RGB", (200, 100), "white").save(image_path)
+        converter = PdfToPptxConverter("test.pptx")
+        converter._add_content_slide_with_image("Title", ["Point"], str(image_path))
+
+        class WriteOnly(io.RawIOBase):
+            def __init__(self):
+                self.chunks = []
+
+            def writable(self):
+                return True
+
+            def write(self, data):
+                self.chunks.append(bytes(data))
+                return len(data)
+
+        # Fails when python-pptx no longer has the internals the parts are written with
+        assert PACKAGE_INTERNALS
+        members = []
+        for internals in (True, False):
+            target = WriteOnly()
+            with patch('ppt_generator.PACKAGE_INTERNALS', internals):
+                save_presentation(converter.prs, target)
+
+            deck = b"".join(target.chunks)
+            with zipfile.ZipFile(io.BytesIO(deck)) as zf:
+                compression = {info.filename: info.compress_type for info in zf.infolist()}
+            assert compression["ppt/media/image1.png"] == zipfile.ZIP_STORED
+            assert compression["ppt/slides/slide1.xml"] == zipfile.ZIP_DEFLATED
+            assert len(Presentation(io.BytesIO(deck)).slides) == 1
+            members.append(sorted(compression))
+        assert members[0] == members[1]
+
+    def test_create_presentation_does_not_reuse_images(self, tmp_path):
+        image_path = tmp_path / "image.png"
+        Image.new("RGB", (200, 100), "white").save(image_path)
+        structure = {"title": "Deck", "sections": [
+            {"title": "One", "content": ["First"], "has_images": True, "image_info": {"relevant_images": [0]}},
+            {"title": "Two", "content": ["Second"], "has_images": True, "image_info": {"relevant_images": [0]}},
+            {"title": "Three", "content": ["Third"]},
+        ]}
+
+        converter = PdfToPptxConverter(io.BytesIO())
+        converter.create_presentation(structure, [{"path": str(image_path), "page_num": 0}])
+
+        pictures = [sum(1 for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE)
+                    for slide in converter.prs.slides]
+        assert pictures == [0, 1, 0, 0]
+
+    def test_long_section_continues_on_more_slides(self, tmp_path):
+        image_path = tmp_path / "image.png"
+        Image.new("RGB", (200, 100), "white").save(image_path)
+        points = [f"Step {i}: connect the cable to the controller and check the connector is locked" for i in range(30)]
+        structure = {"title": "Deck", "sections": [
+            {"title": "Wiring", "content": points, "has_images": True, "image_info": {"relevant_images": [0]}},
+        ]}
+
+        converter = PdfToPptxConverter(io.BytesIO())
+        converter.create_presentation(structure, [{"path": str(image_path), "page_num": 0}])
+
+        slides = list(converter.prs.slides)[1:]
+        assert len(slides) > 2
+        assert slides[0].shapes.title.text == "Wiring"
+        assert all(slide.shapes.title.text == "Wiring (cont.)" for slide in slides[1:])
+        # Only the first slide carries the image; every point appears once, in order
+        assert sum(shape.shape_type == MSO_SHAPE_TYPE.PICTURE for shape in slides[0].shapes) == 1
+        rendered = [paragraph.text.lstrip("• ") for slide in slides
+                    for paragraph in slide.placeholders[1].text_frame.paragraphs]
+        assert rendered == points
+
+        unpaginated = PdfToPptxConverter(io.BytesIO(), paginate=False)
+        unpaginated.create_presentation(structure, [{"path": str(image_path), "page_num": 0}])
+        assert len(unpaginated.prs.slides) == 2
+
+    def test_several_themes_render_into_one_zip(self):
+        from concurrent.futures import ThreadPoolExecutor
+        structure = {"title": "Deck", "sections": [{"title": "One", "content": ["First"]}]}
+        events = []
+
+        target = io.BytesIO()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            converter = PdfToPptxConverter(target, theme=["corporate", "minimal", "corporate"], executor=executor,
+                                           progress_callback=lambda event, data: events.append(event))
+            converter.create_presentation(structure)
+
+        with zipfile.ZipFile(target) as archive:
+            assert archive.namelist() == ["corporate.pptx", "minimal.pptx"]
+            for name in archive.namelist():
+                with zipfile.ZipFile(io.BytesIO(archive.read(name))) as deck:
+                    assert "ppt/slides/slide2.xml" in deck.namelist()
+        assert events == ["theme_rendered", "theme_rendered"]
@@ -0,0 +1,54 @@
+# tests/test_segmenter.py
+from segmenter import HeuristicSegmenter, segment_document
+
+
+class TestHeuristicSegmenter:
+
+    def test_headings_start_sections(self):
+        text = ("# Overview\nThe system converts documents into slides.\n\n"
+                "2.1 Installation Steps\n- Install the package\n- Start the server\n\n"
+                "TROUBLESHOOTING GUIDE\nCheck the logs first. Then restart the service.\n")
+
+        result = segment_document(text, "Manual")
+
+        assert result["title"] == "Manual"
+        assert [s["title"] for s in result["sections"]] == ["Overview", "2.1 Installation Steps",
+                                                            "TROUBLESHOOTING GUIDE"]
+        assert result["sections"][1]["content"] == ["Install the package", "Start the server"]
+        # Paragraphs are condensed to their first sentence
+        assert result["sections"][2]["content"] == ["Check the logs first."]
+
+    def test_skips_page_numbers_repeated_lines_and_running_footers(self):
+        text = ("ACME USER MANUAL\nINTRODUCTION\nWelcome text for the reader.\n\nACME Corp confidential\n\f"
+                "ACME USER MANUAL\nMounting\nMounting\n12\n\nCHAPTER TWO\nDetails about the second chapter.\n\n"
+                "ACME Corp confidential\n\fACME USER MANUAL\nCHAPTER THREE\nThe last chapter.\n\n"
+                "ACME Corp confidential\n")
+
+        result = segment_document(text, "Doc")
+        contents = [bullet for section in result["sections"] for bullet in section["content"]]
+
+        assert [s["title"] for s in result["sections"]] == ["INTRODUCTION", "CHAPTER TWO", "CHAPTER THREE"]
+        assert "12" not in contents
+        assert "ACME Corp confidential" not in contents
+        assert contents.count("Mounting Mounting") == 0
+
+    def test_bullets_repeat_across_sections_but_not_within_one(self):
+        text = ("INSTALLATION\n- Tighten the screws.\n- Mount the bracket.\n- Tighten the screws.\n\n"
+                "MAINTENANCE\n- Clean the filter.\n- Tighten the screws.\n")
+
+        result = segment_document(text, "Doc")
+
+        assert [s["content"] for s in result["sections"]] == [
+            ["Tighten the screws.", "Mount the bracket."], ["Clean the filter.", "Tighten the screws."]]
+
+    def test_untitled_text_is_split_into_parts(self):
+        text = "\n\n".join(f"Paragraph number {i} with enough text." for i in range(10))
+
+        result = HeuristicSegmenter(max_bullets=4).segment(text, "Doc")
+
+        assert [s["title"] for s in result["sections"]] == ["Document Content", "Document Content (2)",
+                                                            "Document Content (3)"]
+        assert sum(len(s["content"]) for s in result["sections"]) == 10
+
+    def test_empty_text(self):
+        assert segment_document("", "Doc")["sections"] == []
@@ -0,0 +1,46 @@
+# tests/test_text_layout.py
+from unittest.mock import patch
+
+from pptx.util import Inches, Pt
+
+from text_layout import CALIBRI, CALIBRI_WIDTHS, FontMetrics, TextArea
+
+
+class TestFontMetrics:
+
+    def test_word_width_uses_advance_table(self):
+        assert CALIBRI.word_width("mm") > CALIBRI.word_width("ii") * 3
+        assert CALIBRI.word_width("漢字") == 2.0
+
+
+class TestTextArea:
+
+    def test_line_count_wraps_between_words(self):
+        area = TextArea(Inches(2), Inches(5), Pt(18))
+        assert area.line_count("Short") == 1
+        assert area.line_count("word " * 30) > 3
+        # A single word wider than the line breaks over several lines
+        assert area.line_count("x" * 60) >= 3
+
+    def test_paginate_keeps_order_and_fits_each_page(self):
+        area = TextArea(Inches(6), Inches(3), Pt(18))
+        points = [f"Point {i} with a few more words to wrap over the line of the text area" for i in range(12)]
+
+        pages = area.paginate(points)
+
+        assert len(pages) > 1
+        assert [point for page in pages for point in page] == points
+        assert all(sum(area.paragraph_height(point) for point in page) <= area.height for page in pages)
+        assert area.paginate([]) == [[]]
+
+    def test_measuring_looks_up_each_distinct_word_once(self):
+        metrics = FontMetrics("Calibri", CALIBRI_WIDTHS)
+        area = TextArea(Inches(11), Inches(5), Pt(18), metrics=metrics, prefix="• ")
+        points = [f"Check the cable {i % 20} before the installation test and tighten every connector"
+                  for i in range(2000)]
+        words = {word for point in points for word in ("• " + point).split()}
+
+        with patch.object(metrics, "_advance", wraps=metrics._advance) as advance:
+            area.paginate(points)
+
+        assert advance.call_count == sum(len(word) for word in words)
@@ -0,0 +1,76 @@
+# tests/test_themes.py
+from unittest.mock import patch
+
+from pptx.oxml.ns import qn
+from pptx.util import Inches, Pt
+
+from ppt_generator import PdfToPptxConverter
+from themes import CONTENT_LAYOUT, SECTION_LAYOUT, SLIDE_WIDTH, ThemeRegistry, build_theme_template, get_theme
+
+
+class TestThemeRegistry:
+
+    def test_get_theme_unknown_uses_default(self):
+        assert get_theme("unknown") is get_theme("default")
+
+    def test_template_built_once_per_theme(self):
+        registry = ThemeRegistry()
+        with patch("themes.build_theme_template", wraps=build_theme_template) as build:
+            first = registry.template_bytes("corporate")
+            second = registry.template_bytes("corporate")
+            registry.template_bytes("unknown")
+            registry.template_bytes("default")
+
+        assert first is second
+        assert build.call_count == 2
+
+    def test_new_presentation_is_independent_copy(self):
+        registry = ThemeRegistry()
+        first = registry.new_presentation("minimal")
+        first.slides.add_slide(first.slide_layouts[CONTENT_LAYOUT])
+
+        second = registry.new_presentation("minimal")
+        assert len(second.slides) == 0
+        assert second.slide_width == SLIDE_WIDTH
+
+    def test_master_holds_theme_styles(self):
+        prs = ThemeRegistry().new_presentation("corporate")
+        theme = get_theme("corporate")
+
+        tx_styles = prs.slide_master._element.find(qn("p:txStyles"))
+        title_level = tx_styles.find(qn("p:titleStyle")).find(qn("a:lvl1pPr"))
+        title_run = title_level.find(qn("a:defRPr"))
+        assert title_run.get("sz") == str(int(theme["header_font_size"].pt * 100))
+        assert title_run.find(qn("a:solidFill")).find(qn("a:srgbClr")).get("val") == str(theme["title_color"])
+
+        body_level = tx_styles.find(qn("p:bodyStyle")).find(qn("a:lvl1pPr"))
+        assert body_level.find(qn("a:defRPr")).get("sz") == str(int(Pt(16).pt * 100))
+
+    def test_decorations_live_in_layouts(self):
+        prs = ThemeRegistry().new_presentation("corporate")
+        section_layout = prs.slide_layouts[SECTION_LAYOUT]
+        bars = [shape for shape in section_layout.shapes if shape.name.startswith("Decoration")]
+        assert len(bars) == 1
+        assert bars[0].height == Inches(7.5)
+
+        default = ThemeRegistry().new_presentation("default")
+        assert not any(shape.name.startswith("Decoration")
+                       for layout in default.slide_layouts for shape in layout.shapes)
+
+
+class TestThemedSlides:
+
+    def test_content_slide_has_no_per_slide_geometry_or_decorations(self):
+        converter = PdfToPptxConverter("test.pptx", theme="minimal")
+        slide = converter._add_content_slide("Title", ["First point", "Second point"])
+
+        # Only the placeholders: the accent line is inherited from the layout
+        assert len(slide.shapes) == 2
+        assert slide.shapes.title._element.spPr.find(qn("a:xfrm")) is None
+        # Geometry is still resolved from the layout placeholder
+        assert slide.placeholders[1].top == Inches(1.8)
+
+    def test_image_slide_without_image_adds_single_slide(self):
+        converter = PdfToPptxConverter("test.pptx")
+        converter._add_content_slide_with_image("Title", ["Point"], "/missing/image.png")
+        assert len(converter.prs.slides) == 1
@@ -0,0 +1,125 @@
+from pptx.util import Pt
+
+# Advance widths of Calibri (the theme font of every template) for the printable ASCII characters
+# " " (32) to "~" (126), in font units of a 2048 units-per-em design
+CALIBRI_WIDTHS = (
+    463, 544, 821, 1019, 1036, 1463, 1397, 452, 621, 621, 1019, 1019, 511, 627, 517, 791,
+    1038, 1038, 1038, 1038, 1038, 1038, 1038, 1038, 1038, 1038, 548, 548, 1019, 1019, 1019, 941,
+    1823, 1185, 1114, 1092, 1260, 1000, 941, 1292, 1276, 516, 653, 1064, 861, 1751, 1322, 1356,
+    1058, 1378, 1112, 941, 998, 1314, 1162, 1822, 1063, 998, 959, 628, 791, 628, 1019, 1019,
+    588, 981, 1076, 866, 1076, 1019, 625, 964, 1076, 470, 490, 931, 470, 1636, 1076, 1080,
+    1076, 1076, 714, 801, 686, 1076, 925, 1464, 887, 927, 809, 714, 941, 714, 1019,
+)
+
+# Characters outside the table: an average lower-case advance, a full em for CJK and other wide scripts
+DEFAULT_ADVANCE = 0.5
+WIDE_ADVANCE = 1.0
+WIDE_SCRIPTS_START = 0x2E80
+# Word widths remembered per font before the cache is reset
+WORD_CACHE_SIZE = 50000
+
+
+class FontMetrics:
+    """
+    Glyph advance table of one font, in ems. Word widths are cached, so measuring a bullet
+    costs one dictionary lookup per word once its words have been seen.
+    """
+
+    def __init__(self, name, ascii_widths, units_per_em=2048, line_height=1.22, bold_factor=1.04):
+        self.name = name
+        self.line_height = line_height
+        self.bold_factor = bold_factor
+        self._advances = {chr(32 + i): width / units_per_em for i, width in enumerate(ascii_widths)}
+        self.space = self._advances[" "]
+        self._words = {}
+
+    def _advance(self, character):
+        advance = self._advances.get(character)
+        if advance is None:
+            advance = WIDE_ADVANCE if ord(character) >= WIDE_SCRIPTS_START else DEFAULT_ADVANCE
+        return advance
+
+    def word_width(self, word):
+        """Width of a word in ems."""
+        width = self._words.get(word)
+        if width is None:
+            if len(self._words) >= WORD_CACHE_SIZE:
+                self._words.clear()
+            width = self._words[word] = sum(map(self._advance, word))
+        return width
+
+
+CALIBRI = FontMetrics("Calibri", CALIBRI_WIDTHS)
+
+
+class TextArea:
+    """
+    A text frame of known size, used to estimate how tall a list of paragraphs renders and to
+    split the list over several slides when it does not fit.
+
+    Paragraph spacing follows the template: single line spacing, space before of 20% of a line
+    and a fixed space after. `prefix` is text the slide adds in front of every paragraph ("• ").
+    """
+
+    def __init__(self, width, height, font_size, metrics=CALIBRI, indent=0, bold=False,
+                 space_before=0.2, space_after=Pt(6), prefix=""):
+        self.metrics = metrics
+        self.prefix = prefix
+        self.height = height
+        self.font_size = font_size
+        scale = metrics.bold_factor if bold else 1.0
+        # Line width in ems of the font, so word widths need no conversion
+        self.line_ems = (width - indent) / (font_size * scale)
+        self.line_height = font_size * metrics.line_height
+        self.paragraph_spacing = self.line_height * space_before + space_after
+
+    def line_count(self, text):
+        """Lines a paragraph wraps to, breaking between words like PowerPoint does."""
+        line_ems = self.line_ems
+        space = self.metrics.space
+        word_width = self.metrics.word_width
+        lines = 1
+        position = None
+        for word in text.split():
+            width = word_width(word)
+            if position is None:
+                position = width
+            elif position + space + width <= line_ems:
+                position += space + width
+                continue
+            else:
+                lines += 1
+                position = width
+            if position > line_ems:
+                # A word longer than the line is broken over several lines
+                extra = int(position // line_ems)
+                lines += extra
+                position -= extra * line_ems
+        return lines
+
+    def paragraph_height(self, text):
+        """Estimated height in EMU of one paragraph."""
+        return self.line_count(self.prefix + text) * self.line_height + self.paragraph_spacing
+
+    def paginate(self, paragraphs):
+        """
+        Splits paragraphs into pages that each fit the area. A paragraph taller than the whole
+        area gets a page of its own.
+
+        Returns:
+            list: Lists of paragraphs, one per page
+        """
+        pages = []
+        page = []
+        used = 0
+        for paragraph in paragraphs:
+            height = self.paragraph_height(paragraph)
+            if page and used + height > self.height:
+                pages.append(page)
+                page = []
+                used = 0
+            page.append(paragraph)
+            used += height
+        if page or not pages:
+            pages.append(page)
+        return pages
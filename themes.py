@@ -0,0 +1,316 @@
+import io
+import threading
+
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.enum.text import PP_ALIGN
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.oxml.shapes.autoshape import CT_Shape
+from pptx.shapes.autoshape import Shape
+from pptx.util import Emu, Inches, Pt
+
+SLIDE_WIDTH = Inches(13.33)
+SLIDE_HEIGHT = Inches(7.5)
+
+# Layout indices of the default python-pptx template
+TITLE_LAYOUT = 0
+CONTENT_LAYOUT = 1
+SECTION_LAYOUT = 2
+TEXT_IMAGE_LAYOUT = 3
+TITLE_ONLY_LAYOUT = 5
+
+# Geometry (left, top, width, height) and insets (left, right, top, bottom) of the body placeholders
+CONTENT_BODY_GEOMETRY = (Inches(0.8), Inches(1.8), Inches(11.73), Inches(5.2))
+CONTENT_BODY_INSETS = (Inches(0.3), Inches(0.3), Inches(0.2), Inches(0.2))
+TEXT_IMAGE_BODY_GEOMETRY = (Inches(0.8), Inches(1.5), Inches(6.5), Inches(5.0))
+TEXT_IMAGE_BODY_INSETS = (Inches(0.1), Inches(0.1), Inches(0.05), Inches(0.05))
+# Left margin of bulleted paragraphs, from the master body style of the default template
+BULLET_INDENT = Emu(342900)
+
+THEMES = {
+    "default": {
+        "title_color": RGBColor(44, 86, 151),
+        "accent_color": RGBColor(0, 129, 198),
+        "text_color": RGBColor(68, 68, 68),
+        "background_color": RGBColor(250, 250, 250),
+        "title_font_size": Pt(36),
+        "subtitle_font_size": Pt(22),
+        "header_font_size": Pt(28),
+        "content_font_size": Pt(18),
+    },
+    "corporate": {
+        "title_color": RGBColor(18, 52, 86),
+        "accent_color": RGBColor(64, 119, 176),
+        "text_color": RGBColor(50, 50, 50),
+        "background_color": RGBColor(242, 242, 242),
+        "title_font_size": Pt(36),
+        "subtitle_font_size": Pt(20),
+        "header_font_size": Pt(28),
+        "content_font_size": Pt(16),
+    },
+    "minimal": {
+        "title_color": RGBColor(0, 0, 0),
+        "accent_color": RGBColor(204, 0, 0),
+        "text_color": RGBColor(40, 40, 40),
+        "background_color": RGBColor(255, 255, 255),
+        "title_font_size": Pt(38),
+        "subtitle_font_size": Pt(22),
+        "header_font_size": Pt(30),
+        "content_font_size": Pt(18),
+    },
+}
+
+# Decorative bars drawn once in the layouts instead of on every slide: (layout, left, top, width, height)
+DECORATIONS = {
+    "corporate": [
+        (CONTENT_LAYOUT, Inches(0), Inches(7.0), Inches(13.33), Inches(0.5)),
+        (SECTION_LAYOUT, Inches(0), Inches(0), Inches(1.0), Inches(7.5)),
+    ],
+    "minimal": [
+        (TITLE_LAYOUT, Inches(3.5), Inches(4.5), Inches(6.33), Inches(0.05)),
+        (CONTENT_LAYOUT, Inches(0.8), Inches(1.6), Inches(11.73), Inches(0.03)),
+        (SECTION_LAYOUT, Inches(0.5), Inches(2.8), Inches(0.1), Inches(2.5)),
+    ],
+}
+
+_FILL_TAGS = ("a:noFill", "a:solidFill", "a:gradFill", "a:blipFill", "a:pattFill", "a:grpFill")
+
+
+def get_theme(name):
+    """Theme settings by name; unknown names use the default theme."""
+    return THEMES.get(name, THEMES["default"])
+
+
+def inherited_styles(name):
+    """
+    Paragraph formatting that each kind of placeholder inherits from a theme template.
+    build_theme_template writes these into the master and layouts, and the converter skips
+    writing them again on every paragraph.
+    """
+    theme = get_theme(name)
+    body = {"size": theme["content_font_size"], "color": theme["text_color"], "level": 0, "space_after": Pt(6)}
+    return {
+        "title": {"size": theme["title_font_size"], "bold": True, "color": theme["title_color"],
+                  "alignment": PP_ALIGN.CENTER},
+        "subtitle": {"size": theme["subtitle_font_size"], "color": theme["accent_color"],
+                     "alignment": PP_ALIGN.CENTER},
+        "section_title": {"size": theme["header_font_size"], "bold": True, "color": theme["title_color"],
+                          "alignment": PP_ALIGN.CENTER},
+        "slide_title": {"size": theme["header_font_size"], "bold": True, "color": theme["title_color"]},
+        "bullet": body,
+        "text": body,
+    }
+
+
+def text_area_size(geometry, insets):
+    """(width, height) left for text inside a placeholder once its insets are taken off."""
+    _, _, width, height = geometry
+    left, right, top, bottom = insets
+    return Emu(width - left - right), Emu(height - top - bottom)
+
+
+def _set_geometry(sp, left, top, width, height):
+    xfrm = sp.spPr.get_or_add_xfrm()
+    off = xfrm.get_or_add_off()
+    off.x, off.y = int(left), int(top)
+    ext = xfrm.get_or_add_ext()
+    ext.cx, ext.cy = int(width), int(height)
+
+
+def _set_insets(sp, left, right, top, bottom, word_wrap=False):
+    body_pr = sp.txBody.bodyPr
+    body_pr.set("lIns", str(int(left)))
+    body_pr.set("rIns", str(int(right)))
+    body_pr.set("tIns", str(int(top)))
+    body_pr.set("bIns", str(int(bottom)))
+    if word_wrap:
+        body_pr.set("wrap", "square")
+
+
+def _solid_fill(color):
+    return parse_xml(f'<a:solidFill {nsdecls("a")}><a:srgbClr val="{color}"/></a:solidFill>')
+
+
+def _style_level(level_pr, size=None, bold=None, color=None, align=None, space_after=None, no_bullet=False):
+    """Sets paragraph/run defaults on an a:lvlNpPr element (master text style or placeholder list style)."""
+    if align:
+        level_pr.set("algn", align)
+    if no_bullet:
+        level_pr.set("marL", "0")
+        level_pr.set("indent", "0")
+
+    if space_after is not None:
+        for existing in level_pr.findall(qn("a:spcAft")):
+            level_pr.remove(existing)
+        spc_aft = level_pr.makeelement(qn("a:spcAft"), {})
+        spc_pts = spc_aft.makeelement(qn("a:spcPts"), {"val": str(int(space_after.pt * 100))})
+        spc_aft.append(spc_pts)
+        # Sequence: lnSpc, spcBef, spcAft, bullet properties, tabLst, defRPr
+        anchor = level_pr.find(qn("a:spcBef"))
+        if anchor is None:
+            anchor = level_pr.find(qn("a:lnSpc"))
+        if anchor is None:
+            level_pr.insert(0, spc_aft)
+        else:
+            anchor.addnext(spc_aft)
+
+    def_rpr = level_pr.find(qn("a:defRPr"))
+    if def_rpr is None:
+        def_rpr = level_pr.makeelement(qn("a:defRPr"), {})
+        ext_lst = level_pr.find(qn("a:extLst"))
+        if ext_lst is None:
+            level_pr.append(def_rpr)
+        else:
+            ext_lst.addprevious(def_rpr)
+
+    if no_bullet and level_pr.find(qn("a:buNone")) is None:
+        bu_none = level_pr.makeelement(qn("a:buNone"), {})
+        tab_lst = level_pr.find(qn("a:tabLst"))
+        (def_rpr if tab_lst is None else tab_lst).addprevious(bu_none)
+
+    if size is not None:
+        def_rpr.set("sz", str(int(size.pt * 100)))
+    if bold is not None:
+        def_rpr.set("b", "1" if bold else "0")
+    if color is not None:
+        for tag in _FILL_TAGS:
+            for existing in def_rpr.findall(qn(tag)):
+                def_rpr.remove(existing)
+        line = def_rpr.find(qn("a:ln"))
+        if line is None:
+            def_rpr.insert(0, _solid_fill(color))
+        else:
+            line.addnext(_solid_fill(color))
+
+
+def _placeholder_level(sp):
+    """a:lvl1pPr of a layout placeholder's list style, created if missing."""
+    tx_body = sp.txBody
+    lst_style = tx_body.find(qn("a:lstStyle"))
+    if lst_style is None:
+        lst_style = tx_body.makeelement(qn("a:lstStyle"), {})
+        tx_body.bodyPr.addnext(lst_style)
+    level_pr = lst_style.find(qn("a:lvl1pPr"))
+    if level_pr is None:
+        level_pr = lst_style.makeelement(qn("a:lvl1pPr"), {})
+        def_ppr = lst_style.find(qn("a:defPPr"))
+        if def_ppr is None:
+            lst_style.insert(0, level_pr)
+        else:
+            def_ppr.addnext(level_pr)
+    return level_pr
+
+
+def _add_layout_bar(layout, color, left, top, width, height):
+    sp_tree = layout.shapes._spTree
+    shape_id = max(int(id_) for id_ in sp_tree.xpath("//p:cNvPr/@id")) + 1
+    sp = CT_Shape.new_autoshape_sp(shape_id, f"Decoration {shape_id}", "rect", left, top, width, height)
+    sp_tree.insert_element_before(sp, "p:extLst")
+
+    bar = Shape(sp, layout.shapes)
+    bar.fill.solid()
+    bar.fill.fore_color.rgb = color
+    bar.line.fill.background()
+
+
+def _apply_style(level_pr, style, no_bullet=False):
+    align = {PP_ALIGN.CENTER: "ctr", PP_ALIGN.LEFT: "l", PP_ALIGN.RIGHT: "r"}.get(style.get("alignment"))
+    _style_level(level_pr, size=style.get("size"), bold=style.get("bold"), color=style.get("color"),
+                 align=align, space_after=style.get("space_after"), no_bullet=no_bullet)
+
+
+def build_theme_template(name):
+    """
+    Builds a presentation template for a theme: slide size, title/body text styles in the slide
+    master, placeholder geometry and margins in the layouts, and decorative bars in the layouts.
+    Slides created from it only need their content.
+    """
+    theme = get_theme(name)
+    styles = inherited_styles(name)
+    prs = Presentation()
+    prs.slide_width = SLIDE_WIDTH
+    prs.slide_height = SLIDE_HEIGHT
+
+    # Master text styles, inherited by every title and bullet
+    tx_styles = prs.slide_master._element.find(qn("p:txStyles"))
+    _apply_style(tx_styles.find(qn("p:titleStyle")).find(qn("a:lvl1pPr")), styles["slide_title"])
+    _apply_style(tx_styles.find(qn("p:bodyStyle")).find(qn("a:lvl1pPr")), styles["bullet"])
+
+    layouts = prs.slide_layouts
+
+    # Title slide
+    title_layout = layouts[TITLE_LAYOUT]
+    title_ph = title_layout.placeholders[0]._element
+    _set_geometry(title_ph, Inches(0.5), Inches(2.5), Inches(12.33), Inches(2.0))
+    _set_insets(title_ph, Inches(0.2), Inches(0.2), Inches(0.1), Inches(0.1), word_wrap=True)
+    _apply_style(_placeholder_level(title_ph), styles["title"])
+    subtitle_ph = title_layout.placeholders[1]._element
+    _set_geometry(subtitle_ph, Inches(0.5), Inches(4.8), Inches(12.33), Inches(1.0))
+    _set_insets(subtitle_ph, Inches(0.2), Inches(0.2), Inches(0.1), Inches(0.1))
+    _apply_style(_placeholder_level(subtitle_ph), styles["subtitle"])
+
+    # Title and content
+    content_layout = layouts[CONTENT_LAYOUT]
+    content_title = content_layout.placeholders[0]._element
+    _set_geometry(content_title, Inches(0.5), Inches(0.3), Inches(12.33), Inches(1.2))
+    _set_insets(content_title, Inches(0.2), Inches(0.2), Inches(0.1), Inches(0.1))
+    content_body = content_layout.placeholders[1]._element
+    _set_geometry(content_body, *CONTENT_BODY_GEOMETRY)
+    _set_insets(content_body, *CONTENT_BODY_INSETS, word_wrap=True)
+
+    # Section header
+    section_title = layouts[SECTION_LAYOUT].placeholders[0]._element
+    _set_geometry(section_title, Inches(0.5), Inches(1.0), Inches(12.33), Inches(1.5))
+    _set_insets(section_title, Inches(0.2), Inches(0.2), Inches(0.1), Inches(0.1))
+    _apply_style(_placeholder_level(section_title), styles["section_title"])
+
+    # Text beside an image: one unbulleted text placeholder on the left, the picture goes on the right
+    text_image_layout = layouts[TEXT_IMAGE_LAYOUT]
+    _set_geometry(text_image_layout.placeholders[0]._element, Inches(0.5), Inches(0.3), Inches(12.33), Inches(1.0))
+    text_ph = text_image_layout.placeholders[1]._element
+    _set_geometry(text_ph, *TEXT_IMAGE_BODY_GEOMETRY)
+    _set_insets(text_ph, *TEXT_IMAGE_BODY_INSETS, word_wrap=True)
+    _apply_style(_placeholder_level(text_ph), styles["text"], no_bullet=True)
+    right_ph = text_image_layout.placeholders[2]._element
+    right_ph.getparent().remove(right_ph)
+
+    # Title only, used by slides that place their own image or table
+    _set_geometry(layouts[TITLE_ONLY_LAYOUT].placeholders[0]._element,
+                  Inches(0.5), Inches(0.3), Inches(12.33), Inches(1.0))
+
+    for layout_index, left, top, width, height in DECORATIONS.get(name, []):
+        _add_layout_bar(layouts[layout_index], theme["accent_color"], left, top, width, height)
+
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+class ThemeRegistry:
+    """Builds each theme template once and hands out fresh copies of it."""
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def template_bytes(self, name):
+        name = name if name in THEMES else "default"
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = build_theme_template(name)
+                    self._templates[name] = template
+        return template
+
+    def new_presentation(self, name):
+        return Presentation(io.BytesIO(self.template_bytes(name)))
+
+    def preload(self, names=None):
+        for name in names or THEMES:
+            self.template_bytes(name)
+
+
+THEME_TEMPLATES = ThemeRegistry()